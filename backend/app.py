@@ -20,7 +20,8 @@ else:
     print("No .env file found. Using default/OS environment variables.")
 
 from app import create_app
-from flask import send_from_directory, abort
+from app.utils.static_site import StaticSite
+from flask import abort
 
 app = create_app()
 
@@ -71,6 +72,9 @@ if not os.path.exists(FRONTEND_DIST):
 else:
     print(f"Found frontend build at: {FRONTEND_DIST} — skipping build step.")
 
+# Manifest of the build, taken once at startup; rebuild and restart to pick up new files
+static_site = StaticSite(FRONTEND_DIST)
+
 # Add routes to serve the SPA build (static assets + index.html fallback)
 # This allows frontend + backend to be served by the same Flask process.
 @app.route("/", defaults={"path": ""})
@@ -78,17 +82,17 @@ else:
 def serve_frontend(path: str):
     """
     Serve a built frontend from backend/frontend_dist.
-    - If the requested file exists in frontend_dist, serve it.
-    - Otherwise, serve frontend_dist/index.html so the SPA router can handle the route.
+    - If the requested file is in the build manifest, serve it.
+    - Otherwise, serve the in-memory index.html so the SPA router can handle the route.
     """
-    # normalized path to file in dist
-    if path != "" and os.path.exists(os.path.join(FRONTEND_DIST, path)):
-        return send_from_directory(FRONTEND_DIST, path)
-    index_path = os.path.join(FRONTEND_DIST, "index.html")
-    if os.path.exists(index_path):
-        return send_from_directory(FRONTEND_DIST, "index.html")
+    response = static_site.serve(path)
+    if response is not None:
+        return response
+    if static_site.index is not None:
+        abort(404)
     # If we can't find an index.html (maybe frontend not present and build skipped),
     # return a helpful error.
+    index_path = os.path.join(FRONTEND_DIST, "index.html")
     abort(404, description=(
         "Frontend build not found. Expected index.html at: "
         f"{index_path}. You can build the frontend by running `npm ci && npm run build` "
@@ -4,12 +4,16 @@ from flask_sqlalchemy import SQLAlchemy
 import secrets
 
 from .config import Config
+from .replicas import RoutingSession, init_read_routing
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 
 def create_app():
     app = Flask(__name__)
+
+    from .utils.json_provider import FastJSONProvider
+    app.json = FastJSONProvider(app)
     
     config = Config()
     app.config.from_object(config)
@@ -45,7 +49,14 @@ def create_app():
         methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"]
     )
 
+    from .utils.compression import init_compression
+    init_compression(app)
+
+    from .utils.pool_metrics import init_pool_metrics
+    init_pool_metrics(app)
+
     db.init_app(app)
+    init_read_routing(app)
 
     from .models import college  # noqa: F401
 
@@ -61,4 +72,28 @@ def create_app():
     from .routes import auth
     app.register_blueprint(auth.auth_bp, url_prefix="/api/auth")
 
+    from .utils.storage import init_storage
+    init_storage(app)
+
+    from .utils.storage_gc import init_storage_gc
+    init_storage_gc(app)
+
+    from .routes import storage
+    app.register_blueprint(storage.storage_bp, url_prefix="/api/storage")
+
+    from .utils.photo_cache import init_photo_cache
+    init_photo_cache(app)
+
+    from .routes import photos
+    app.register_blueprint(photos.photos_bp, url_prefix="/api/photos")
+
+    from .utils.storage_outbox import init_storage_outbox
+    init_storage_outbox(app)
+
+    from .utils.image_variants import init_image_variants
+    init_image_variants(app)
+
+    from .routes import internal
+    app.register_blueprint(internal.internal_bp, url_prefix="/api/internal")
+
     return app
\ No newline at end of file
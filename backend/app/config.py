@@ -13,4 +13,99 @@ class Config:
         f"{os.getenv('POSTGRES_PORT', '5432')}/"
         f"{os.getenv('POSTGRES_DB', 'ssis_db')}"
     )
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Optional read replicas, comma-separated. GET requests to the API blueprints run on
+    # one of them; a client's reads stay on the primary for REPLICA_STICKY_SECONDS after
+    # it writes (see app/replicas.py).
+    SQLALCHEMY_BINDS = {
+        f"replica_{i}": uri
+        for i, uri in enumerate(u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip())
+    }
+    REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+
+    # Connection pool, per worker process. Keep
+    # workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) below Postgres max_connections;
+    # GET /api/internal/pool shows how close each worker gets.
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+
+    # Server-side cap on any single statement, in ms (0 disables). Import and export
+    # switch to DB_BULK_STATEMENT_TIMEOUT_MS for their own transaction.
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
+    DB_BULK_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_BULK_STATEMENT_TIMEOUT_MS", "0"))
+
+    # Internal endpoints (/api/internal) require this token in X-Internal-Token;
+    # without it they are disabled.
+    INTERNAL_API_TOKEN = os.getenv("INTERNAL_API_TOKEN", None)
+
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "connect_args": {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"},
+    }
+
+    # psycopg 3 prepares a statement server-side once it has run prepare_threshold
+    # times on a connection, so the cached list statements get reusable plans.
+    # psycopg2 has no server-side prepare; the option is only set for psycopg 3 URIs.
+    if SQLALCHEMY_DATABASE_URI.startswith("postgresql+psycopg://"):
+        SQLALCHEMY_ENGINE_OPTIONS["connect_args"]["prepare_threshold"] = int(os.getenv("DB_PREPARE_THRESHOLD", "5"))
+
+    # "database" has Postgres render list pages as JSON (json_agg) and passes the text
+    # straight through to the response; "python" fetches rows and encodes them here.
+    LIST_JSON_RENDERER = os.getenv("LIST_JSON_RENDERER", "python")
+
+    # Largest accepted student photo upload, in bytes
+    MAX_PHOTO_BYTES = int(os.getenv("MAX_PHOTO_BYTES", str(5 * 1024 * 1024)))
+    # How long a direct upload can be confirmed after its URL was issued
+    PHOTO_UPLOAD_TOKEN_SECONDS = int(os.getenv("PHOTO_UPLOAD_TOKEN_SECONDS", "900"))
+    # An unreferenced photo handed out again for an identical upload is kept this long,
+    # so the form it was uploaded from can still be saved
+    PHOTO_REUSE_HOLD_SECONDS = int(os.getenv("PHOTO_REUSE_HOLD_SECONDS", "3600"))
+
+    # Where photos are stored: "supabase" (Supabase Storage) or "local" (files under
+    # LOCAL_STORAGE_ROOT, served by /api/storage). LOCAL_STORAGE_URL is the public base
+    # URL of those files, e.g. a CDN or the proxy that fronts this API.
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "supabase")
+    LOCAL_STORAGE_ROOT = os.getenv(
+        "LOCAL_STORAGE_ROOT", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "storage")
+    )
+    LOCAL_STORAGE_URL = os.getenv("LOCAL_STORAGE_URL", "/api/storage")
+
+    # /api/photos keeps fetched photos in an on-disk LRU cache of this size, revalidating
+    # entries with the storage backend once they are PHOTO_CACHE_REVALIDATE_SECONDS old.
+    # Browsers may keep a photo for PHOTO_MAX_AGE_SECONDS: photo paths are never reused.
+    PHOTO_CACHE_DIR = os.getenv(
+        "PHOTO_CACHE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "photo_cache")
+    )
+    PHOTO_CACHE_MAX_BYTES = int(os.getenv("PHOTO_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+    PHOTO_CACHE_REVALIDATE_SECONDS = int(os.getenv("PHOTO_CACHE_REVALIDATE_SECONDS", str(24 * 3600)))
+    PHOTO_MAX_AGE_SECONDS = int(os.getenv("PHOTO_MAX_AGE_SECONDS", str(365 * 24 * 3600)))
+
+    # Thumbnail/WebP generation for uploaded photos (needs Pillow), in a process pool
+    IMAGE_VARIANTS = os.getenv("IMAGE_VARIANTS", "1") == "1"
+    IMAGE_VARIANT_WORKERS = int(os.getenv("IMAGE_VARIANT_WORKERS", "2"))
+
+    # Background deletion of unreferenced storage objects (see app/utils/storage_outbox.py).
+    # The worker thread starts with the first request; set STORAGE_OUTBOX_WORKER=0 on
+    # serving processes that should leave the outbox to others.
+    STORAGE_OUTBOX_WORKER = os.getenv("STORAGE_OUTBOX_WORKER", "1") == "1"
+    STORAGE_OUTBOX_POLL_SECONDS = float(os.getenv("STORAGE_OUTBOX_POLL_SECONDS", "5"))
+    STORAGE_OUTBOX_BATCH_SIZE = int(os.getenv("STORAGE_OUTBOX_BATCH_SIZE", "100"))
+    STORAGE_OUTBOX_MAX_BACKOFF_SECONDS = int(os.getenv("STORAGE_OUTBOX_MAX_BACKOFF_SECONDS", "3600"))
+
+    # Orphaned photo collection (`flask storage-gc` or POST /api/internal/storage-gc).
+    # Objects younger than the grace period are kept: they may be uploads in progress.
+    STORAGE_GC_GRACE_SECONDS = int(os.getenv("STORAGE_GC_GRACE_SECONDS", str(24 * 3600)))
+    STORAGE_GC_PAGE_SIZE = int(os.getenv("STORAGE_GC_PAGE_SIZE", "1000"))
+
+    # Response compression (brotli is used when the brotli package is installed)
+    COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "500"))
+    COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+    COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "5"))
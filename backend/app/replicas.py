@@ -0,0 +1,74 @@
+"""Read-replica routing for db.session.
+
+GET/HEAD requests to the API blueprints run on a replica engine when replicas are
+configured; everything else uses the primary. After a client writes, a short-lived
+cookie keeps its reads on the primary so it sees its own changes despite replica lag.
+"""
+
+import random
+import time
+from typing import List
+
+from flask import Flask, Response, g, has_app_context, request
+from flask_sqlalchemy.session import Session
+
+READ_METHODS = ("GET", "HEAD")
+
+# Blueprints whose read requests may be served by a replica
+REPLICA_BLUEPRINTS = ("colleges", "programs", "students", "auth")
+
+REPLICA_BIND_PREFIX = "replica_"
+
+STICKY_COOKIE = "db_primary_until"
+
+
+class RoutingSession(Session):
+    """Session that sends every statement to the replica chosen for the current request."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            replica = g.get("_replica_bind")
+            if replica:
+                return self._db.engines[replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def replica_binds(app: Flask) -> List[str]:
+    return sorted(key for key in (app.config.get("SQLALCHEMY_BINDS") or {}) if key.startswith(REPLICA_BIND_PREFIX))
+
+
+def init_read_routing(app: Flask) -> None:
+    """Register the request hooks that pick a replica for reads. No-op without replicas."""
+    replicas = replica_binds(app)
+    if not replicas:
+        return
+
+    def route_reads() -> None:
+        if request.method not in READ_METHODS or request.blueprint not in REPLICA_BLUEPRINTS:
+            return
+        try:
+            primary_until = float(request.cookies.get(STICKY_COOKIE, 0))
+        except ValueError:
+            primary_until = 0
+        if primary_until > time.time():
+            return
+        g._replica_bind = random.choice(replicas)
+
+    def stick_to_primary(response: Response) -> Response:
+        if (
+            request.method not in READ_METHODS
+            and request.blueprint in REPLICA_BLUEPRINTS
+            and response.status_code < 400
+        ):
+            seconds = app.config["REPLICA_STICKY_SECONDS"]
+            response.set_cookie(
+                STICKY_COOKIE,
+                f"{time.time() + seconds:.3f}",
+                max_age=seconds,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+    app.before_request(route_reads)
+    app.after_request(stick_to_primary)
@@ -2,14 +2,18 @@
 
 from http import HTTPStatus
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 
 from ..services.college_service import CollegeService
+from ..utils.batch import parse_batch_operations
+from ..utils.etag import versioned_etag
+from ..utils.pagination import TOTAL_MODES
 
 colleges_bp = Blueprint("colleges", __name__)
 
 
 @colleges_bp.get("")
+@versioned_etag("colleges")
 def list_colleges():
     try:
         page = int(request.args.get("page", 1))
@@ -26,6 +30,16 @@ def list_colleges():
     
     search = request.args.get("search", "").strip()
     search_by = request.args.get("search_by", "all").strip().lower()
+
+    # Keyset pagination cursors (take precedence over page when present)
+    after = request.args.get("after", "").strip() or None
+    before = request.args.get("before", "").strip() or None
+
+    # How to report the total: exact, estimate, or none for typeahead callers.
+    # Unset means exact for numbered pages and none for cursor pages.
+    total_mode = request.args.get("total", "").strip().lower()
+    if total_mode not in TOTAL_MODES:
+        total_mode = None
     
     if order not in ["asc", "desc"]:
         order = "asc"
@@ -39,7 +53,11 @@ def list_colleges():
         sort_by=sort_by,
         order=order,
         search=search,
-        search_by=search_by
+        search_by=search_by,
+        after=after,
+        before=before,
+        total_mode=total_mode,
+        render=current_app.config.get("LIST_JSON_RENDERER", "python"),
     )
     
     if result["error"]:
@@ -47,10 +65,26 @@ def list_colleges():
     
     return jsonify({
         "colleges": result["data"],
-        "pagination": result["pagination"]
+        "pagination": result["pagination"],
+        "suggestions": result["suggestions"],
     }), HTTPStatus.OK
 
 
+@colleges_bp.post("/batch")
+def batch_colleges():
+    """POST /api/colleges/batch - apply create/update/delete operations in one transaction."""
+    payload = request.get_json(silent=True) or {}
+    operations, error = parse_batch_operations(payload)
+    if error:
+        return jsonify({"message": error}), HTTPStatus.BAD_REQUEST
+
+    result = CollegeService.apply_batch(operations, atomic=bool(payload.get("atomic")))
+    if result["error"]:
+        return jsonify({"message": result["error"]}), result["status"]
+
+    return jsonify({"results": result["data"]}), HTTPStatus.OK
+
+
 @colleges_bp.post("")
 def create_college():
     data = request.get_json() or {}
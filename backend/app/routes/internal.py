@@ -0,0 +1,77 @@
+"""Internal operational routes (not used by the frontend)."""
+
+import hmac
+from http import HTTPStatus
+
+from flask import Blueprint, current_app, jsonify, request
+from sqlalchemy import text
+
+from .. import db
+from ..utils.pool_metrics import pool_status
+from ..utils.storage_gc import collect_orphaned_photos
+
+internal_bp = Blueprint("internal", __name__)
+
+
+@internal_bp.before_request
+def require_internal_access():
+    # Closed unless INTERNAL_API_TOKEN is set; behind a proxy every client looks like loopback
+    token = current_app.config.get("INTERNAL_API_TOKEN")
+    supplied = request.headers.get("X-Internal-Token", "")
+    if not token or not hmac.compare_digest(supplied.encode("utf-8"), token.encode("utf-8")):
+        return jsonify({"message": "Forbidden"}), HTTPStatus.FORBIDDEN
+
+
+@internal_bp.get("/pool")
+def pool_stats():
+    """
+    GET /api/internal/pool - connection pool counters and checkout wait histogram for
+    this worker, plus the server's connection limit and current usage for sizing.
+    """
+    config = current_app.config
+    pools = {bind or "default": pool_status(engine) for bind, engine in db.engines.items()}
+
+    server = None
+    try:
+        row = db.session.execute(text(
+            "SELECT current_setting('max_connections')::int AS max_connections, "
+            "(SELECT count(*) FROM pg_stat_activity WHERE datname = current_database()) AS connections"
+        )).mappings().one()
+        server = dict(row)
+    except Exception as e:
+        current_app.logger.warning(f"Could not read server connection stats: {e}")
+        db.session.rollback()
+
+    return jsonify({
+        "pools": pools,
+        "settings": {
+            "pool_size": config.get("DB_POOL_SIZE"),
+            "max_overflow": config.get("DB_MAX_OVERFLOW"),
+            "pool_timeout_s": config.get("DB_POOL_TIMEOUT"),
+            "pool_recycle_s": config.get("DB_POOL_RECYCLE"),
+            "pool_pre_ping": config.get("DB_POOL_PRE_PING"),
+            "statement_timeout_ms": config.get("DB_STATEMENT_TIMEOUT_MS"),
+        },
+        "server": server,
+    }), HTTPStatus.OK
+
+
+@internal_bp.post("/storage-gc")
+def storage_gc():
+    """
+    POST /api/internal/storage-gc[?dry_run=1&grace=<seconds>] - delete stored photos no
+    student references (see `flask storage-gc`). Dry runs also return the orphan paths.
+    """
+    config = current_app.config
+    try:
+        grace = int(request.args.get("grace", config["STORAGE_GC_GRACE_SECONDS"]))
+    except ValueError:
+        return jsonify({"message": "grace must be an integer."}), HTTPStatus.BAD_REQUEST
+    try:
+        stats = collect_orphaned_photos(
+            grace, page_size=config["STORAGE_GC_PAGE_SIZE"], dry_run=request.args.get("dry_run") == "1"
+        )
+    except Exception as e:
+        current_app.logger.exception("Storage GC failed.")
+        return jsonify({"message": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+    return jsonify(stats), HTTPStatus.OK
@@ -0,0 +1,60 @@
+"""Caching proxy for student photos."""
+
+import mimetypes
+from http import HTTPStatus
+
+from flask import Blueprint, current_app, jsonify, send_file
+
+from ..utils.storage import LocalStorage, get_storage
+from ..utils.uploads import PHOTO_DIRECTORY
+
+photos_bp = Blueprint("photos", __name__)
+
+
+def photo_response(file: str, etag, content_type: str):
+    if etag:
+        etag = etag.removeprefix("W/").strip('"')
+    # Photo paths are never reused for other content, so browsers can keep them
+    response = send_file(file, mimetype=content_type, conditional=True, etag=etag or True)
+    response.headers["Cache-Control"] = (
+        f"public, max-age={current_app.config['PHOTO_MAX_AGE_SECONDS']}, immutable"
+    )
+    return response
+
+
+@photos_bp.get("/<path:path>")
+def get_photo(path: str):
+    """
+    GET /api/photos/<path> - a student photo or variant, e.g. student_photos/thumbs/<name>.webp.
+    Served from the local disk cache, which fetches from the storage backend on a miss.
+    Supports conditional and range requests.
+    """
+    parts = path.split("/")
+    if parts[0] != PHOTO_DIRECTORY or len(parts) < 2 or any(part in ("", ".", "..") for part in parts):
+        return jsonify({"message": "Photo not found."}), HTTPStatus.NOT_FOUND
+
+    storage = get_storage()
+    if isinstance(storage, LocalStorage):
+        # Already on local disk; a second copy would only halve the cache
+        try:
+            return photo_response(
+                storage.file_path(path), None, mimetypes.guess_type(path)[0] or "application/octet-stream"
+            )
+        except FileNotFoundError:
+            return jsonify({"message": "Photo not found."}), HTTPStatus.NOT_FOUND
+
+    cache = current_app.extensions["photo_cache"]
+    # Retried once in case another request evicts the file before it is opened
+    for _ in range(2):
+        try:
+            cached = cache.get(storage, path)
+        except Exception as e:
+            current_app.logger.warning(f"Photo proxy: fetching '{path}' failed: {e}")
+            return jsonify({"message": "Photo unavailable."}), HTTPStatus.BAD_GATEWAY
+        if cached is None:
+            return jsonify({"message": "Photo not found."}), HTTPStatus.NOT_FOUND
+        try:
+            return photo_response(cached.file, cached.etag, cached.content_type)
+        except FileNotFoundError:
+            continue
+    return jsonify({"message": "Photo unavailable."}), HTTPStatus.SERVICE_UNAVAILABLE
@@ -0,0 +1,70 @@
+"""Object routes for the local-disk storage backend."""
+
+import mimetypes
+from http import HTTPStatus
+
+from flask import Blueprint, current_app, jsonify, request, send_file
+
+from ..utils.storage import LocalStorage
+from ..utils.uploads import LimitedReader, UploadTooLarge
+
+storage_bp = Blueprint("storage", __name__)
+
+
+def local_storage():
+    storage = current_app.extensions.get("storage")
+    return storage if isinstance(storage, LocalStorage) else None
+
+
+@storage_bp.get("/<path:path>")
+def get_object(path: str):
+    """
+    GET /api/storage/<path> - serve a stored object. send_file hands the open file to the
+    WSGI server's file wrapper (sendfile() under gunicorn), or to the front proxy when
+    USE_X_SENDFILE is on, and answers conditional and range requests.
+    """
+    storage = local_storage()
+    if storage is None:
+        return jsonify({"message": "Not found."}), HTTPStatus.NOT_FOUND
+    try:
+        file_path = storage.file_path(path)
+    except ValueError:
+        return jsonify({"message": "Not found."}), HTTPStatus.NOT_FOUND
+    try:
+        return send_file(
+            file_path,
+            mimetype=mimetypes.guess_type(path)[0] or "application/octet-stream",
+            conditional=True,
+            max_age=3600,
+        )
+    except FileNotFoundError:
+        return jsonify({"message": "Not found."}), HTTPStatus.NOT_FOUND
+
+
+@storage_bp.put("/upload/<path:path>")
+def upload_object(path: str):
+    """
+    PUT /api/storage/upload/<path>?expires=&signature= - target of the signed upload URLs
+    the local backend issues. The body is streamed to disk and capped at MAX_PHOTO_BYTES.
+    """
+    storage = local_storage()
+    if storage is None:
+        return jsonify({"message": "Not found."}), HTTPStatus.NOT_FOUND
+
+    try:
+        expires = int(request.args.get("expires", ""))
+    except ValueError:
+        expires = 0
+    if not storage.verify_upload(path, expires, request.args.get("signature", "")):
+        return jsonify({"message": "Invalid or expired upload URL."}), HTTPStatus.FORBIDDEN
+
+    limit = current_app.config["MAX_PHOTO_BYTES"]
+    if request.content_length is not None and request.content_length > limit:
+        return jsonify({"message": "Upload too large."}), HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+    try:
+        storage.upload(LimitedReader(request.stream, limit, request.content_length), path)
+    except UploadTooLarge:
+        return jsonify({"message": "Upload too large."}), HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+    except ValueError:
+        return jsonify({"message": "Invalid storage path."}), HTTPStatus.BAD_REQUEST
+    return jsonify({"path": path}), HTTPStatus.OK
@@ -2,28 +2,37 @@
 
 from http import HTTPStatus
 
-from flask import Blueprint, jsonify, request, current_app
+from flask import Blueprint, Response, jsonify, request, current_app, stream_with_context
+from werkzeug.exceptions import RequestEntityTooLarge
 
+from ..services.student_import_service import StudentImportService
 from ..services.student_service import StudentService
-from ..utils.supabase_storage import delete_object, upload_object, get_public_url
-import uuid
-import re
+from ..utils.batch import parse_batch_operations
+from ..utils.etag import versioned_etag
+from ..utils.image_variants import submit_image_variants
+from ..utils.pagination import TOTAL_MODES
+from ..utils.photo_objects import find_photo_by_hash, register_photo_hash
+from ..utils.storage import get_storage
+from ..utils.storage_outbox import enqueue_storage_deletes, wake_storage_outbox
+from ..utils.uploads import (
+    MULTIPART_OVERHEAD,
+    LimitedReader,
+    UploadTooLarge,
+    hash_upload,
+    new_photo_path,
+    sign_photo_upload,
+    stream_size,
+    verify_photo_upload,
+)
+import csv
+import io
+import json
 
 students_bp = Blueprint("students", __name__)
 
 
-@students_bp.get("")
-def list_students():
-    try:
-        page = int(request.args.get("page", 1))
-        per_page = int(request.args.get("per_page", 10))
-    except ValueError:
-        page = 1
-        per_page = 10
-
-    page = max(1, page)
-    per_page = max(1, min(per_page, 100))
-
+def list_filters_from_request() -> dict:
+    """Sort, search and filter arguments shared by the list and export endpoints."""
     sort_by = request.args.get("sort_by", "").strip()
     order = request.args.get("order", "asc").strip().lower()
 
@@ -49,16 +58,48 @@ def list_students():
     if search_by not in ["all", "id", "first_name", "last_name", "program", "year_level", "gender"]:
         search_by = "all"
 
+    return {
+        "sort_by": sort_by,
+        "order": order,
+        "search": search,
+        "search_by": search_by,
+        "program_code": program_code,
+        "year_level": year_level,
+        "gender": gender,
+    }
+
+
+@students_bp.get("")
+@versioned_etag("students", "programs", "colleges", "photo_variants")
+def list_students():
+    try:
+        page = int(request.args.get("page", 1))
+        per_page = int(request.args.get("per_page", 10))
+    except ValueError:
+        page = 1
+        per_page = 10
+
+    page = max(1, page)
+    per_page = max(1, min(per_page, 100))
+
+    # Keyset pagination cursors (take precedence over page when present)
+    after = request.args.get("after", "").strip() or None
+    before = request.args.get("before", "").strip() or None
+
+    # How to report the total: exact, estimate, or none for typeahead callers.
+    # Unset means exact for numbered pages and none for cursor pages.
+    total_mode = request.args.get("total", "").strip().lower()
+    if total_mode not in TOTAL_MODES:
+        total_mode = None
+
     result = StudentService.list_all(
         page=page,
         per_page=per_page,
-        sort_by=sort_by,
-        order=order,
-        search=search,
-        search_by=search_by,
-        program_code=program_code,
-        year_level=year_level,
-        gender=gender
+        after=after,
+        before=before,
+        total_mode=total_mode,
+        render=current_app.config.get("LIST_JSON_RENDERER", "python"),
+        **list_filters_from_request(),
     )
 
     if result["error"]:
@@ -66,10 +107,104 @@ def list_students():
 
     return jsonify({
         "students": result["data"],
-        "pagination": result["pagination"]
+        "pagination": result["pagination"],
+        "suggestions": result["suggestions"],
     }), HTTPStatus.OK
 
 
+@students_bp.get("/export")
+def export_students():
+    """
+    GET /api/students/export?format=csv|ndjson - stream every student matching the list filters.
+    The body is generated batch by batch from a server-side cursor, so memory stays flat
+    regardless of roster size and the header goes out before the query completes.
+    """
+    fmt = request.args.get("format", "csv").strip().lower()
+    if fmt not in ("csv", "ndjson"):
+        return jsonify({"message": "Format must be csv or ndjson."}), HTTPStatus.BAD_REQUEST
+
+    filters = list_filters_from_request()
+    columns = StudentService.EXPORT_COLUMNS
+
+    def generate():
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            yield buffer.getvalue()
+        try:
+            for batch in StudentService.iter_export(**filters):
+                if fmt == "csv":
+                    buffer.seek(0)
+                    buffer.truncate()
+                    writer.writerows(batch)
+                    yield buffer.getvalue()
+                else:
+                    yield "".join(json.dumps(dict(zip(columns, row))) + "\n" for row in batch)
+        except Exception:
+            # Headers are already sent; all we can do is stop the stream and log it
+            current_app.logger.exception("Student export failed mid-stream.")
+
+    mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="students.{fmt}"'},
+    )
+
+
+@students_bp.post("/import")
+def import_students():
+    """
+    POST /api/students/import - bulk-load students from a CSV or NDJSON file (field "file").
+    Gzip-compressed uploads are detected automatically. The format comes from ?format=
+    or the file extension. Returns inserted/rejected counts and a per-row error report.
+    """
+    upload = request.files.get("file")
+    if not upload or upload.filename == "":
+        return jsonify({"message": "No file provided."}), HTTPStatus.BAD_REQUEST
+
+    fmt = request.args.get("format", "").strip().lower()
+    if not fmt:
+        name = upload.filename.lower().removesuffix(".gz")
+        fmt = "ndjson" if name.endswith((".ndjson", ".jsonl")) else "csv"
+    if fmt not in ("csv", "ndjson"):
+        return jsonify({"message": "Format must be csv or ndjson."}), HTTPStatus.BAD_REQUEST
+
+    result = StudentImportService.import_stream(upload.stream, fmt)
+    if result["error"]:
+        return jsonify({"message": result["error"]}), result["status"]
+
+    return jsonify(result["data"]), HTTPStatus.OK
+
+
+@students_bp.post("/batch")
+def batch_students():
+    """POST /api/students/batch - apply create/update/delete operations in one transaction."""
+    payload = request.get_json(silent=True) or {}
+    operations, error = parse_batch_operations(payload)
+    if error:
+        return jsonify({"message": error}), HTTPStatus.BAD_REQUEST
+
+    result = StudentService.apply_batch(operations, atomic=bool(payload.get("atomic")))
+    if result["error"]:
+        return jsonify({"message": result["error"]}), result["status"]
+
+    wake_storage_outbox()
+    return jsonify({"results": result["data"]}), HTTPStatus.OK
+
+
+@students_bp.post("/rename")
+def rename_students():
+    """POST /api/students/rename - change many student IDs at once: {"renames": [{"from": ..., "to": ...}]}."""
+    payload = request.get_json(silent=True) or {}
+    result = StudentService.rename_many(payload.get("renames"))
+    if result["error"]:
+        return jsonify({"message": result["error"]}), result["status"]
+
+    return jsonify(result["data"]), HTTPStatus.OK
+
+
 @students_bp.post("")
 def create_student():
     data = request.get_json() or {}
@@ -85,99 +220,165 @@ def create_student():
 def update_student(student_id: str):
     data = request.get_json() or {}
 
-    existing_student = StudentService.get_by_id(student_id)
-    if not existing_student:
-        return jsonify({"message": "Student not found."}), HTTPStatus.NOT_FOUND
-
-    old_photo = None
-    if isinstance(existing_student, dict):
-        old_photo = existing_student.get("photo")
-    else:
-        old_photo = getattr(existing_student, "photo", None)
-
-    new_photo_in_payload = "photo" in data
-    new_photo = data.get("photo") if new_photo_in_payload else None
-
     result = StudentService.update_from_request(student_id, data)
     if result["error"]:
         return jsonify({"message": result["error"]}), result["status"]
 
-    try:
-        if new_photo_in_payload and old_photo:
-            should_delete_old = False
-            if new_photo in ("", None):
-                should_delete_old = True
-            elif isinstance(new_photo, str) and new_photo != old_photo:
-                should_delete_old = True
-
-            if should_delete_old:
-                try:
-                    delete_object(old_photo)
-                except Exception as e:
-                    current_app.logger.warning(f"Failed to delete old student photo '{old_photo}': {e}")
-    except Exception:
-        current_app.logger.exception("Error while handling student photo cleanup after update.")
-
+    # A replaced or cleared photo was queued for deletion in the same transaction
+    wake_storage_outbox()
     return jsonify(result["data"]), HTTPStatus.OK
 
 
 @students_bp.delete("/<string:student_id>")
 def delete_student(student_id: str):
-    student = StudentService.get_by_id(student_id)
-    if not student:
-        return jsonify({"message": "Student not found."}), HTTPStatus.NOT_FOUND
-
-    photo_path = None
-    if isinstance(student, dict):
-        photo_path = student.get("photo")
-    else:
-        photo_path = getattr(student, "photo", None)
-
     result = StudentService.delete_by_id(student_id)
     if result["error"]:
         return jsonify({"message": result["error"]}), result["status"]
 
-    if photo_path:
-        try:
-            delete_object(photo_path)
-        except Exception as e:
-            current_app.logger.warning(f"Failed to delete student photo '{photo_path}' after student removal: {e}")
-
+    wake_storage_outbox()
     return ("", HTTPStatus.NO_CONTENT)
 
 
 @students_bp.post("/upload-photo")
 def upload_student_photo():
-    if "photo" not in request.files:
-        return jsonify({"message": "No file provided."}), HTTPStatus.BAD_REQUEST
+    """
+    POST /api/students/upload-photo - store a student photo and return its path.
+    Accepts multipart form data (field "photo") or the raw image as the request body
+    (Content-Type image/*, extension from ?filename=). Oversize uploads are refused from
+    Content-Length before the body is read and cut off as soon as the limit is passed;
+    the file is streamed to storage in chunks instead of being held in memory. An image
+    already in storage (same SHA-256) is not stored again; its path is returned.
+    """
+    limit = current_app.config["MAX_PHOTO_BYTES"]
+
+    if request.mimetype.startswith("image/"):
+        if request.content_length is not None and request.content_length > limit:
+            return photo_too_large()
+        body = LimitedReader(request.stream, limit, request.content_length)
+        return store_student_photo(body, request.args.get("filename", ""), request.mimetype)
+
+    if request.content_length is not None and request.content_length > limit + MULTIPART_OVERHEAD:
+        return photo_too_large()
+    # Makes the form parser stop reading once the body passes the limit
+    request.max_content_length = limit + MULTIPART_OVERHEAD
 
-    file = request.files["photo"]
+    try:
+        file = request.files.get("photo")
+    except RequestEntityTooLarge:
+        return photo_too_large()
 
     if not file or file.filename == "":
         return jsonify({"message": "No file provided."}), HTTPStatus.BAD_REQUEST
 
-    data = file.read()
-    MAX_BYTES = 5 * 1024 * 1024
-    if len(data) > MAX_BYTES:
-        return jsonify({"message": "File size exceeds 5 MB limit."}), HTTPStatus.BAD_REQUEST
+    # Werkzeug spools parts over 500 KB to a temporary file, so this is not held in memory
+    if stream_size(file.stream) > limit:
+        return photo_too_large()
+
+    return store_student_photo(file.stream, file.filename, file.mimetype)
+
 
-    raw_ext = file.filename.rsplit(".", 1)[-1] if "." in file.filename else "jpg"
-    ext = re.sub(r"[^a-zA-Z0-9]", "", raw_ext).lower() or "jpg"
+def photo_too_large():
+    limit = current_app.config["MAX_PHOTO_BYTES"]
+    return jsonify({"message": f"File size exceeds {limit // (1024 * 1024)} MB limit."}), HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+
+
+def store_student_photo(body, filename: str, content_type: str):
+    try:
+        sha256, body = hash_upload(body)
+    except UploadTooLarge:
+        return photo_too_large()
 
-    uid = uuid.uuid4().hex
-    dest_path = f"student_photos/{uid}.{ext}"
+    storage = get_storage()
+    # The same image uploaded again (e.g. a form redone) reuses the stored copy
+    existing_path = find_photo_by_hash(sha256)
+    if existing_path:
+        return jsonify({"path": existing_path, "publicUrl": storage.get_public_url(existing_path)}), HTTPStatus.OK
 
+    dest_path = new_photo_path(filename)
     try:
-        upload_object(data, dest_path, content_type=file.mimetype)
+        storage.upload(body, dest_path, content_type=content_type)
     except Exception as e:
         current_app.logger.exception("Failed to upload student photo via server-side helper")
         return jsonify({"message": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
 
-    public_url = get_public_url(dest_path)
+    register_photo_hash(dest_path, sha256)
+    submit_image_variants(dest_path)
+    public_url = storage.get_public_url(dest_path)
     return jsonify({"path": dest_path, "publicUrl": public_url}), HTTPStatus.OK
 
 
+@students_bp.post("/photo-uploads")
+def create_photo_upload():
+    """
+    POST /api/students/photo-uploads - start a direct-to-storage upload.
+    Expects JSON {"filename", "content_type", "size"}. Returns a signed URL the client
+    PUTs the file to, the storage path and a token for POST /api/students/<id>/photo;
+    the file itself never passes through this server.
+    """
+    data = request.get_json(silent=True) or {}
+    filename = str(data.get("filename") or "")
+    content_type = str(data.get("content_type") or "")
+
+    if not content_type.startswith("image/"):
+        return jsonify({"message": "Only image files are allowed."}), HTTPStatus.BAD_REQUEST
+    try:
+        size = int(data.get("size"))
+    except (TypeError, ValueError):
+        return jsonify({"message": "File size is required."}), HTTPStatus.BAD_REQUEST
+    if size > current_app.config["MAX_PHOTO_BYTES"]:
+        return photo_too_large()
+
+    dest_path = new_photo_path(filename)
+    try:
+        upload_url = get_storage().signed_upload_url(dest_path)
+    except Exception as e:
+        current_app.logger.exception("Failed to sign student photo upload")
+        return jsonify({"message": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+    return jsonify({
+        "path": dest_path,
+        "uploadUrl": upload_url,
+        "token": sign_photo_upload(dest_path),
+        "expiresIn": current_app.config["PHOTO_UPLOAD_TOKEN_SECONDS"],
+        "publicUrl": get_storage().get_public_url(dest_path),
+    }), HTTPStatus.OK
+
+
+@students_bp.post("/<string:student_id>/photo")
+def confirm_student_photo(student_id: str):
+    """
+    POST /api/students/<id>/photo - attach a directly uploaded photo: {"path", "token"}.
+    Checks the token issued with the upload URL and the object's size from storage
+    metadata; the bytes are not read here. The variant job hashes the photo in the
+    background so identical uploads can reuse it. The previous photo is queued for deletion.
+    """
+    data = request.get_json(silent=True) or {}
+    path = str(data.get("path") or "")
+    if not path or not verify_photo_upload(str(data.get("token") or ""), path):
+        return jsonify({"message": "Invalid or expired upload token."}), HTTPStatus.BAD_REQUEST
+
+    try:
+        size = get_storage().size(path)
+    except Exception as e:
+        current_app.logger.exception("Failed to check uploaded student photo")
+        return jsonify({"message": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+    if size is None:
+        return jsonify({"message": "Uploaded photo not found."}), HTTPStatus.NOT_FOUND
+    if size > current_app.config["MAX_PHOTO_BYTES"]:
+        enqueue_storage_deletes([path])
+        return photo_too_large()
+
+    result = StudentService.update_from_request(student_id, {"photo": path})
+    if result["error"]:
+        return jsonify({"message": result["error"]}), result["status"]
+
+    submit_image_variants(path)
+    wake_storage_outbox()
+    return jsonify(result["data"]), HTTPStatus.OK
+
+
 @students_bp.get("/programs/<int:college_id>")
+@versioned_etag("programs")
 def get_programs_by_college(college_id: int):
     result = StudentService.get_programs_by_college(college_id)
 
@@ -196,13 +397,9 @@ def remove_student_photo(student_id: str):
     if not photo_path:
         return jsonify({"message": "Student has no photo to remove."}), HTTPStatus.BAD_REQUEST
 
-    try:
-        delete_object(photo_path)
-    except Exception as e:
-        current_app.logger.warning(f"Failed to delete storage object '{photo_path}' for student '{student_id}': {e}")
-
     result = StudentService.clear_photo(student_id)
     if result["error"]:
         return jsonify({"message": result["error"]}), result["status"]
 
+    wake_storage_outbox()
     return ("", HTTPStatus.NO_CONTENT)
\ No newline at end of file
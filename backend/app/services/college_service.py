@@ -1,12 +1,36 @@
 from http import HTTPStatus
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 from sqlalchemy import text
 from sqlalchemy.exc import IntegrityError
 
 from .. import db
+from ..utils.batch import fail_pending, operation_result, ordered_results
+from ..utils.pagination import ListStatements, json_page_sql, keyset_clause, list_page, order_by_clause
+from ..utils.query_cache import cached_statement
+from ..utils.reference_cache import invalidate_reference_data, reference_data
+from ..utils.search import relevance_expression, substring_clause, trigram_enabled
 from ..utils.validators import validate_college_code_unique
 
+# Columns of a list_all row, in order; page queries select exactly these first
+COLLEGE_LIST_COLUMNS = ("id", "code", "name")
+
+COLLEGE_SEARCH_COLUMNS = {
+    "all": ("code", "name"),
+    "code": ("code",),
+    "name": ("name",),
+}
+
+COLLEGE_SORT_COLUMNS = {
+    "code": "code",
+    "name": "name",
+}
+
+COLLEGE_SUGGEST_CANDIDATES = (
+    ("colleges", "code"),
+    ("colleges", "name"),
+)
+
 
 class CollegeService:
 
@@ -17,84 +41,113 @@ class CollegeService:
         sort_by: str = "",
         order: str = "asc",
         search: str = "",
-        search_by: str = "all"
+        search_by: str = "all",
+        after: Optional[str] = None,
+        before: Optional[str] = None,
+        total_mode: Optional[str] = None,
+        render: str = "python",
     ) -> Dict:
         try:
-            where_clauses = []
             params = {}
 
             if search:
                 params["search"] = f"%{search}%"
-                if search_by == "all":
-                    where_clauses.append("(code ILIKE :search OR name ILIKE :search)")
-                elif search_by == "code":
-                    where_clauses.append("code ILIKE :search")
-                elif search_by == "name":
-                    where_clauses.append("name ILIKE :search")
-
-            where_sql = ""
-            if where_clauses:
-                where_sql = "WHERE " + " AND ".join(where_clauses)
-
-            count_sql = text(f"SELECT COUNT(*) AS total FROM colleges {where_sql}")
-            total = db.session.execute(count_sql, params).scalar() or 0
-
-            order_clause = ""
-            if sort_by in ("code", "name"):
-                col = "code" if sort_by == "code" else "name"
-                direction = "DESC" if order == "desc" else "ASC"
-                order_clause = f"ORDER BY {col} {direction}"
-
-            offset = (page - 1) * per_page
-            params.update({"limit": per_page, "offset": offset})
-
-            data_sql = text(
-                f"SELECT id, code, name FROM colleges {where_sql} {order_clause} LIMIT :limit OFFSET :offset"
-            )
-            rows = db.session.execute(data_sql, params).mappings().all()
-
-            colleges = [{"id": r["id"], "code": r["code"], "name": r["name"]} for r in rows]
+                params["search_term"] = search
+                if search_by not in COLLEGE_SEARCH_COLUMNS:
+                    search_by = "all"
+            else:
+                search_by = None
 
-            total_pages = (total + per_page - 1) // per_page if per_page > 0 else 1
-            has_next = page < total_pages
-            has_prev = page > 1
+            sort_key = sort_by if sort_by in COLLEGE_SORT_COLUMNS else ""
+            if not sort_key and search_by and trigram_enabled():
+                # Rank matches by similarity when the caller did not ask for a column sort
+                sort_key = "relevance"
+                order = "desc"
 
-            return {
-                "data": colleges,
-                "pagination": {
-                    "page": page,
-                    "per_page": per_page,
-                    "total": total,
-                    "total_pages": total_pages,
-                    "has_next": has_next,
-                    "has_prev": has_prev,
-                },
-                "error": None,
-                "status": HTTPStatus.OK,
-            }
+            return list_page(
+                ListStatements(
+                    count=lambda estimate: CollegeService._count_statement(search_by, estimate),
+                    page=lambda direction, window: CollegeService._page_statement(search_by, sort_key, order, direction, window),
+                    json_page=lambda direction, window: CollegeService._json_page_statement(
+                        search_by, sort_key, order, direction, window
+                    ),
+                ),
+                COLLEGE_LIST_COLUMNS,
+                params,
+                sort_key,
+                order,
+                page=page,
+                per_page=per_page,
+                after=after,
+                before=before,
+                total_mode=total_mode,
+                render=render,
+                search=search,
+                suggest_candidates=COLLEGE_SUGGEST_CANDIDATES,
+            )
         except Exception:
             return {
                 "data": None,
+                "suggestions": [],
                 "pagination": None,
                 "error": "Failed to retrieve colleges.",
                 "status": HTTPStatus.INTERNAL_SERVER_ERROR,
             }
 
+    @staticmethod
+    def _where_sql(search_by: Optional[str], keyset: Optional[str] = None) -> str:
+        where_clauses = []
+        if search_by:
+            where_clauses.append(substring_clause(COLLEGE_SEARCH_COLUMNS[search_by]))
+        if keyset:
+            where_clauses.append(keyset)
+        if not where_clauses:
+            return ""
+        return "WHERE " + " AND ".join(where_clauses)
+
+    @staticmethod
+    @cached_statement()
+    def _count_statement(search_by: Optional[str], estimate: bool) -> str:
+        where_sql = CollegeService._where_sql(search_by)
+        if estimate:
+            return f"EXPLAIN (FORMAT JSON) SELECT 1 FROM colleges {where_sql}"
+        return f"SELECT COUNT(*) AS total FROM colleges {where_sql}"
+
+    @staticmethod
+    @cached_statement()
+    def _page_statement(search_by: Optional[str], sort_key: str, order: str, direction: Optional[str], window: bool) -> str:
+        if sort_key == "relevance":
+            sort_col = relevance_expression(COLLEGE_SEARCH_COLUMNS[search_by])
+        else:
+            sort_col = COLLEGE_SORT_COLUMNS.get(sort_key)
+        backwards = direction == "before"
+        keyset = keyset_clause(sort_col, "id", order, backwards) if direction else None
+
+        sort_key_sql = f", {sort_col} AS sort_key" if sort_col else ""
+        window_sql = ", COUNT(*) OVER () AS total_count" if window else ""
+        return (
+            f"SELECT id, code, name{sort_key_sql}{window_sql} FROM colleges "
+            f"{CollegeService._where_sql(search_by, keyset)} "
+            f"{order_by_clause(sort_col, 'id', order, backwards)} "
+            f"LIMIT :limit OFFSET :offset"
+        )
+
+    @staticmethod
+    @cached_statement()
+    def _json_page_statement(search_by: Optional[str], sort_key: str, order: str, direction: Optional[str], window: bool) -> str:
+        page_sql = CollegeService._page_statement(search_by, sort_key, order, direction, window).text
+        keyed = sort_key == "relevance" or sort_key in COLLEGE_SORT_COLUMNS
+        return json_page_sql(page_sql, COLLEGE_LIST_COLUMNS, keyed, order, direction == "before", window)
+
     @staticmethod
     def get_by_id(college_id: int) -> Optional[Dict]:
-        sql = text("SELECT id, code, name FROM colleges WHERE id = :id")
-        row = db.session.execute(sql, {"id": college_id}).mappings().first()
-        if not row:
-            return None
-        return {"id": row["id"], "code": row["code"], "name": row["name"]}
+        row = reference_data().colleges_by_id.get(college_id)
+        return dict(row) if row else None
 
     @staticmethod
     def get_by_code(code: str) -> Optional[Dict]:
-        sql = text("SELECT id, code, name FROM colleges WHERE code ILIKE :code LIMIT 1")
-        row = db.session.execute(sql, {"code": code.strip()}).mappings().first()
-        if not row:
-            return None
-        return {"id": row["id"], "code": row["code"], "name": row["name"]}
+        row = reference_data().colleges_by_code.get(code.strip().upper())
+        return dict(row) if row else None
 
     @staticmethod
     def create_from_request(data: Dict) -> Dict:
@@ -124,6 +177,7 @@ class CollegeService:
             result = db.session.execute(insert_sql, {"code": code, "name": name})
             row = result.mappings().first()
             db.session.commit()
+            invalidate_reference_data()
             return {"data": {"id": row["id"], "code": row["code"], "name": row["name"]}, "error": None, "status": HTTPStatus.CREATED}
         except IntegrityError:
             db.session.rollback()
@@ -175,6 +229,7 @@ class CollegeService:
                 db.session.rollback()
                 return {"data": None, "error": "College not found.", "status": HTTPStatus.NOT_FOUND}
             db.session.commit()
+            invalidate_reference_data()
             return {"data": {"id": row["id"], "code": row["code"], "name": row["name"]}, "error": None, "status": HTTPStatus.OK}
         except IntegrityError:
             db.session.rollback()
@@ -193,7 +248,163 @@ class CollegeService:
             delete_sql = text("DELETE FROM colleges WHERE id = :id")
             db.session.execute(delete_sql, {"id": college_id})
             db.session.commit()
+            invalidate_reference_data()
             return {"error": None, "status": HTTPStatus.NO_CONTENT}
         except Exception:
             db.session.rollback()
-            return {"error": "Failed to delete college.", "status": HTTPStatus.INTERNAL_SERVER_ERROR}
\ No newline at end of file
+            return {"error": "Failed to delete college.", "status": HTTPStatus.INTERNAL_SERVER_ERROR}
+
+    @staticmethod
+    def apply_batch(operations: List[Dict], atomic: bool = False) -> Dict:
+        """
+        Apply create/update/delete operations in a single transaction using set-based SQL
+        (unnest-based INSERT and UPDATE, DELETE ... WHERE id = ANY(...)).
+        Each college ID and college code may appear once per batch.
+        With atomic=True nothing is written if any operation fails validation.
+        """
+        results: Dict[int, Dict] = {}
+        creates, updates, deletes = [], [], []
+        claimed_ids = set()
+        claimed_codes = set()
+
+        for op in operations:
+            index, data = op["index"], op["data"]
+            college_id = None
+            if op["op"] != "create":
+                try:
+                    college_id = int(op["id"])
+                except (ValueError, TypeError):
+                    results[index] = operation_result(index, HTTPStatus.BAD_REQUEST, error="Invalid college ID.")
+                    continue
+                if college_id in claimed_ids:
+                    results[index] = operation_result(
+                        index, HTTPStatus.BAD_REQUEST, error=f"College {college_id} appears more than once in the batch."
+                    )
+                    continue
+                claimed_ids.add(college_id)
+
+            fields = {}
+            if op["op"] != "delete":
+                for key, label in (("code", "College code"), ("name", "College name")):
+                    value = data.get(key)
+                    if op["op"] == "create" or value is not None:
+                        value = str(value or "").strip()
+                        if not value:
+                            fields = None
+                            results[index] = operation_result(index, HTTPStatus.BAD_REQUEST, error=f"{label} cannot be empty.")
+                            break
+                        fields[key] = value
+                if fields is None:
+                    continue
+                code = fields.get("code", "").upper()
+                if code and code in claimed_codes:
+                    results[index] = operation_result(
+                        index, HTTPStatus.BAD_REQUEST, error=f"College code '{code}' appears more than once in the batch."
+                    )
+                    continue
+                if code:
+                    claimed_codes.add(code)
+
+            if op["op"] == "create":
+                creates.append((index, fields))
+            elif op["op"] == "update":
+                updates.append((index, college_id, fields))
+            else:
+                deletes.append((index, college_id))
+
+        # Lock the colleges the batch touches; codes are checked against the reference cache
+        current = {}
+        if claimed_ids:
+            rows = db.session.execute(
+                text("SELECT id, code, name FROM colleges WHERE id = ANY(:ids) FOR UPDATE"),
+                {"ids": list(claimed_ids)},
+            ).mappings().all()
+            current = {r["id"]: dict(r) for r in rows}
+
+        colleges_by_code = reference_data().colleges_by_code
+        code_owners = {code: colleges_by_code[code]["id"] for code in claimed_codes if code in colleges_by_code}
+
+        new_rows = []
+        for index, fields in creates:
+            if fields["code"].upper() in code_owners:
+                results[index] = operation_result(
+                    index, HTTPStatus.CONFLICT, error=f"College code '{fields['code'].upper()}' already exists."
+                )
+            else:
+                new_rows.append((index, fields))
+
+        changed_rows = []
+        for index, college_id, fields in updates:
+            existing = current.get(college_id)
+            if not existing:
+                results[index] = operation_result(index, HTTPStatus.NOT_FOUND, error="College not found.")
+                continue
+            owner = code_owners.get(fields.get("code", "").upper())
+            if owner is not None and owner != college_id:
+                results[index] = operation_result(
+                    index, HTTPStatus.CONFLICT, error=f"College code '{fields['code'].upper()}' already exists."
+                )
+                continue
+            changed_rows.append((index, {**existing, **fields}))
+
+        removed = []
+        for index, college_id in deletes:
+            if college_id not in current:
+                results[index] = operation_result(index, HTTPStatus.NOT_FOUND, error="College not found.")
+            else:
+                removed.append((index, college_id))
+
+        pending = [i for i, _ in new_rows] + [i for i, _ in changed_rows] + [i for i, _ in removed]
+        if atomic and results:
+            fail_pending(results, pending, HTTPStatus.FAILED_DEPENDENCY, "Not applied: another operation in the batch failed.")
+            return {"data": ordered_results(results), "error": None, "status": HTTPStatus.OK}
+
+        try:
+            if new_rows:
+                rows = db.session.execute(
+                    text(
+                        "INSERT INTO colleges (code, name) "
+                        "SELECT * FROM unnest(CAST(:codes AS varchar[]), CAST(:names AS varchar[])) "
+                        "RETURNING id, code, name"
+                    ),
+                    {"codes": [f["code"] for _, f in new_rows], "names": [f["name"] for _, f in new_rows]},
+                ).mappings().all()
+                by_code = {r["code"].upper(): r for r in rows}
+                for index, fields in new_rows:
+                    results[index] = operation_result(index, HTTPStatus.CREATED, dict(by_code[fields["code"].upper()]))
+
+            if changed_rows:
+                rows = db.session.execute(
+                    text(
+                        "UPDATE colleges c SET code = v.code, name = v.name "
+                        "FROM unnest(CAST(:ids AS integer[]), CAST(:codes AS varchar[]), CAST(:names AS varchar[])) "
+                        "AS v(id, code, name) WHERE c.id = v.id RETURNING c.id, c.code, c.name"
+                    ),
+                    {
+                        "ids": [r["id"] for _, r in changed_rows],
+                        "codes": [r["code"] for _, r in changed_rows],
+                        "names": [r["name"] for _, r in changed_rows],
+                    },
+                ).mappings().all()
+                by_id = {r["id"]: r for r in rows}
+                for index, merged in changed_rows:
+                    results[index] = operation_result(index, HTTPStatus.OK, dict(by_id[merged["id"]]))
+
+            if removed:
+                db.session.execute(
+                    text("DELETE FROM colleges WHERE id = ANY(:ids)"), {"ids": [college_id for _, college_id in removed]}
+                )
+                for index, _ in removed:
+                    results[index] = operation_result(index, HTTPStatus.NO_CONTENT)
+
+            db.session.commit()
+
+            invalidate_reference_data()
+        except IntegrityError:
+            db.session.rollback()
+            fail_pending(results, pending, HTTPStatus.CONFLICT, "A college with this code already exists.")
+        except Exception:
+            db.session.rollback()
+            return {"data": None, "error": "Failed to apply batch.", "status": HTTPStatus.INTERNAL_SERVER_ERROR}
+
+        return {"data": ordered_results(results), "error": None, "status": HTTPStatus.OK}
\ No newline at end of file
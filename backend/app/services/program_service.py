@@ -1,12 +1,52 @@
 from http import HTTPStatus
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 
 from sqlalchemy import text
 from sqlalchemy.exc import IntegrityError
 
 from .. import db
+from ..utils.batch import fail_pending, operation_result, ordered_results
+from ..utils.pagination import ListStatements, json_page_sql, keyset_clause, list_page, order_by_clause
+from ..utils.query_cache import cached_statement
+from ..utils.reference_cache import invalidate_reference_data, reference_data
+from ..utils.search import relevance_expression, trigram_enabled
 from ..utils.validators import validate_program_code_unique
 
+PROGRAM_FROM_SQL = "FROM programs p LEFT JOIN colleges c ON p.college_id = c.id"
+
+# Columns of a list_all row, in order; page queries select exactly these first
+PROGRAM_LIST_COLUMNS = ("id", "college_id", "college_name", "code", "name")
+
+# College code matches go through an id sub-select so each branch can use its own trigram index
+PROGRAM_SEARCH_CLAUSES = {
+    "all": (
+        "(p.code ILIKE :search OR p.name ILIKE :search "
+        "OR p.college_id IN (SELECT id FROM colleges WHERE code ILIKE :search))"
+    ),
+    "code": "p.code ILIKE :search",
+    "name": "p.name ILIKE :search",
+    "college": "p.college_id IN (SELECT id FROM colleges WHERE code ILIKE :search)",
+}
+
+PROGRAM_RANK_COLUMNS = {
+    "all": ("p.code", "p.name", "c.code"),
+    "code": ("p.code",),
+    "name": ("p.name",),
+    "college": ("c.code",),
+}
+
+PROGRAM_SORT_COLUMNS = {
+    "code": "p.code",
+    "name": "p.name",
+    "college": "COALESCE(c.code, '')",
+}
+
+PROGRAM_SUGGEST_CANDIDATES = (
+    ("programs", "code"),
+    ("programs", "name"),
+    ("colleges", "code"),
+)
+
 
 class ProgramService:
 
@@ -17,107 +57,115 @@ class ProgramService:
         sort_by: str = "",
         order: str = "asc",
         search: str = "",
-        search_by: str = "all"
+        search_by: str = "all",
+        after: Optional[str] = None,
+        before: Optional[str] = None,
+        total_mode: Optional[str] = None,
+        render: str = "python",
     ) -> Dict:
         try:
-            where_clauses = []
             params = {}
 
             if search:
                 params["search"] = f"%{search}%"
-                if search_by == "all":
-                    where_clauses.append("(p.code ILIKE :search OR p.name ILIKE :search OR c.code ILIKE :search)")
-                elif search_by == "code":
-                    where_clauses.append("p.code ILIKE :search")
-                elif search_by == "name":
-                    where_clauses.append("p.name ILIKE :search")
-                elif search_by == "college":
-                    where_clauses.append("(c.code ILIKE :search)")
-
-            where_sql = ""
-            if where_clauses:
-                where_sql = "WHERE " + " AND ".join(where_clauses)
-
-            count_sql = text(f"SELECT COUNT(*) AS total FROM programs p LEFT JOIN colleges c ON p.college_id = c.id {where_sql}")
-            total = db.session.execute(count_sql, params).scalar() or 0
-
-            order_clause = ""
-            if sort_by in ("code", "name", "college"):
-                if sort_by == "code":
-                    col = "p.code"
-                elif sort_by == "name":
-                    col = "p.name"
-                else:
-                    col = "COALESCE(c.code, '')"
-                direction = "DESC" if order == "desc" else "ASC"
-                order_clause = f"ORDER BY {col} {direction}"
-
-            offset = (page - 1) * per_page
-            params.update({"limit": per_page, "offset": offset})
-
-            data_sql = text(
-                f"""
-                SELECT p.id, p.college_id, p.code, p.name,
-                       c.name AS college_name, c.code AS college_code
-                FROM programs p
-                LEFT JOIN colleges c ON p.college_id = c.id
-                {where_sql}
-                {order_clause}
-                LIMIT :limit OFFSET :offset
-                """
+                params["search_term"] = search
+                if search_by not in PROGRAM_SEARCH_CLAUSES:
+                    search_by = "all"
+            else:
+                search_by = None
+
+            sort_key = sort_by if sort_by in PROGRAM_SORT_COLUMNS else ""
+            if not sort_key and search_by and trigram_enabled():
+                # Rank matches by similarity when the caller did not ask for a column sort
+                sort_key = "relevance"
+                order = "desc"
+
+            return list_page(
+                ListStatements(
+                    count=lambda estimate: ProgramService._count_statement(search_by, estimate),
+                    page=lambda direction, window: ProgramService._page_statement(search_by, sort_key, order, direction, window),
+                    json_page=lambda direction, window: ProgramService._json_page_statement(
+                        search_by, sort_key, order, direction, window
+                    ),
+                ),
+                PROGRAM_LIST_COLUMNS,
+                params,
+                sort_key,
+                order,
+                page=page,
+                per_page=per_page,
+                after=after,
+                before=before,
+                total_mode=total_mode,
+                render=render,
+                search=search,
+                suggest_candidates=PROGRAM_SUGGEST_CANDIDATES,
             )
-
-            rows = db.session.execute(data_sql, params).mappings().all()
-            programs = []
-            for r in rows:
-                programs.append({
-                    "id": r["id"],
-                    "college_id": r["college_id"],
-                    "college_name": r["college_name"] if r["college_name"] is not None else "Not Applicable",
-                    "code": r["code"],
-                    "name": r["name"],
-                })
-
-            total_pages = (total + per_page - 1) // per_page if per_page > 0 else 1
-            has_next = page < total_pages
-            has_prev = page > 1
-
-            return {
-                "data": programs,
-                "pagination": {
-                    "page": page,
-                    "per_page": per_page,
-                    "total": total,
-                    "total_pages": total_pages,
-                    "has_next": has_next,
-                    "has_prev": has_prev,
-                },
-                "error": None,
-                "status": HTTPStatus.OK,
-            }
         except Exception:
             return {
                 "data": None,
+                "suggestions": [],
                 "pagination": None,
                 "error": "Failed to retrieve programs.",
                 "status": HTTPStatus.INTERNAL_SERVER_ERROR,
             }
 
+    @staticmethod
+    def _where_sql(search_by: Optional[str], keyset: Optional[str] = None) -> str:
+        where_clauses = []
+        if search_by:
+            where_clauses.append(PROGRAM_SEARCH_CLAUSES[search_by])
+        if keyset:
+            where_clauses.append(keyset)
+        if not where_clauses:
+            return ""
+        return "WHERE " + " AND ".join(where_clauses)
+
+    @staticmethod
+    @cached_statement()
+    def _count_statement(search_by: Optional[str], estimate: bool) -> str:
+        where_sql = ProgramService._where_sql(search_by)
+        if estimate:
+            return f"EXPLAIN (FORMAT JSON) SELECT 1 {PROGRAM_FROM_SQL} {where_sql}"
+        return f"SELECT COUNT(*) AS total {PROGRAM_FROM_SQL} {where_sql}"
+
+    @staticmethod
+    @cached_statement()
+    def _page_statement(search_by: Optional[str], sort_key: str, order: str, direction: Optional[str], window: bool) -> str:
+        if sort_key == "relevance":
+            sort_col = relevance_expression(PROGRAM_RANK_COLUMNS[search_by])
+        else:
+            sort_col = PROGRAM_SORT_COLUMNS.get(sort_key)
+        backwards = direction == "before"
+        keyset = keyset_clause(sort_col, "p.id", order, backwards) if direction else None
+
+        sort_key_sql = f", {sort_col} AS sort_key" if sort_col else ""
+        window_sql = ", COUNT(*) OVER () AS total_count" if window else ""
+        return f"""
+            SELECT p.id, p.college_id, COALESCE(c.name, 'Not Applicable') AS college_name,
+                   p.code, p.name{sort_key_sql}{window_sql}
+            {PROGRAM_FROM_SQL}
+            {ProgramService._where_sql(search_by, keyset)}
+            {order_by_clause(sort_col, "p.id", order, backwards)}
+            LIMIT :limit OFFSET :offset
+        """
+
+    @staticmethod
+    @cached_statement()
+    def _json_page_statement(search_by: Optional[str], sort_key: str, order: str, direction: Optional[str], window: bool) -> str:
+        page_sql = ProgramService._page_statement(search_by, sort_key, order, direction, window).text
+        keyed = sort_key == "relevance" or sort_key in PROGRAM_SORT_COLUMNS
+        return json_page_sql(page_sql, PROGRAM_LIST_COLUMNS, keyed, order, direction == "before", window)
+
     @staticmethod
     def get_by_id(program_id: int) -> Optional[Dict]:
-        sql = text("SELECT id, college_id, code, name FROM programs WHERE id = :id")
-        row = db.session.execute(sql, {"id": program_id}).mappings().first()
-        if not row:
-            return None
-        return {"id": row["id"], "college_id": row["college_id"], "code": row["code"], "name": row["name"]}
+        row = reference_data().programs_by_id.get(program_id)
+        return dict(row) if row else None
 
     @staticmethod
     def get_by_code(code: str) -> Optional[Dict]:
-        sql = text("SELECT id, college_id, code, name FROM programs WHERE code ILIKE :code LIMIT 1")
-        row = db.session.execute(sql, {"code": code.strip()}).mappings().first()
-        if not row:
-            return None
-        return {"id": row["id"], "college_id": row["college_id"], "code": row["code"], "name": row["name"]}
+        row = reference_data().programs_by_code.get(code.strip().upper())
+        return dict(row) if row else None
 
     @staticmethod
     def create_from_request(data: Dict) -> Dict:
@@ -135,8 +183,7 @@ class ProgramService:
         if not code or not name:
             return {"data": None, "error": "Both 'code' and 'name' are required.", "status": HTTPStatus.BAD_REQUEST}
 
-        found = db.session.execute(text("SELECT id FROM colleges WHERE id = :id"), {"id": college_id}).scalar()
-        if not found:
+        if college_id not in reference_data().colleges_by_id:
             return {"data": None, "error": "College not found.", "status": HTTPStatus.NOT_FOUND}
 
         is_valid, error_msg = validate_program_code_unique(code)
@@ -151,6 +198,7 @@ class ProgramService:
             result = db.session.execute(insert_sql, {"college_id": college_id, "code": code, "name": name})
             row = result.mappings().first()
             db.session.commit()
+            invalidate_reference_data()
             return {"data": {"id": row["id"], "college_id": row["college_id"], "code": row["code"], "name": row["name"]}, "error": None, "status": HTTPStatus.CREATED}
         except IntegrityError:
             db.session.rollback()
@@ -180,8 +228,7 @@ class ProgramService:
                     college_id = int(college_id)
                 except (ValueError, TypeError):
                     return {"data": None, "error": "College not found.", "status": HTTPStatus.NOT_FOUND}
-                found = db.session.execute(text("SELECT id FROM colleges WHERE id = :id"), {"id": college_id}).scalar()
-                if not found:
+                if college_id not in reference_data().colleges_by_id:
                     return {"data": None, "error": "College not found.", "status": HTTPStatus.NOT_FOUND}
                 set_clauses.append("college_id = :college_id")
                 params["college_id"] = college_id
@@ -215,6 +262,7 @@ class ProgramService:
                 db.session.rollback()
                 return {"data": None, "error": "Program not found.", "status": HTTPStatus.NOT_FOUND}
             db.session.commit()
+            invalidate_reference_data()
             return {"data": {"id": row["id"], "college_id": row["college_id"], "code": row["code"], "name": row["name"]}, "error": None, "status": HTTPStatus.OK}
         except IntegrityError:
             db.session.rollback()
@@ -232,7 +280,194 @@ class ProgramService:
         try:
             db.session.execute(text("DELETE FROM programs WHERE id = :id"), {"id": program_id})
             db.session.commit()
+            invalidate_reference_data()
             return {"error": None, "status": HTTPStatus.NO_CONTENT}
         except Exception:
             db.session.rollback()
-            return {"error": "Failed to delete program.", "status": HTTPStatus.INTERNAL_SERVER_ERROR}
\ No newline at end of file
+            return {"error": "Failed to delete program.", "status": HTTPStatus.INTERNAL_SERVER_ERROR}
+
+    @staticmethod
+    def apply_batch(operations: List[Dict], atomic: bool = False) -> Dict:
+        """
+        Apply create/update/delete operations in a single transaction using set-based SQL
+        (unnest-based INSERT and UPDATE, DELETE ... WHERE id = ANY(...)).
+        Each program ID and program code may appear once per batch.
+        With atomic=True nothing is written if any operation fails validation.
+        """
+        results: Dict[int, Dict] = {}
+        creates, updates, deletes = [], [], []
+        claimed_ids = set()
+        claimed_codes = set()
+
+        for op in operations:
+            index, data = op["index"], op["data"]
+            program_id = None
+            if op["op"] != "create":
+                try:
+                    program_id = int(op["id"])
+                except (ValueError, TypeError):
+                    results[index] = operation_result(index, HTTPStatus.BAD_REQUEST, error="Invalid program ID.")
+                    continue
+                if program_id in claimed_ids:
+                    results[index] = operation_result(
+                        index, HTTPStatus.BAD_REQUEST, error=f"Program {program_id} appears more than once in the batch."
+                    )
+                    continue
+                claimed_ids.add(program_id)
+
+            fields = {}
+            if op["op"] != "delete":
+                fields, message = ProgramService._batch_fields(data, creating=op["op"] == "create")
+                if message:
+                    results[index] = operation_result(index, HTTPStatus.BAD_REQUEST, error=message)
+                    continue
+                code = fields.get("code", "").upper()
+                if code and code in claimed_codes:
+                    results[index] = operation_result(
+                        index, HTTPStatus.BAD_REQUEST, error=f"Program code '{code}' appears more than once in the batch."
+                    )
+                    continue
+                if code:
+                    claimed_codes.add(code)
+
+            if op["op"] == "create":
+                creates.append((index, fields))
+            elif op["op"] == "update":
+                updates.append((index, program_id, fields))
+            else:
+                deletes.append((index, program_id))
+
+        # Lock the programs the batch touches; codes and colleges are checked against the reference cache
+        current = {}
+        if claimed_ids:
+            rows = db.session.execute(
+                text("SELECT id, college_id, code, name FROM programs WHERE id = ANY(:ids) FOR UPDATE"),
+                {"ids": list(claimed_ids)},
+            ).mappings().all()
+            current = {r["id"]: dict(r) for r in rows}
+
+        programs_by_code = reference_data().programs_by_code
+        code_owners = {code: programs_by_code[code]["id"] for code in claimed_codes if code in programs_by_code}
+
+        college_ids = {f["college_id"] for _, f in creates}
+        college_ids |= {f["college_id"] for _, _, f in updates if f.get("college_id") is not None}
+        known_colleges = college_ids & reference_data().colleges_by_id.keys()
+
+        new_rows = []
+        for index, fields in creates:
+            if fields["college_id"] not in known_colleges:
+                results[index] = operation_result(index, HTTPStatus.NOT_FOUND, error="College not found.")
+            elif fields["code"].upper() in code_owners:
+                results[index] = operation_result(
+                    index, HTTPStatus.CONFLICT, error=f"Program code '{fields['code'].upper()}' already exists."
+                )
+            else:
+                new_rows.append((index, fields))
+
+        changed_rows = []
+        for index, program_id, fields in updates:
+            existing = current.get(program_id)
+            if not existing:
+                results[index] = operation_result(index, HTTPStatus.NOT_FOUND, error="Program not found.")
+                continue
+            if fields.get("college_id") is not None and fields["college_id"] not in known_colleges:
+                results[index] = operation_result(index, HTTPStatus.NOT_FOUND, error="College not found.")
+                continue
+            owner = code_owners.get(fields.get("code", "").upper())
+            if owner is not None and owner != program_id:
+                results[index] = operation_result(
+                    index, HTTPStatus.CONFLICT, error=f"Program code '{fields['code'].upper()}' already exists."
+                )
+                continue
+            changed_rows.append((index, {**existing, **fields}))
+
+        removed = []
+        for index, program_id in deletes:
+            if program_id not in current:
+                results[index] = operation_result(index, HTTPStatus.NOT_FOUND, error="Program not found.")
+            else:
+                removed.append((index, program_id))
+
+        pending = [i for i, _ in new_rows] + [i for i, _ in changed_rows] + [i for i, _ in removed]
+        if atomic and results:
+            fail_pending(results, pending, HTTPStatus.FAILED_DEPENDENCY, "Not applied: another operation in the batch failed.")
+            return {"data": ordered_results(results), "error": None, "status": HTTPStatus.OK}
+
+        try:
+            if new_rows:
+                rows = db.session.execute(
+                    text(
+                        "INSERT INTO programs (college_id, code, name) "
+                        "SELECT * FROM unnest(CAST(:college_ids AS integer[]), CAST(:codes AS varchar[]), CAST(:names AS varchar[])) "
+                        "RETURNING id, college_id, code, name"
+                    ),
+                    {
+                        "college_ids": [f["college_id"] for _, f in new_rows],
+                        "codes": [f["code"] for _, f in new_rows],
+                        "names": [f["name"] for _, f in new_rows],
+                    },
+                ).mappings().all()
+                by_code = {r["code"].upper(): r for r in rows}
+                for index, fields in new_rows:
+                    results[index] = operation_result(index, HTTPStatus.CREATED, dict(by_code[fields["code"].upper()]))
+
+            if changed_rows:
+                rows = db.session.execute(
+                    text(
+                        "UPDATE programs p SET college_id = v.college_id, code = v.code, name = v.name "
+                        "FROM unnest(CAST(:ids AS integer[]), CAST(:college_ids AS integer[]), "
+                        "CAST(:codes AS varchar[]), CAST(:names AS varchar[])) AS v(id, college_id, code, name) "
+                        "WHERE p.id = v.id RETURNING p.id, p.college_id, p.code, p.name"
+                    ),
+                    {
+                        "ids": [r["id"] for _, r in changed_rows],
+                        "college_ids": [r["college_id"] for _, r in changed_rows],
+                        "codes": [r["code"] for _, r in changed_rows],
+                        "names": [r["name"] for _, r in changed_rows],
+                    },
+                ).mappings().all()
+                by_id = {r["id"]: r for r in rows}
+                for index, merged in changed_rows:
+                    results[index] = operation_result(index, HTTPStatus.OK, dict(by_id[merged["id"]]))
+
+            if removed:
+                db.session.execute(
+                    text("DELETE FROM programs WHERE id = ANY(:ids)"), {"ids": [program_id for _, program_id in removed]}
+                )
+                for index, _ in removed:
+                    results[index] = operation_result(index, HTTPStatus.NO_CONTENT)
+
+            db.session.commit()
+
+            invalidate_reference_data()
+        except IntegrityError:
+            db.session.rollback()
+            fail_pending(results, pending, HTTPStatus.CONFLICT, "A program with this code already exists.")
+        except Exception:
+            db.session.rollback()
+            return {"data": None, "error": "Failed to apply batch.", "status": HTTPStatus.INTERNAL_SERVER_ERROR}
+
+        return {"data": ordered_results(results), "error": None, "status": HTTPStatus.OK}
+
+    @staticmethod
+    def _batch_fields(data: Dict, creating: bool) -> Tuple[Dict, Optional[str]]:
+        """Normalise the fields of a batch create/update; update payloads may omit any field."""
+        fields = {}
+        college_id = data.get("college_id")
+        if creating or college_id is not None:
+            if college_id == "" and not creating:
+                fields["college_id"] = None
+            else:
+                try:
+                    fields["college_id"] = int(college_id)
+                except (ValueError, TypeError):
+                    return {}, "College selection is required."
+
+        for key, label in (("code", "Program code"), ("name", "Program name")):
+            value = data.get(key)
+            if creating or value is not None:
+                value = str(value or "").strip()
+                if not value:
+                    return {}, f"{label} cannot be empty."
+                fields[key] = value
+        return fields, None
\ No newline at end of file
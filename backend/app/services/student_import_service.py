@@ -0,0 +1,222 @@
+from http import HTTPStatus
+from typing import IO, Dict, Iterator, List, Optional, Tuple
+import csv
+import gzip
+import io
+import json
+
+from sqlalchemy import text
+
+from .. import db
+from ..schemas.student import StudentSchema
+from ..utils.reference_cache import reference_data
+from ..utils.statement_timeout import set_statement_timeout
+
+# Column order used for the staging table, the COPY stream and the final merge
+IMPORT_COLUMNS = ("id", "first_name", "last_name", "program_id", "year_level", "gender", "photo")
+
+# Stop collecting row errors past this many; the rejected count stays exact
+MAX_REPORTED_ERRORS = 1000
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+class StudentImportService:
+
+    @staticmethod
+    def import_stream(stream: IO[bytes], fmt: str, batch_size: int = 5000) -> Dict:
+        """
+        Bulk-load students from a CSV or NDJSON upload (optionally gzip-compressed).
+
+        Rows are validated in batches: field rules per row, program ids against the
+        reference cache, existing student ids with one query per batch, duplicates
+        within the file in memory.
+        Valid rows are COPYed into a temporary staging table and merged into students
+        with a single INSERT ... SELECT, all in one transaction.
+        """
+        inserted = 0
+        rejected = 0
+        errors: List[Dict] = []
+        seen_ids = set()
+        staged_lines: Dict[str, int] = {}
+
+        def reject(line_no: int, student_id, message: str) -> None:
+            nonlocal rejected
+            rejected += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"row": line_no, "id": student_id or None, "message": message})
+
+        try:
+            rows = StudentImportService._read_rows(stream, fmt)
+            set_statement_timeout()
+            db.session.execute(text(
+                "CREATE TEMP TABLE student_import_staging "
+                "(LIKE students INCLUDING DEFAULTS) ON COMMIT DROP"
+            ))
+
+            while True:
+                batch = StudentImportService._take(rows, batch_size)
+                if not batch:
+                    break
+
+                candidates = []
+                for line_no, raw, message in batch:
+                    if message:
+                        reject(line_no, None, message)
+                        continue
+                    record, message = StudentImportService._normalize(raw)
+                    if message:
+                        reject(line_no, record.get("id"), message)
+                        continue
+                    if record["id"] in seen_ids:
+                        reject(line_no, record["id"], f"Student ID '{record['id']}' appears more than once in the file.")
+                        continue
+                    seen_ids.add(record["id"])
+                    candidates.append((line_no, record))
+
+                ids = [r["id"] for _, r in candidates]
+                existing_ids = set(db.session.execute(
+                    text("SELECT id FROM students WHERE id = ANY(:ids)"), {"ids": ids}
+                ).scalars()) if ids else set()
+                known_programs = reference_data().programs_by_id
+
+                valid = []
+                for line_no, record in candidates:
+                    if record["id"] in existing_ids:
+                        reject(line_no, record["id"], f"Student ID '{record['id']}' already exists.")
+                    elif record["program_id"] not in known_programs:
+                        reject(line_no, record["id"], "Program not found.")
+                    else:
+                        valid.append((line_no, record))
+
+                StudentImportService._copy_to_staging([r for _, r in valid])
+                staged_lines.update((r["id"], line_no) for line_no, r in valid)
+
+            # Rows inserted concurrently by someone else are skipped here and reported below
+            column_list = ", ".join(IMPORT_COLUMNS)
+            inserted_ids = set(db.session.execute(text(
+                f"INSERT INTO students ({column_list}) "
+                f"SELECT {column_list} FROM student_import_staging "
+                f"ON CONFLICT (id) DO NOTHING RETURNING id"
+            )).scalars())
+            inserted = len(inserted_ids)
+
+            for student_id in sorted(set(staged_lines) - inserted_ids):
+                reject(staged_lines[student_id], student_id, f"Student ID '{student_id}' already exists.")
+
+            db.session.commit()
+        except (ValueError, UnicodeDecodeError, csv.Error, OSError, EOFError) as e:
+            db.session.rollback()
+            return {"data": None, "error": f"Could not read import file: {e}", "status": HTTPStatus.BAD_REQUEST}
+        except Exception:
+            db.session.rollback()
+            return {"data": None, "error": "Failed to import students.", "status": HTTPStatus.INTERNAL_SERVER_ERROR}
+
+        return {
+            "data": {"inserted": inserted, "rejected": rejected, "errors": sorted(errors, key=lambda e: e["row"])},
+            "error": None,
+            "status": HTTPStatus.OK,
+        }
+
+    @staticmethod
+    def _read_rows(stream: IO[bytes], fmt: str) -> Iterator[Tuple[int, Optional[Dict], str]]:
+        """
+        Yield (line number, raw record, error message or "") for each row, transparently
+        gunzipping the upload. An NDJSON line that is not a JSON object is reported as a
+        row error; the rest of the file is still read.
+        """
+        magic = stream.read(2)
+        stream.seek(0)
+        if magic == GZIP_MAGIC:
+            stream = gzip.GzipFile(fileobj=stream, mode="rb")
+        reader = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+
+        if fmt == "csv":
+            csv_reader = csv.DictReader(reader)
+            for record in csv_reader:
+                yield csv_reader.line_num, record, ""
+        elif fmt == "ndjson":
+            for line_no, line in enumerate(reader, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_no, None, f"Invalid JSON: {e.msg}."
+                    continue
+                if not isinstance(record, dict):
+                    yield line_no, None, "Row must be a JSON object."
+                    continue
+                yield line_no, record, ""
+        else:
+            raise ValueError("format must be csv or ndjson")
+
+    @staticmethod
+    def _take(rows: Iterator, size: int) -> List:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= size:
+                break
+        return batch
+
+    @staticmethod
+    def _normalize(raw: Dict) -> Tuple[Dict, str]:
+        """Coerce one raw record to staging types; returns (record, error message or "")."""
+        def as_text(key: str) -> str:
+            value = raw.get(key)
+            return "" if value is None else str(value).strip()
+
+        data = {
+            "id": as_text("id"),
+            "first_name": as_text("first_name"),
+            "last_name": as_text("last_name"),
+            "program_id": as_text("program_id"),
+            "year_level": as_text("year_level"),
+            "gender": as_text("gender"),
+            "photo": as_text("photo") or None,
+        }
+        # COPY cannot carry NUL characters into text columns
+        if any(value and "\x00" in value for value in data.values()):
+            return data, "Fields cannot contain NUL characters."
+        ok, message = StudentSchema.validate_create(data)
+        if not ok:
+            return data, message
+
+        record = dict(data)
+        record["program_id"] = int(data["program_id"])
+        record["year_level"] = int(data["year_level"])
+        return record, ""
+
+    @staticmethod
+    def _copy_to_staging(records: List[Dict]) -> None:
+        if not records:
+            return
+
+        column_list = ", ".join(IMPORT_COLUMNS)
+        dbapi_conn = db.session.connection().connection.dbapi_connection
+        cursor = dbapi_conn.cursor()
+        try:
+            if hasattr(cursor, "copy_expert"):
+                # psycopg2
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                for r in records:
+                    writer.writerow(["" if r[c] is None else r[c] for c in IMPORT_COLUMNS])
+                buffer.seek(0)
+                cursor.copy_expert(
+                    f"COPY student_import_staging ({column_list}) FROM STDIN WITH (FORMAT csv)", buffer
+                )
+            elif hasattr(cursor, "copy"):
+                # psycopg 3
+                with cursor.copy(f"COPY student_import_staging ({column_list}) FROM STDIN") as copy:
+                    for r in records:
+                        copy.write_row([r[c] for c in IMPORT_COLUMNS])
+            else:
+                placeholders = ", ".join(f":{c}" for c in IMPORT_COLUMNS)
+                db.session.execute(
+                    text(f"INSERT INTO student_import_staging ({column_list}) VALUES ({placeholders})"),
+                    [{c: r[c] for c in IMPORT_COLUMNS} for r in records],
+                )
+        finally:
+            cursor.close()
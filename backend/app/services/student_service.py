@@ -1,15 +1,102 @@
 from http import HTTPStatus
-from typing import Dict, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 import re
 
-from sqlalchemy import text, inspect
+from sqlalchemy import text
 from sqlalchemy.exc import IntegrityError
 
 from .. import db
+from ..schemas.student import StudentSchema
+from ..utils.batch import fail_pending, operation_result, ordered_results
+from ..utils.foreign_keys import is_foreign_key_violation, referencing_columns
+from ..utils.pagination import ListStatements, json_page_sql, keyset_clause, list_page, order_by_clause
+from ..utils.query_cache import cached_statement
+from ..utils.reference_cache import reference_data
+from ..utils.request_cache import MISSING, cache_evict, cache_get, cache_put
+from ..utils.statement_timeout import set_statement_timeout
+from ..utils.search import relevance_expression, substring_clause, trigram_enabled
+
+STUDENT_FROM_SQL = (
+    "FROM students s "
+    "LEFT JOIN programs p ON s.program_id = p.id "
+    "LEFT JOIN colleges c ON p.college_id = c.id"
+)
+
+STUDENT_COLUMNS = ("id", "first_name", "last_name", "program_id", "year_level", "gender", "photo")
+
+# Columns of a list_all row, in order; page queries select exactly these first
+STUDENT_LIST_COLUMNS = (
+    "id", "first_name", "last_name", "program_id", "program_name", "program_code", "year_level", "gender", "photo",
+    "photo_thumbnail",
+)
+STUDENT_LIST_SELECT = (
+    "s.id, s.first_name, s.last_name, s.program_id, "
+    "COALESCE(p.name, 'Not Applicable') AS program_name, COALESCE(p.code, 'Not Applicable') AS program_code, "
+    "s.year_level, s.gender, s.photo, "
+    "(SELECT v.thumbnail FROM photo_variants v WHERE v.photo = s.photo) AS photo_thumbnail"
+)
+
+# Column arrays for set-based batch writes; parameter names are the column names pluralised
+STUDENT_UNNEST_SQL = (
+    "unnest(CAST(:ids AS varchar[]), CAST(:first_names AS varchar[]), CAST(:last_names AS varchar[]), "
+    "CAST(:program_ids AS integer[]), CAST(:year_levels AS integer[]), CAST(:genders AS varchar[]), "
+    "CAST(:photos AS varchar[]))"
+)
+
+# (old id, new id) pairs for student renames
+STUDENT_RENAME_PAIRS_SQL = "unnest(CAST(:old_ids AS varchar[]), CAST(:new_ids AS varchar[])) AS v(old_id, new_id)"
+
+STUDENT_ID_PATTERN = r"^\d{4}-\d{4}$"
+
+# Upper bound on renames accepted by one rename_many call
+MAX_RENAMES = 10000
+
+
+def with_program(write_sql: str) -> str:
+    """Wrap an INSERT/UPDATE ... RETURNING <student columns> so the result also carries the program code and name."""
+    return (
+        f"WITH w AS ({write_sql}) "
+        f"SELECT w.*, p.code AS program_code, p.name AS program_name FROM w LEFT JOIN programs p ON w.program_id = p.id"
+    )
+
+
+# Sort keys accepted by list_all. Every expression is non-null so it can be used in a keyset row comparison.
+STUDENT_SORT_COLUMNS = {
+    "id": "s.id",
+    "first_name": "s.first_name",
+    "last_name": "s.last_name",
+    "program": "COALESCE(p.code, '')",
+    "year_level": "s.year_level",
+    "gender": "s.gender",
+}
+
+# Text columns whose similarity to the search term ranks results, per search_by
+STUDENT_RANK_COLUMNS = {
+    "all": ("s.id", "s.first_name", "s.last_name", "p.code"),
+    "id": ("s.id",),
+    "first_name": ("s.first_name",),
+    "last_name": ("s.last_name",),
+    "program": ("p.code",),
+}
+
+STUDENT_GENDERS = ("Male", "Female", "Other")
+
+# (table, column) pairs searched for "did you mean" suggestions when a search has no hits
+STUDENT_SUGGEST_CANDIDATES = (
+    ("students", "first_name"),
+    ("students", "last_name"),
+    ("programs", "code"),
+)
 
 
 class StudentService:
 
+    # Column order of the rows yielded by iter_export
+    EXPORT_COLUMNS = (
+        "id", "first_name", "last_name", "program_id", "program_code", "program_name",
+        "year_level", "gender", "photo",
+    )
+
     @staticmethod
     def list_all(
         page: int = 1,
@@ -21,133 +108,247 @@ class StudentService:
         program_code: Optional[str] = None,
         year_level: Optional[int] = None,
         gender: Optional[str] = None,
+        after: Optional[str] = None,
+        before: Optional[str] = None,
+        total_mode: Optional[str] = None,
+        render: str = "python",
     ) -> Dict:
         try:
-            where_clauses = []
-            params = {}
-
-            # Search handling
-            if search:
-                params["search"] = f"%{search}%"
-                if search_by == "all":
-                    where_clauses.append(
-                        "(s.id ILIKE :search OR s.first_name ILIKE :search OR s.last_name ILIKE :search "
-                        "OR p.code ILIKE :search OR s.gender ILIKE :search OR CAST(s.year_level AS TEXT) ILIKE :search)"
-                    )
-                elif search_by == "id":
-                    where_clauses.append("s.id ILIKE :search")
-                elif search_by == "first_name":
-                    where_clauses.append("s.first_name ILIKE :search")
-                elif search_by == "last_name":
-                    where_clauses.append("s.last_name ILIKE :search")
-                elif search_by == "program":
-                    where_clauses.append("p.code ILIKE :search")
-                elif search_by == "year_level":
-                    where_clauses.append("CAST(s.year_level AS TEXT) ILIKE :search")
-                elif search_by == "gender":
-                    where_clauses.append("s.gender ILIKE :search")
-
-            # Filters: program_code, year_level, gender
-            if program_code:
-                # match exact program code, case-insensitive
-                params["program_code"] = program_code
-                where_clauses.append("p.code ILIKE :program_code")
-            if year_level is not None:
-                try:
-                    params["year_level"] = int(year_level)
-                    where_clauses.append("s.year_level = :year_level")
-                except (ValueError, TypeError):
-                    # ignore invalid year_level filter
-                    pass
-            if gender:
-                params["gender"] = gender
-                where_clauses.append("s.gender = :gender")
-
-            where_sql = ""
-            if where_clauses:
-                where_sql = "WHERE " + " AND ".join(where_clauses)
-
-            count_sql = text(
-                f"SELECT COUNT(*) AS total FROM students s "
-                f"LEFT JOIN programs p ON s.program_id = p.id "
-                f"LEFT JOIN colleges c ON p.college_id = c.id "
-                f"{where_sql}"
+            params, search_shape, filters = StudentService._list_params(search, search_by, program_code, year_level, gender)
+            sort_key, order = StudentService._resolve_sort(sort_by, order, search_shape)
+
+            return list_page(
+                ListStatements(
+                    count=lambda estimate: StudentService._count_statement(search_shape, filters, estimate),
+                    page=lambda direction, window: StudentService._page_statement(
+                        search_shape, filters, sort_key, order, direction, window
+                    ),
+                    json_page=lambda direction, window: StudentService._json_page_statement(
+                        search_shape, filters, sort_key, order, direction, window
+                    ),
+                ),
+                STUDENT_LIST_COLUMNS,
+                params,
+                sort_key,
+                order,
+                page=page,
+                per_page=per_page,
+                after=after,
+                before=before,
+                total_mode=total_mode,
+                render=render,
+                search=search,
+                suggest_candidates=STUDENT_SUGGEST_CANDIDATES,
+                id_type=str,
+                key_types={"year_level": int},
             )
-            total = db.session.execute(count_sql, params).scalar() or 0
-
-            order_clause = ""
-            if sort_by:
-                mapping = {
-                    "id": "s.id",
-                    "first_name": "s.first_name",
-                    "last_name": "s.last_name",
-                    "program": "COALESCE(p.code, '')",
-                    "year_level": "s.year_level",
-                    "gender": "s.gender",
-                }
-                col = mapping.get(sort_by)
-                if col:
-                    direction = "DESC" if order == "desc" else "ASC"
-                    order_clause = f"ORDER BY {col} {direction}"
-
-            offset = (page - 1) * per_page
-            params.update({"limit": per_page, "offset": offset})
-
-            data_sql = text(
-                f"""
-                SELECT s.id, s.first_name, s.last_name, s.program_id, s.year_level, s.gender, s.photo,
-                       p.code AS program_code, p.name AS program_name
-                FROM students s
-                LEFT JOIN programs p ON s.program_id = p.id
-                LEFT JOIN colleges c ON p.college_id = c.id
-                {where_sql}
-                {order_clause}
-                LIMIT :limit OFFSET :offset
-                """
-            )
-
-            rows = db.session.execute(data_sql, params).mappings().all()
-            students = []
-            for r in rows:
-                students.append({
-                    "id": r["id"],
-                    "first_name": r["first_name"],
-                    "last_name": r["last_name"],
-                    "program_id": r["program_id"],
-                    "program_name": r["program_name"] if r["program_name"] is not None else "Not Applicable",
-                    "program_code": r["program_code"] if r["program_code"] is not None else "Not Applicable",
-                    "year_level": r["year_level"],
-                    "gender": r["gender"],
-                    "photo": r["photo"],
-                })
-
-            total_pages = (total + per_page - 1) // per_page if per_page > 0 else 1
-            has_next = page < total_pages
-            has_prev = page > 1
-
-            return {
-                "data": students,
-                "pagination": {
-                    "page": page,
-                    "per_page": per_page,
-                    "total": total,
-                    "total_pages": total_pages,
-                    "has_next": has_next,
-                    "has_prev": has_prev,
-                },
-                "error": None,
-                "status": HTTPStatus.OK,
-            }
         except Exception:
             return {
                 "data": None,
+                "suggestions": [],
                 "pagination": None,
                 "error": "Failed to retrieve students.",
                 "status": HTTPStatus.INTERNAL_SERVER_ERROR,
             }
 
+    @staticmethod
+    def _list_params(
+        search: str,
+        search_by: str,
+        program_code: Optional[str],
+        year_level: Optional[int],
+        gender: Optional[str],
+    ) -> Tuple[Dict, Optional[Tuple], Tuple[bool, bool, bool]]:
+        """Bind search/filter parameters; returns (params, search_shape, filters)."""
+        params = {}
+
+        # Search handling
+        search_shape = None
+        if search:
+            params["search"] = f"%{search}%"
+            params["search_term"] = search
+            search_shape = StudentService._search_shape(search, search_by, params)
+
+        # Filters: program_code, year_level, gender
+        if program_code:
+            # match exact program code, case-insensitive
+            params["program_code"] = program_code
+        if year_level is not None:
+            try:
+                params["year_level"] = int(year_level)
+            except (ValueError, TypeError):
+                # ignore invalid year_level filter
+                pass
+        if gender:
+            params["gender"] = gender
+        filters = ("program_code" in params, "year_level" in params, "gender" in params)
+        return params, search_shape, filters
+
+    @staticmethod
+    def _resolve_sort(sort_by: str, order: str, search_shape: Optional[Tuple]) -> Tuple[str, str]:
+        sort_key = sort_by if sort_by in STUDENT_SORT_COLUMNS else ""
+        if not sort_key and search_shape and search_shape[0] in STUDENT_RANK_COLUMNS and trigram_enabled():
+            # Rank matches by similarity when the caller did not ask for a column sort
+            return "relevance", "desc"
+        return sort_key, order
+
+    @staticmethod
+    def iter_export(
+        sort_by: str = "",
+        order: str = "asc",
+        search: str = "",
+        search_by: str = "all",
+        program_code: Optional[str] = None,
+        year_level: Optional[int] = None,
+        gender: Optional[str] = None,
+        batch_size: int = 2000,
+    ) -> Iterator[List[Tuple]]:
+        """
+        Yield every matching student as batches of EXPORT_COLUMNS tuples.
+        Rows are read through a server-side cursor, so memory stays bounded by batch_size.
+        """
+        params, search_shape, filters = StudentService._list_params(search, search_by, program_code, year_level, gender)
+        sort_key, order = StudentService._resolve_sort(sort_by, order, search_shape)
+        export_sql = StudentService._export_statement(search_shape, filters, sort_key, order)
+
+        set_statement_timeout()
+        result = db.session.execute(export_sql, params, execution_options={"yield_per": batch_size})
+        try:
+            for batch in result.partitions():
+                yield [tuple(row) for row in batch]
+        finally:
+            result.close()
+
+    @staticmethod
+    def _search_shape(search: str, search_by: str, params: Dict) -> Tuple[str, bool, bool]:
+        """
+        Bind the derived search parameters and return the (search_by, matches_gender,
+        matches_year) shape that selects which predicates the search clause needs.
+        """
+        genders = [g for g in STUDENT_GENDERS if search.lower() in g.lower()]
+        if genders:
+            params["search_genders"] = genders
+        # Only a valid year level can match; anything longer could overflow the integer column
+        matches_year = search.isdigit() and 1 <= int(search) <= 5
+        if matches_year:
+            params["search_year"] = int(search)
+        if search_by not in ("id", "first_name", "last_name", "program", "year_level", "gender"):
+            search_by = "all"
+        return search_by, bool(genders), matches_year
+
+    @staticmethod
+    def _search_clause(search_by: str, matches_gender: bool, matches_year: bool) -> str:
+        """
+        WHERE fragment for a search shape. Every branch is index-backed: trigram GIN
+        indexes for the text columns, a programs sub-select for the program code,
+        and btree equality for year/gender.
+        """
+        program_match = "s.program_id IN (SELECT id FROM programs WHERE code ILIKE :search)"
+        if search_by in ("id", "first_name", "last_name"):
+            return substring_clause([f"s.{search_by}"])
+        if search_by == "program":
+            return program_match
+        if search_by == "year_level":
+            return "s.year_level = :search_year" if matches_year else "FALSE"
+        if search_by == "gender":
+            return "s.gender = ANY(:search_genders)" if matches_gender else "FALSE"
+
+        predicates = [f"{col} ILIKE :search" for col in ("s.id", "s.first_name", "s.last_name")] + [program_match]
+        if matches_gender:
+            predicates.append("s.gender = ANY(:search_genders)")
+        if matches_year:
+            predicates.append("s.year_level = :search_year")
+        return "(" + " OR ".join(predicates) + ")"
+
+    @staticmethod
+    def _where_sql(search_shape: Optional[Tuple], filters: Tuple[bool, bool, bool], keyset: Optional[str] = None) -> str:
+        where_clauses = []
+        if search_shape:
+            where_clauses.append(StudentService._search_clause(*search_shape))
+        has_program_code, has_year_level, has_gender = filters
+        if has_program_code:
+            where_clauses.append("p.code ILIKE :program_code")
+        if has_year_level:
+            where_clauses.append("s.year_level = :year_level")
+        if has_gender:
+            where_clauses.append("s.gender = :gender")
+        if keyset:
+            where_clauses.append(keyset)
+        if not where_clauses:
+            return ""
+        return "WHERE " + " AND ".join(where_clauses)
+
+    @staticmethod
+    @cached_statement()
+    def _count_statement(search_shape: Optional[Tuple], filters: Tuple[bool, bool, bool], estimate: bool) -> str:
+        where_sql = StudentService._where_sql(search_shape, filters)
+        if estimate:
+            return f"EXPLAIN (FORMAT JSON) SELECT 1 {STUDENT_FROM_SQL} {where_sql}"
+        return f"SELECT COUNT(*) AS total {STUDENT_FROM_SQL} {where_sql}"
+
+    @staticmethod
+    @cached_statement()
+    def _page_statement(
+        search_shape: Optional[Tuple],
+        filters: Tuple[bool, bool, bool],
+        sort_key: str,
+        order: str,
+        direction: Optional[str],
+        window: bool,
+    ) -> str:
+        if sort_key == "relevance":
+            sort_col = relevance_expression(STUDENT_RANK_COLUMNS[search_shape[0]])
+        else:
+            sort_col = STUDENT_SORT_COLUMNS.get(sort_key)
+        backwards = direction == "before"
+        keyset = keyset_clause(sort_col, "s.id", order, backwards) if direction else None
+
+        sort_key_sql = f", {sort_col} AS sort_key" if sort_col else ""
+        window_sql = ", COUNT(*) OVER () AS total_count" if window else ""
+        return f"""
+            SELECT {STUDENT_LIST_SELECT}{sort_key_sql}{window_sql}
+            {STUDENT_FROM_SQL}
+            {StudentService._where_sql(search_shape, filters, keyset)}
+            {order_by_clause(sort_col, "s.id", order, backwards)}
+            LIMIT :limit OFFSET :offset
+        """
+
+    @staticmethod
+    @cached_statement()
+    def _json_page_statement(
+        search_shape: Optional[Tuple],
+        filters: Tuple[bool, bool, bool],
+        sort_key: str,
+        order: str,
+        direction: Optional[str],
+        window: bool,
+    ) -> str:
+        page_sql = StudentService._page_statement(search_shape, filters, sort_key, order, direction, window).text
+        keyed = sort_key == "relevance" or sort_key in STUDENT_SORT_COLUMNS
+        return json_page_sql(page_sql, STUDENT_LIST_COLUMNS, keyed, order, direction == "before", window)
+
+    @staticmethod
+    @cached_statement()
+    def _export_statement(search_shape: Optional[Tuple], filters: Tuple[bool, bool, bool], sort_key: str, order: str) -> str:
+        if sort_key == "relevance":
+            sort_col = relevance_expression(STUDENT_RANK_COLUMNS[search_shape[0]])
+        else:
+            sort_col = STUDENT_SORT_COLUMNS.get(sort_key)
+        return f"""
+            SELECT s.id, s.first_name, s.last_name, s.program_id, p.code AS program_code, p.name AS program_name,
+                   s.year_level, s.gender, s.photo
+            {STUDENT_FROM_SQL}
+            {StudentService._where_sql(search_shape, filters)}
+            {order_by_clause(sort_col, "s.id", order)}
+        """
+
     @staticmethod
     def get_by_id(student_id: str) -> Optional[Dict]:
+        """Student with program code/name, or None. Cached for the rest of the request; callers must not mutate it."""
+        cached = cache_get("student", student_id)
+        if cached is not MISSING:
+            return cached
+
         sql = text(
             "SELECT s.id, s.first_name, s.last_name, s.program_id, s.year_level, s.gender, s.photo, "
             "p.code AS program_code, p.name AS program_name "
@@ -156,19 +357,7 @@ class StudentService:
             "WHERE s.id = :id"
         )
         row = db.session.execute(sql, {"id": student_id}).mappings().first()
-        if not row:
-            return None
-        return {
-            "id": row["id"],
-            "first_name": row["first_name"],
-            "last_name": row["last_name"],
-            "program_id": row["program_id"],
-            "program_name": row["program_name"] if row["program_name"] else "Not Applicable",
-            "program_code": row["program_code"] if row["program_code"] else "Not Applicable",
-            "year_level": row["year_level"],
-            "gender": row["gender"],
-            "photo": row["photo"],
-        }
+        return cache_put("student", student_id, StudentService._student_dict(row) if row else None)
 
     @staticmethod
     def create_from_request(data: Dict) -> Dict:
@@ -191,8 +380,7 @@ class StudentService:
             return {"data": None, "error": "Program must be selected.", "status": HTTPStatus.BAD_REQUEST}
         try:
             program_id = int(program_id)
-            found = db.session.execute(text("SELECT id FROM programs WHERE id = :id"), {"id": program_id}).scalar()
-            if not found:
+            if program_id not in reference_data().programs_by_id:
                 return {"data": None, "error": "Program not found.", "status": HTTPStatus.NOT_FOUND}
         except (ValueError, TypeError):
             return {"data": None, "error": "Invalid program ID.", "status": HTTPStatus.BAD_REQUEST}
@@ -208,11 +396,11 @@ class StudentService:
             return {"data": None, "error": "Gender must be Male, Female, or Other.", "status": HTTPStatus.BAD_REQUEST}
 
         try:
-            insert_sql = text(
+            insert_sql = text(with_program(
                 "INSERT INTO students (id, first_name, last_name, program_id, year_level, gender, photo) "
                 "VALUES (:id, :first_name, :last_name, :program_id, :year_level, :gender, :photo) "
                 "RETURNING id, first_name, last_name, program_id, year_level, gender, photo"
-            )
+            ))
             result = db.session.execute(insert_sql, {
                 "id": student_id,
                 "first_name": first_name,
@@ -224,17 +412,8 @@ class StudentService:
             })
             row = result.mappings().first()
             db.session.commit()
-            return {"data": {
-                "id": row["id"],
-                "first_name": row["first_name"],
-                "last_name": row["last_name"],
-                "program_id": row["program_id"],
-                "program_name": "Not Applicable",
-                "program_code": "Not Applicable",
-                "year_level": row["year_level"],
-                "gender": row["gender"],
-                "photo": row["photo"],
-            }, "error": None, "status": HTTPStatus.CREATED}
+            student = cache_put("student", row["id"], StudentService._student_dict(row))
+            return {"data": student, "error": None, "status": HTTPStatus.CREATED}
         except IntegrityError:
             db.session.rollback()
             return {"data": None, "error": "Failed to create student.", "status": HTTPStatus.CONFLICT}
@@ -258,7 +437,7 @@ class StudentService:
         photo = data.get("photo") if photo_in_payload else None
 
         if new_student_id and new_student_id != student_id:
-            if not re.match(r'^\d{4}-\d{4}$', new_student_id):
+            if not re.match(STUDENT_ID_PATTERN, new_student_id):
                 return {"data": None, "error": "Student ID must be in format NNNN-NNNN.", "status": HTTPStatus.BAD_REQUEST}
             exists = db.session.execute(text("SELECT id FROM students WHERE id = :id"), {"id": new_student_id}).scalar()
             if exists:
@@ -285,11 +464,9 @@ class StudentService:
             if program_id == "":
                 set_clauses.append("program_id = NULL")
             else:
+                # Existence is enforced by fk_students_program; a violation is reported as 404 below
                 try:
                     pid = int(program_id)
-                    found = db.session.execute(text("SELECT id FROM programs WHERE id = :id"), {"id": pid}).scalar()
-                    if not found:
-                        return {"data": None, "error": "Program not found.", "status": HTTPStatus.NOT_FOUND}
                     set_clauses.append("program_id = :program_id")
                     params["program_id"] = pid
                 except (ValueError, TypeError):
@@ -321,91 +498,383 @@ class StudentService:
 
         try:
             if new_student_id and new_student_id != student_id:
-                db.session.begin_nested()
-                
-                existing_row = db.session.execute(text("SELECT id, first_name, last_name, program_id, year_level, gender, photo FROM students WHERE id = :id"), {"id": student_id}).mappings().first()
-                if not existing_row:
-                    db.session.rollback()
-                    return {"data": None, "error": "Student not found.", "status": HTTPStatus.NOT_FOUND}
-
-                final_first_name = params.get("first_name", existing_row["first_name"])
-                final_last_name = params.get("last_name", existing_row["last_name"])
-                final_program_id = params.get("program_id", existing_row["program_id"])
-                final_year_level = params.get("year_level", existing_row["year_level"])
-                final_gender = params.get("gender", existing_row["gender"])
-                final_photo = params.get("photo", existing_row["photo"]) if photo_in_payload else existing_row["photo"]
-
-                insert_sql = text(
-                    "INSERT INTO students (id, first_name, last_name, program_id, year_level, gender, photo) "
-                    "VALUES (:id, :first_name, :last_name, :program_id, :year_level, :gender, :photo)"
-                )
-                db.session.execute(insert_sql, {
-                    "id": new_student_id,
-                    "first_name": final_first_name,
-                    "last_name": final_last_name,
-                    "program_id": final_program_id,
-                    "year_level": final_year_level,
-                    "gender": final_gender,
-                    "photo": final_photo
-                })
-
-                inspector = inspect(db.engine)
-                all_tables = inspector.get_table_names()
-                for table in all_tables:
-                    if table == "students":
-                        continue
-                    fks = inspector.get_foreign_keys(table)
-                    for fk in fks:
-                        referred_table = fk.get("referred_table") or fk.get("referred_table_name") or fk.get("referred_table")
-                        if referred_table == "students":
-                            constrained_cols = fk.get("constrained_columns") or fk.get("constrained_column") or fk.get("constrained_columns", [])
-                            for col in constrained_cols:
-                                update_fk_sql = text(f"UPDATE {table} SET {col} = :new_id WHERE {col} = :old_id")
-                                db.session.execute(update_fk_sql, {"new_id": new_student_id, "old_id": student_id})
-
-                db.session.execute(text("DELETE FROM students WHERE id = :id"), {"id": student_id})
-                
+                params["id"] = student_id
+                if set_clauses:
+                    update_sql = text(f"UPDATE students SET {', '.join(set_clauses)} WHERE id = :id")
+                    db.session.execute(update_sql, params)
+                StudentService._rename_students([student_id], [new_student_id])
                 db.session.commit()
-                
+                cache_evict("student", student_id)
+                cache_evict("student", new_student_id)
+
                 new_student = StudentService.get_by_id(new_student_id)
                 if new_student:
                     return {"data": new_student, "error": None, "status": HTTPStatus.OK}
                 return {"data": None, "error": "Failed to change student ID.", "status": HTTPStatus.INTERNAL_SERVER_ERROR}
             else:
                 if not set_clauses:
-                    return {"data": StudentService.get_by_id(student_id), "error": None, "status": HTTPStatus.OK}
+                    return {"data": current, "error": None, "status": HTTPStatus.OK}
 
                 params["id"] = student_id
-                update_sql = text(f"UPDATE students SET {', '.join(set_clauses)} WHERE id = :id")
-                db.session.execute(update_sql, params)
+                update_sql = text(with_program(
+                    f"UPDATE students SET {', '.join(set_clauses)} WHERE id = :id "
+                    f"RETURNING {', '.join(STUDENT_COLUMNS)}"
+                ))
+                row = db.session.execute(update_sql, params).mappings().first()
+                if not row:
+                    db.session.rollback()
+                    cache_evict("student", student_id)
+                    return {"data": None, "error": "Student not found.", "status": HTTPStatus.NOT_FOUND}
                 db.session.commit()
-                return {"data": StudentService.get_by_id(student_id), "error": None, "status": HTTPStatus.OK}
-        except IntegrityError:
+                student = cache_put("student", student_id, StudentService._student_dict(row))
+                return {"data": student, "error": None, "status": HTTPStatus.OK}
+        except IntegrityError as e:
             db.session.rollback()
+            if is_foreign_key_violation(e):
+                return {"data": None, "error": "Program not found.", "status": HTTPStatus.NOT_FOUND}
             return {"data": None, "error": "Failed to update student.", "status": HTTPStatus.CONFLICT}
         except Exception as e:
             db.session.rollback()
             return {"data": None, "error": f"Failed to update student: {e}", "status": HTTPStatus.INTERNAL_SERVER_ERROR}
 
     @staticmethod
-    def delete_by_id(student_id: str) -> Dict:
-        existing = db.session.execute(text("SELECT id, photo FROM students WHERE id = :id"), {"id": student_id}).mappings().first()
-        if not existing:
-            return {"error": "Student not found.", "status": HTTPStatus.NOT_FOUND}
+    def rename_many(renames: List[Dict]) -> Dict:
+        """
+        Renumber many students at once from [{"from": old_id, "to": new_id}, ...].
+        All renames are validated up front and applied together, or not at all.
+        A new ID may reuse one that another rename in the same request frees up.
+        """
+        if not isinstance(renames, list) or not renames:
+            return {"data": None, "error": "'renames' must be a non-empty list.", "status": HTTPStatus.BAD_REQUEST}
+        if len(renames) > MAX_RENAMES:
+            return {"data": None, "error": f"At most {MAX_RENAMES} renames are allowed per request.", "status": HTTPStatus.BAD_REQUEST}
+
+        old_ids, new_ids = [], []
+        for index, item in enumerate(renames):
+            if not isinstance(item, dict):
+                return {"data": None, "error": f"Rename {index}: expected an object with 'from' and 'to'.", "status": HTTPStatus.BAD_REQUEST}
+            old_id = str(item.get("from") or "").strip()
+            new_id = str(item.get("to") or "").strip()
+            if not old_id:
+                return {"data": None, "error": f"Rename {index}: 'from' is required.", "status": HTTPStatus.BAD_REQUEST}
+            if not re.match(STUDENT_ID_PATTERN, new_id):
+                return {"data": None, "error": f"Rename {index}: Student ID must be in format NNNN-NNNN.", "status": HTTPStatus.BAD_REQUEST}
+            if old_id != new_id:
+                old_ids.append(old_id)
+                new_ids.append(new_id)
+
+        if len(set(old_ids)) != len(old_ids):
+            return {"data": None, "error": "Each student can only be renamed once per request.", "status": HTTPStatus.BAD_REQUEST}
+        if len(set(new_ids)) != len(new_ids):
+            return {"data": None, "error": "Each new student ID can only be used once per request.", "status": HTTPStatus.BAD_REQUEST}
+        if not old_ids:
+            return {"data": {"renamed": 0}, "error": None, "status": HTTPStatus.OK}
+
+        try:
+            existing = set(db.session.execute(
+                text("SELECT id FROM students WHERE id = ANY(:ids) FOR UPDATE"), {"ids": old_ids + new_ids}
+            ).scalars())
+            missing = [i for i in old_ids if i not in existing]
+            if missing:
+                db.session.rollback()
+                return {"data": None, "error": f"Student not found: {', '.join(missing[:10])}", "status": HTTPStatus.NOT_FOUND}
+            renamed_away = set(old_ids)
+            taken = [i for i in new_ids if i in existing and i not in renamed_away]
+            if taken:
+                db.session.rollback()
+                return {"data": None, "error": f"Student ID already exists: {', '.join(taken[:10])}", "status": HTTPStatus.CONFLICT}
+
+            StudentService._rename_students(old_ids, new_ids)
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return {"data": None, "error": "Failed to rename students.", "status": HTTPStatus.CONFLICT}
+        except Exception:
+            db.session.rollback()
+            return {"data": None, "error": "Failed to rename students.", "status": HTTPStatus.INTERNAL_SERVER_ERROR}
+
+        return {"data": {"renamed": len(old_ids)}, "error": None, "status": HTTPStatus.OK}
+
+    @staticmethod
+    def _rename_students(old_ids: List[str], new_ids: List[str]) -> None:
+        """
+        Change student primary keys inside the caller's transaction.
+
+        When nothing references students, or every reference is ON UPDATE CASCADE, this is
+        a single UPDATE ... FROM unnest(). Otherwise the rows are copied under their new IDs,
+        the referencing columns repointed and the old rows deleted. Renames that reuse an ID
+        freed by the same call (renumbering shifts, swaps) first move to a temporary '~' ID.
+        """
+        if set(old_ids) & set(new_ids):
+            staging_ids = [f"~{i}" for i in old_ids]
+            StudentService._rename_students(old_ids, staging_ids)
+            old_ids = staging_ids
+
+        params = {"old_ids": old_ids, "new_ids": new_ids}
+        manual_refs = [ref for ref in referencing_columns("students") if not ref.cascades_on_update]
+        if not manual_refs:
+            db.session.execute(StudentService._rename_statement(), params)
+            return
+
+        db.session.execute(StudentService._rename_copy_statement(), params)
+        for ref in manual_refs:
+            db.session.execute(
+                text(
+                    f'UPDATE {ref.table} t SET "{ref.column}" = v.new_id '
+                    f'FROM {STUDENT_RENAME_PAIRS_SQL} WHERE t."{ref.column}" = v.old_id'
+                ),
+                params,
+            )
+        db.session.execute(text("DELETE FROM students WHERE id = ANY(:old_ids)"), params)
+
+    @staticmethod
+    @cached_statement()
+    def _rename_statement() -> str:
+        return f"UPDATE students s SET id = v.new_id FROM {STUDENT_RENAME_PAIRS_SQL} WHERE s.id = v.old_id"
 
+    @staticmethod
+    @cached_statement()
+    def _rename_copy_statement() -> str:
+        copied = ", ".join(f"s.{c}" for c in STUDENT_COLUMNS if c != "id")
+        return (
+            f"INSERT INTO students ({', '.join(STUDENT_COLUMNS)}) "
+            f"SELECT v.new_id, {copied} FROM students s JOIN {STUDENT_RENAME_PAIRS_SQL} ON s.id = v.old_id"
+        )
+
+    @staticmethod
+    def delete_by_id(student_id: str) -> Dict:
         try:
-            db.session.execute(text("DELETE FROM students WHERE id = :id"), {"id": student_id})
+            deleted = db.session.execute(
+                text("DELETE FROM students WHERE id = :id RETURNING id"), {"id": student_id}
+            ).scalar()
+            if not deleted:
+                db.session.rollback()
+                return {"error": "Student not found.", "status": HTTPStatus.NOT_FOUND}
             db.session.commit()
+            cache_put("student", student_id, None)
             return {"error": None, "status": HTTPStatus.NO_CONTENT}
         except Exception:
             db.session.rollback()
             return {"error": "Failed to delete student.", "status": HTTPStatus.INTERNAL_SERVER_ERROR}
 
+    @staticmethod
+    def apply_batch(operations: List[Dict], atomic: bool = False) -> Dict:
+        """
+        Apply create/update/delete operations in a single transaction using set-based SQL:
+        one INSERT ... SELECT FROM unnest(...), one UPDATE ... FROM unnest(...) and one
+        DELETE ... WHERE id = ANY(...). Each student ID may appear once per batch.
+        With atomic=True nothing is written if any operation fails validation.
+        Returns per-operation results in request order. Photos that lose their last reference
+        are queued in storage_outbox by the students triggers.
+        """
+        results: Dict[int, Dict] = {}
+        creates, updates, deletes = [], [], []
+        claimed = set()
+
+        for op in operations:
+            index, data = op["index"], op["data"]
+            if op["op"] == "create":
+                record, message = StudentService._batch_create_record(data)
+                if message:
+                    results[index] = operation_result(index, HTTPStatus.BAD_REQUEST, error=message)
+                    continue
+                student_id = record["id"]
+            else:
+                student_id = str(op["id"]).strip()
+                if op["op"] == "update":
+                    message = StudentService._batch_update_type_error(data)
+                    ok = message is None
+                    if ok:
+                        ok, message = StudentSchema.validate_update(data)
+                    if ok and data.get("id") not in (None, "") and str(data["id"]).strip() != student_id:
+                        ok, message = False, "Student IDs cannot be changed in a batch update."
+                    if not ok:
+                        results[index] = operation_result(index, HTTPStatus.BAD_REQUEST, error=message)
+                        continue
+            if student_id in claimed:
+                results[index] = operation_result(
+                    index, HTTPStatus.BAD_REQUEST, error=f"Student ID '{student_id}' appears more than once in the batch."
+                )
+                continue
+            claimed.add(student_id)
+            if op["op"] == "create":
+                creates.append((index, record))
+            elif op["op"] == "update":
+                updates.append((index, student_id, data))
+            else:
+                deletes.append((index, student_id))
+
+        # Lock the students the batch touches with one query; programs come from the reference cache
+        current = {}
+        if claimed:
+            rows = db.session.execute(
+                text(
+                    "SELECT id, first_name, last_name, program_id, year_level, gender, photo "
+                    "FROM students WHERE id = ANY(:ids) FOR UPDATE"
+                ),
+                {"ids": list(claimed)},
+            ).mappings().all()
+            current = {r["id"]: dict(r) for r in rows}
+
+        program_ids = {r["program_id"] for _, r in creates}
+        for _, _, data in updates:
+            if data.get("program_id") not in (None, ""):
+                program_ids.add(int(data["program_id"]))
+        known_programs = program_ids & reference_data().programs_by_id.keys()
+
+        new_rows = []
+        for index, record in creates:
+            if record["id"] in current:
+                results[index] = operation_result(
+                    index, HTTPStatus.CONFLICT, error=f"Student ID '{record['id']}' already exists."
+                )
+            elif record["program_id"] not in known_programs:
+                results[index] = operation_result(index, HTTPStatus.NOT_FOUND, error="Program not found.")
+            else:
+                new_rows.append((index, record))
+
+        changed_rows = []
+        for index, student_id, data in updates:
+            existing = current.get(student_id)
+            if not existing:
+                results[index] = operation_result(index, HTTPStatus.NOT_FOUND, error="Student not found.")
+                continue
+            merged = StudentService._batch_merge_update(existing, data)
+            if merged["program_id"] != existing["program_id"] and merged["program_id"] is not None \
+                    and merged["program_id"] not in known_programs:
+                results[index] = operation_result(index, HTTPStatus.NOT_FOUND, error="Program not found.")
+                continue
+            changed_rows.append((index, merged))
+
+        removed = []
+        for index, student_id in deletes:
+            if student_id not in current:
+                results[index] = operation_result(index, HTTPStatus.NOT_FOUND, error="Student not found.")
+            else:
+                removed.append((index, student_id))
+
+        pending = [i for i, _ in new_rows] + [i for i, _ in changed_rows] + [i for i, _ in removed]
+        if atomic and results:
+            fail_pending(results, pending, HTTPStatus.FAILED_DEPENDENCY, "Not applied: another operation in the batch failed.")
+            return {"data": ordered_results(results), "error": None, "status": HTTPStatus.OK}
+
+        try:
+            if new_rows:
+                rows = db.session.execute(StudentService._batch_insert_statement(), StudentService._column_arrays(
+                    [r for _, r in new_rows]
+                )).mappings().all()
+                by_id = {r["id"]: r for r in rows}
+                for index, record in new_rows:
+                    results[index] = operation_result(index, HTTPStatus.CREATED, StudentService._student_dict(by_id[record["id"]]))
+
+            if changed_rows:
+                rows = db.session.execute(StudentService._batch_update_statement(), StudentService._column_arrays(
+                    [r for _, r in changed_rows]
+                )).mappings().all()
+                by_id = {r["id"]: r for r in rows}
+                for index, merged in changed_rows:
+                    results[index] = operation_result(index, HTTPStatus.OK, StudentService._student_dict(by_id[merged["id"]]))
+
+            if removed:
+                db.session.execute(
+                    text("DELETE FROM students WHERE id = ANY(:ids)"), {"ids": [student_id for _, student_id in removed]}
+                )
+                for index, student_id in removed:
+                    results[index] = operation_result(index, HTTPStatus.NO_CONTENT)
+
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            fail_pending(results, pending, HTTPStatus.CONFLICT, "Failed to apply batch.")
+        except Exception:
+            db.session.rollback()
+            return {"data": None, "error": "Failed to apply batch.", "status": HTTPStatus.INTERNAL_SERVER_ERROR}
+
+        return {"data": ordered_results(results), "error": None, "status": HTTPStatus.OK}
+
+    @staticmethod
+    def _batch_create_record(data: Dict) -> Tuple[Optional[Dict], Optional[str]]:
+        """Validate a batch create payload; returns (record, None) or (None, error message)."""
+        fields = {k: data.get(k) for k in ("id", "first_name", "last_name", "program_id", "year_level", "gender", "photo")}
+        for key in ("id", "first_name", "last_name", "gender"):
+            fields[key] = "" if fields[key] is None else str(fields[key])
+        ok, message = StudentSchema.validate_create(fields)
+        if not ok:
+            return None, message
+        return {
+            "id": fields["id"].strip(),
+            "first_name": fields["first_name"].strip(),
+            "last_name": fields["last_name"].strip(),
+            "program_id": int(fields["program_id"]),
+            "year_level": int(fields["year_level"]),
+            "gender": fields["gender"].strip(),
+            "photo": fields["photo"] or None,
+        }, None
+
+    @staticmethod
+    def _batch_update_type_error(data: Dict) -> Optional[str]:
+        """Error for a batch update whose text fields are not strings (null leaves them unchanged)."""
+        for key in ("id", "first_name", "last_name", "gender"):
+            if data.get(key) is not None and not isinstance(data[key], str):
+                return f"'{key}' must be a string."
+        return None
+
+    @staticmethod
+    def _batch_merge_update(existing: Dict, data: Dict) -> Dict:
+        """Final column values for a (validated) partial update applied to the current row."""
+        merged = dict(existing)
+        for key in ("first_name", "last_name", "gender"):
+            if data.get(key) is not None:
+                merged[key] = str(data[key]).strip()
+        if "program_id" in data and data["program_id"] is not None:
+            merged["program_id"] = None if data["program_id"] == "" else int(data["program_id"])
+        if data.get("year_level") is not None:
+            merged["year_level"] = int(data["year_level"])
+        if "photo" in data:
+            merged["photo"] = data["photo"] or None
+        return merged
+
+    @staticmethod
+    def _column_arrays(records: List[Dict]) -> Dict:
+        """Transpose records into one array parameter per column for unnest()."""
+        return {f"{column}s": [r[column] for r in records] for column in STUDENT_COLUMNS}
+
+    @staticmethod
+    @cached_statement()
+    def _batch_insert_statement() -> str:
+        return with_program(
+            f"INSERT INTO students ({', '.join(STUDENT_COLUMNS)}) SELECT * FROM {STUDENT_UNNEST_SQL} "
+            f"RETURNING {', '.join(STUDENT_COLUMNS)}"
+        )
+
+    @staticmethod
+    @cached_statement()
+    def _batch_update_statement() -> str:
+        assignments = ", ".join(f"{c} = v.{c}" for c in STUDENT_COLUMNS if c != "id")
+        return with_program(
+            f"UPDATE students s SET {assignments} "
+            f"FROM {STUDENT_UNNEST_SQL} AS v({', '.join(STUDENT_COLUMNS)}) WHERE s.id = v.id "
+            f"RETURNING {', '.join('s.' + c for c in STUDENT_COLUMNS)}"
+        )
+
+    @staticmethod
+    def _student_dict(row) -> Dict:
+        return {
+            "id": row["id"],
+            "first_name": row["first_name"],
+            "last_name": row["last_name"],
+            "program_id": row["program_id"],
+            "program_name": row["program_name"] if row["program_name"] else "Not Applicable",
+            "program_code": row["program_code"] if row["program_code"] else "Not Applicable",
+            "year_level": row["year_level"],
+            "gender": row["gender"],
+            "photo": row["photo"],
+        }
+
     @staticmethod
     def get_programs_by_college(college_id: int) -> Dict:
         try:
-            rows = db.session.execute(text("SELECT id, college_id, code, name FROM programs WHERE college_id = :college_id"), {"college_id": college_id}).mappings().all()
-            programs = [{"id": r["id"], "college_id": r["college_id"], "code": r["code"], "name": r["name"]} for r in rows]
+            programs = [dict(p) for p in reference_data().programs_by_college.get(college_id, [])]
             return {"data": programs, "error": None, "status": HTTPStatus.OK}
         except Exception:
             return {"data": None, "error": "Failed to retrieve programs.", "status": HTTPStatus.INTERNAL_SERVER_ERROR}
@@ -416,14 +885,17 @@ class StudentService:
         Clear the photo column for a student (set photo = NULL).
         Returns {"error": None, "status": HTTPStatus.OK} on success or an error dict.
         """
-        # Ensure student exists
-        existing = db.session.execute(text("SELECT id FROM students WHERE id = :id"), {"id": student_id}).scalar()
-        if not existing:
-            return {"error": "Student not found.", "status": HTTPStatus.NOT_FOUND}
-
         try:
-            db.session.execute(text("UPDATE students SET photo = NULL WHERE id = :id"), {"id": student_id})
+            updated = db.session.execute(
+                text("UPDATE students SET photo = NULL WHERE id = :id RETURNING id"), {"id": student_id}
+            ).scalar()
+            if not updated:
+                db.session.rollback()
+                return {"error": "Student not found.", "status": HTTPStatus.NOT_FOUND}
             db.session.commit()
+            cached = cache_get("student", student_id)
+            if cached:
+                cache_put("student", student_id, {**cached, "photo": None})
             return {"error": None, "status": HTTPStatus.OK}
         except Exception:
             db.session.rollback()
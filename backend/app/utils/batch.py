@@ -0,0 +1,47 @@
+from http import HTTPStatus
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+BATCH_OPS = ("create", "update", "delete")
+MAX_BATCH_OPERATIONS = 1000
+
+
+def parse_batch_operations(payload: Any) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Validate the envelope of a batch request:
+        {"operations": [{"op": "create", "data": {...}},
+                        {"op": "update", "id": ..., "data": {...}},
+                        {"op": "delete", "id": ...}],
+         "atomic": false}
+    Returns (operations, None) or ([], error message). Field-level validation is left to the services.
+    """
+    operations = payload.get("operations") if isinstance(payload, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return [], "'operations' must be a non-empty list."
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        return [], f"A batch can contain at most {MAX_BATCH_OPERATIONS} operations."
+
+    parsed = []
+    for index, item in enumerate(operations):
+        if not isinstance(item, dict) or item.get("op") not in BATCH_OPS:
+            return [], f"Operation {index}: 'op' must be one of create, update, delete."
+        data = item.get("data") or {}
+        if not isinstance(data, dict):
+            return [], f"Operation {index}: 'data' must be an object."
+        if item["op"] != "create" and item.get("id") in (None, ""):
+            return [], f"Operation {index}: 'id' is required for {item['op']}."
+        parsed.append({"index": index, "op": item["op"], "id": item.get("id"), "data": data})
+    return parsed, None
+
+
+def operation_result(index: int, status: HTTPStatus, data: Any = None, error: Optional[str] = None) -> Dict:
+    return {"index": index, "status": int(status), "data": data, "error": error}
+
+
+def fail_pending(results: Dict[int, Dict], pending: Iterable[int], status: HTTPStatus, error: str) -> None:
+    """Record the same failure for every operation that was going to be applied."""
+    for index in pending:
+        results[index] = operation_result(index, status, error=error)
+
+
+def ordered_results(results: Dict[int, Dict]) -> List[Dict]:
+    return [results[i] for i in sorted(results)]
@@ -0,0 +1,107 @@
+import gzip
+import threading
+from typing import Dict, Optional, Tuple
+
+from flask import Flask, Response, current_app, request
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip is offered without it
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = (
+    "text/html",
+    "text/css",
+    "text/plain",
+    "text/csv",
+    "text/javascript",
+    "application/javascript",
+    "application/json",
+    "application/x-ndjson",
+    "application/xml",
+    "application/manifest+json",
+    "image/svg+xml",
+)
+
+
+def init_compression(app: Flask) -> None:
+    """Compress eligible responses with brotli or gzip, whichever the client prefers."""
+    app.config.setdefault("COMPRESS_MIN_SIZE", 500)
+    app.config.setdefault("COMPRESS_GZIP_LEVEL", 6)
+    app.config.setdefault("COMPRESS_BROTLI_QUALITY", 5)
+    app.after_request(compress_response)
+
+
+def negotiate_encoding() -> Optional[str]:
+    offered = ["br", "gzip"] if brotli is not None else ["gzip"]
+    return request.accept_encodings.best_match(offered)
+
+
+def compress(data: bytes, encoding: str, static: bool = False) -> bytes:
+    """
+    Compress with the configured level. Static assets are compressed once and cached,
+    so they use the maximum level regardless of the per-response setting.
+    """
+    config = current_app.config
+    if encoding == "br":
+        quality = 11 if static else config["COMPRESS_BROTLI_QUALITY"]
+        return brotli.compress(data, quality=quality)
+    level = 9 if static else config["COMPRESS_GZIP_LEVEL"]
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def compress_response(response: Response) -> Response:
+    if (
+        response.status_code < 200
+        or response.status_code >= 300
+        or response.status_code == 204
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    body = response.get_data()
+    if len(body) < current_app.config["COMPRESS_MIN_SIZE"]:
+        return response
+
+    encoding = negotiate_encoding()
+    if not encoding:
+        return response
+
+    response.set_data(compress(body, encoding))
+    response.headers["Content-Encoding"] = encoding
+    # The representation changed, so a strong validator no longer matches byte-for-byte
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+# (path, encoding) -> (version, compressed bytes)
+_static_cache: Dict[Tuple[str, str], Tuple[str, bytes]] = {}
+_static_lock = threading.Lock()
+
+
+def compressed_file(path: str, encoding: str, version: str) -> bytes:
+    """
+    Compressed contents of a built static asset, computed on first use and cached
+    for the life of the process. `version` identifies the contents (the static site
+    manifest's mtime/size tag), so the file is only read again when it changes and
+    requests never stat it.
+    """
+    key = (path, encoding)
+    cached = _static_cache.get(key)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    with _static_lock:
+        cached = _static_cache.get(key)
+        if cached and cached[0] == version:
+            return cached[1]
+        with open(path, "rb") as f:
+            data = compress(f.read(), encoding, static=True)
+        _static_cache[key] = (version, data)
+        return data
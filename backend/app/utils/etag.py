@@ -0,0 +1,41 @@
+import hashlib
+from functools import wraps
+from http import HTTPStatus
+from typing import Callable
+
+from flask import Response, make_response, request
+
+from .table_versions import table_versions
+
+
+def versioned_etag(*tables: str) -> Callable:
+    """
+    Answer conditional GETs from the change versions of the tables a view reads.
+
+    The (weak) ETag is derived from the request URL and the current version of each
+    table, so If-None-Match is checked (and 304 returned) before the view runs any query.
+    Weak validators stay valid when the body is compressed.
+    Responses carry Cache-Control: no-cache so clients revalidate every time.
+    Views run unconditionally when table versions are unavailable.
+    """
+    def decorator(view: Callable) -> Callable:
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            versions = table_versions()
+            if not versions:
+                return view(*args, **kwargs)
+
+            state = ";".join(f"{t}={versions.get(t, 0)}" for t in tables)
+            etag = hashlib.sha1(f"{request.full_path}|{state}".encode("utf-8")).hexdigest()[:32]
+
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=HTTPStatus.NOT_MODIFIED)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != HTTPStatus.OK:
+                    return response
+            response.set_etag(etag, weak=True)
+            response.headers["Cache-Control"] = "no-cache"
+            return response
+        return wrapper
+    return decorator
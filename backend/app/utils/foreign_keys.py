@@ -0,0 +1,52 @@
+from typing import Dict, List, NamedTuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from .. import db
+
+# SQLSTATE raised when an insert/update points at a row that does not exist
+FOREIGN_KEY_VIOLATION = "23503"
+
+
+class ForeignKeyRef(NamedTuple):
+    table: str
+    column: str
+    cascades_on_update: bool
+
+
+# Referencing columns per referenced table, loaded from pg_catalog once per process.
+_foreign_key_map: Dict[str, List[ForeignKeyRef]] = {}
+
+
+def referencing_columns(table: str) -> List[ForeignKeyRef]:
+    """
+    Columns in other tables with a foreign key to `table`, and whether each one
+    is declared ON UPDATE CASCADE. Read with a single catalog query the first time
+    a table is asked for and cached after that; call reset_foreign_key_map() after
+    changing constraints at runtime.
+    """
+    if table not in _foreign_key_map:
+        rows = db.session.execute(
+            text(
+                "SELECT con.conrelid::regclass::text AS table_name, att.attname AS column_name, "
+                "con.confupdtype = 'c' AS cascades "
+                "FROM pg_constraint con "
+                "JOIN pg_attribute att ON att.attrelid = con.conrelid AND att.attnum = ANY(con.conkey) "
+                "WHERE con.contype = 'f' AND con.confrelid = to_regclass(:table) "
+                "AND con.conrelid <> con.confrelid"
+            ),
+            {"table": table},
+        ).all()
+        _foreign_key_map[table] = [ForeignKeyRef(r.table_name, r.column_name, bool(r.cascades)) for r in rows]
+    return _foreign_key_map[table]
+
+
+def reset_foreign_key_map() -> None:
+    _foreign_key_map.clear()
+
+
+def is_foreign_key_violation(error: IntegrityError) -> bool:
+    """True when the IntegrityError came from a foreign key constraint (psycopg2 or psycopg 3)."""
+    orig = getattr(error, "orig", None)
+    return (getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)) == FOREIGN_KEY_VIOLATION
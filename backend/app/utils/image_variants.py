@@ -0,0 +1,164 @@
+import hashlib
+import io
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Tuple
+
+from flask import Flask, current_app
+from sqlalchemy import text
+
+from .. import db
+from .photo_objects import FILL_HASH_SQL
+from .storage import StorageBackend
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # optional: photos are served without variants
+    Image = None
+
+# Avatars render at 40 CSS px; 128 px stays sharp on 3x displays
+THUMBNAIL_SIZE = (128, 128)
+FULL_SIZE = (1024, 1024)
+
+# kind -> (subdirectory next to the original, file extension)
+VARIANT_FORMATS = {
+    "thumbnail": ("thumbs", "webp"),
+    "webp": ("webp", "webp"),
+    "avif": ("avif", "avif"),
+}
+
+RECORD_VARIANTS_SQL = text(
+    "INSERT INTO photo_variants (photo, thumbnail, webp, avif) VALUES (:photo, :thumbnail, :webp, :avif) "
+    "ON CONFLICT (photo) DO UPDATE SET thumbnail = EXCLUDED.thumbnail, webp = EXCLUDED.webp, avif = EXCLUDED.avif"
+)
+
+
+def variant_path(photo_path: str, kind: str) -> str:
+    """student_photos/<name>.jpg -> student_photos/thumbs/<name>.webp (and so on per kind)."""
+    directory, _, name = photo_path.rpartition("/")
+    subdirectory, ext = VARIANT_FORMATS[kind]
+    stem = name.rsplit(".", 1)[0]
+    return f"{directory}/{subdirectory}/{stem}.{ext}" if directory else f"{subdirectory}/{stem}.{ext}"
+
+
+def render_variants(data: bytes) -> Dict[str, bytes]:
+    """Encode the thumbnail and the full-size WebP (and AVIF, when Pillow supports it) of an image."""
+    with Image.open(io.BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original)
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+    full = image.copy()
+    full.thumbnail(FULL_SIZE, Image.LANCZOS)
+    thumbnail = image.copy()
+    thumbnail.thumbnail(THUMBNAIL_SIZE, Image.LANCZOS)
+
+    encoded = {}
+    for kind, picture, fmt, options in (
+        ("thumbnail", thumbnail, "WEBP", {"quality": 75, "method": 4}),
+        ("webp", full, "WEBP", {"quality": 80, "method": 4}),
+        ("avif", full, "AVIF", {"quality": 55}),
+    ):
+        if fmt == "AVIF" and not features.check("avif"):
+            continue
+        buffer = io.BytesIO()
+        picture.save(buffer, fmt, **options)
+        encoded[kind] = buffer.getvalue()
+    return encoded
+
+
+def build_variants(storage: StorageBackend, photo_path: str) -> Tuple[Dict[str, str], str]:
+    """
+    Process-pool job: fetch the original, encode its variants and store them.
+    Returns ({kind: path}, SHA-256 of the original); the hash is taken here because this
+    is the one place that reads back photos uploaded directly to storage.
+    """
+    original = storage.download(photo_path)
+    sha256 = hashlib.sha256(original).hexdigest()
+    paths = {}
+    for kind, data in render_variants(original).items():
+        dest_path = variant_path(photo_path, kind)
+        storage.upload(data, dest_path, content_type=f"image/{VARIANT_FORMATS[kind][1]}")
+        paths[kind] = dest_path
+    return paths, sha256
+
+
+class ImageVariantPipeline:
+    """
+    Generates photo variants in a process pool so decoding and encoding never run on a
+    request worker. Finished variants are recorded in photo_variants, which the student
+    list reads for the avatar thumbnail. A photo whose job fails or is lost keeps being
+    served from the original. The job also hashes the original, which is recorded in
+    photo_objects so later identical uploads reuse it.
+    """
+
+    def __init__(self, app: Flask, workers: int):
+        self.app = app
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a server with live threads (the pool's own, DB and HTTP
+                # clients) can copy held locks into the child. Jobs are the module-level
+                # build_variants with a picklable backend, so the children need no app.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def submit(self, photo_path: str) -> Optional[Future]:
+        storage = self.app.extensions["storage"]
+        try:
+            future = self._pool().submit(build_variants, storage, photo_path)
+        except BrokenProcessPool:
+            with self._lock:
+                self._executor = None
+            future = self._pool().submit(build_variants, storage, photo_path)
+        future.add_done_callback(lambda f: self._record(photo_path, f))
+        return future
+
+    def _record(self, photo_path: str, future: Future) -> None:
+        try:
+            paths, sha256 = future.result()
+        except Exception as e:
+            self.app.logger.warning(f"Failed to generate variants for '{photo_path}': {e}")
+            return
+        with self.app.app_context():
+            try:
+                db.session.execute(RECORD_VARIANTS_SQL, {
+                    "photo": photo_path,
+                    "thumbnail": paths.get("thumbnail"),
+                    "webp": paths.get("webp"),
+                    "avif": paths.get("avif"),
+                })
+                db.session.execute(FILL_HASH_SQL, {"path": photo_path, "sha256": sha256})
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                self.app.logger.exception(f"Failed to record variants for '{photo_path}'.")
+
+
+def init_image_variants(app: Flask) -> None:
+    """Enable the variant pipeline when Pillow is installed and IMAGE_VARIANTS is on."""
+    app.config.setdefault("IMAGE_VARIANTS", True)
+    app.config.setdefault("IMAGE_VARIANT_WORKERS", 2)
+    if Image is None or not app.config["IMAGE_VARIANTS"]:
+        return
+    app.extensions["image_variants"] = ImageVariantPipeline(app, app.config["IMAGE_VARIANT_WORKERS"])
+
+
+def submit_image_variants(photo_path: str) -> Optional[Future]:
+    """
+    Queue variant generation for a newly stored photo; a no-op when the pipeline is disabled
+    or the photo (e.g. a reused upload) already has variants.
+    """
+    pipeline = current_app.extensions.get("image_variants")
+    if pipeline is None:
+        return None
+    if db.session.execute(text("SELECT 1 FROM photo_variants WHERE photo = :photo"), {"photo": photo_path}).first():
+        return None
+    return pipeline.submit(photo_path)
@@ -0,0 +1,59 @@
+import json
+import typing as t
+
+from flask.json.provider import DefaultJSONProvider
+
+from .rowset import RawJSON, RowSet
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to the standard library encoder
+    orjson = None
+
+
+def _default(o: t.Any) -> t.Any:
+    if isinstance(o, RowSet):
+        return o.as_dicts()
+    if isinstance(o, RawJSON):
+        return json.loads(o.text)
+    return DefaultJSONProvider.default(o)
+
+
+def _orjson_default(o: t.Any) -> t.Any:
+    # orjson >= 3.9 copies pre-rendered JSON into the output without parsing it
+    if isinstance(o, RawJSON) and hasattr(orjson, "Fragment"):
+        return orjson.Fragment(o.text)
+    return _default(o)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider that encodes with orjson when it is installed, writing the
+    response body as bytes without an intermediate str. Understands RowSet and
+    RawJSON in addition to everything the default provider handles; a RowSet is
+    turned into one dict per row just before encoding, since the API returns
+    rows as objects.
+    """
+
+    default = staticmethod(_default)
+
+    def dumps(self, obj: t.Any, **kwargs: t.Any) -> str:
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_orjson_default, option=self._options(pretty=False)).decode("utf-8")
+
+    def response(self, *args: t.Any, **kwargs: t.Any):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = self.compact is False or (self.compact is None and self._app.debug)
+        body = orjson.dumps(obj, default=_orjson_default, option=self._options(pretty))
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+    def _options(self, pretty: bool) -> int:
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return option
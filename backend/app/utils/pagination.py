@@ -0,0 +1,304 @@
+import base64
+import json
+from http import HTTPStatus
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import TextClause
+
+from .. import db
+from .rowset import RawJSON, RowSet
+from .search import suggest
+
+# How list_all renders rows: "python" fetches them into a RowSet, "database" has
+# Postgres build the JSON array and passes the text through untouched.
+LIST_RENDERERS = ("python", "database")
+
+# Accepted values for the list endpoints' ?total= parameter:
+#   exact    - COUNT(*) OVER () window in the page query itself (default for numbered pages)
+#   estimate - planner row estimate, no counting
+#   none     - no total; has_next comes from a LIMIT+1 probe (default for cursor pages)
+TOTAL_MODES = ("exact", "estimate", "none")
+
+
+def encode_cursor(sort_by: str, order: str, key: Any, row_id: Any) -> str:
+    """Build an opaque keyset cursor from the active sort key and the row id."""
+    payload = json.dumps({"s": sort_by, "o": order, "k": key, "id": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+# Range of the integer columns cursors are compared against
+INT4_RANGE = (-2 ** 31, 2 ** 31 - 1)
+
+
+def cursor_value_matches(value: Any, expected: Optional[type]) -> bool:
+    """Whether a decoded cursor value can be bound against a column of Python type `expected` (None: no column)."""
+    if expected is None:
+        return value is None
+    if isinstance(value, bool):
+        return False
+    if expected is int:
+        return isinstance(value, int) and INT4_RANGE[0] <= value <= INT4_RANGE[1]
+    if expected is float:
+        return isinstance(value, (int, float)) and value == value
+    return isinstance(value, expected)
+
+
+def decode_cursor(token: str, sort_by: str, order: str, key_type: Optional[type], id_type: type) -> Tuple[Any, Any]:
+    """
+    Decode a cursor produced by encode_cursor. `key_type` and `id_type` are the Python
+    types of the sort column (None when sorting by id alone) and of the id column.
+    Raises ValueError if the token is malformed, was issued for a different sort, or
+    carries values of the wrong type.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    except (ValueError, TypeError, UnicodeError):
+        raise ValueError("Malformed cursor.")
+
+    if not isinstance(payload, dict) or "id" not in payload:
+        raise ValueError("Malformed cursor.")
+    if payload.get("s") != sort_by or payload.get("o") != order:
+        raise ValueError("Cursor does not match the requested sort order.")
+    key, row_id = payload.get("k"), payload["id"]
+    if not cursor_value_matches(key, key_type) or not cursor_value_matches(row_id, id_type):
+        raise ValueError("Cursor values do not match the sort columns.")
+    return key, row_id
+
+
+def keyset_clause(sort_col: Optional[str], id_col: str, order: str, backwards: bool) -> str:
+    """WHERE fragment selecting rows strictly after (or before) :cursor_key / :cursor_id."""
+    op = ">" if (order == "desc") == backwards else "<"
+    if sort_col:
+        return f"({sort_col}, {id_col}) {op} (:cursor_key, :cursor_id)"
+    return f"{id_col} {op} :cursor_id"
+
+
+def order_by_clause(sort_col: Optional[str], id_col: str, order: str, backwards: bool = False) -> str:
+    """ORDER BY on the sort column with the id as tiebreaker, reversed when paging backwards."""
+    descending = (order == "desc") != backwards
+    direction = "DESC" if descending else "ASC"
+    if sort_col:
+        return f"ORDER BY {sort_col} {direction}, {id_col} {direction}"
+    return f"ORDER BY {id_col} {direction}"
+
+
+def trim_keyset_page(rows: Sequence, per_page: int, backwards: bool) -> Tuple[List, bool]:
+    """
+    Drop the LIMIT+1 probe row and restore display order.
+    Returns (rows, has_more) where has_more refers to the direction being paged.
+    """
+    page_rows = list(rows[:per_page])
+    has_more = len(rows) > per_page
+    if backwards:
+        page_rows.reverse()
+    return page_rows, has_more
+
+
+def count_rows(count_sql: TextClause, params: Dict) -> int:
+    """Run a SELECT COUNT(*) statement and return the count."""
+    return db.session.execute(count_sql, params).scalar() or 0
+
+
+def estimate_rows(explain_sql: TextClause, params: Dict) -> int:
+    """Run an EXPLAIN (FORMAT JSON) statement and return the planner's row estimate (no rows are read)."""
+    plan = db.session.execute(explain_sql, params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return max(0, int(plan[0]["Plan"]["Plan Rows"]))
+
+
+class PageResult(NamedTuple):
+    data: Any                          # RowSet or RawJSON of the visible rows, in display order
+    row_count: int
+    has_more: bool                     # the LIMIT+1 probe row came back
+    window_total: Optional[int]        # COUNT(*) OVER () when the page query has it
+    first: Optional[Tuple[Any, Any]]   # (sort key, id) of the first visible row
+    last: Optional[Tuple[Any, Any]]
+
+
+def fetch_page(page_sql: TextClause, params: Dict, columns: Sequence[str], per_page: int, backwards: bool) -> PageResult:
+    """Run a LIMIT+1 page query and keep the rows as tuples."""
+    rows = db.session.execute(page_sql, params).all()
+    window_total = rows[0].total_count if rows and "total_count" in rows[0]._fields else None
+    rows, has_more = trim_keyset_page(rows, per_page, backwards)
+
+    def edge(row):
+        return getattr(row, "sort_key", None), row.id
+
+    return PageResult(
+        RowSet(columns, rows),
+        len(rows),
+        has_more,
+        window_total,
+        edge(rows[0]) if rows else None,
+        edge(rows[-1]) if rows else None,
+    )
+
+
+def fetch_json_page(json_sql: TextClause, params: Dict, per_page: int) -> PageResult:
+    """Run a statement built by json_page_sql; the rows arrive as one JSON text value."""
+    r = db.session.execute(json_sql, {**params, "per_page": per_page}).one()
+    row_count = min(r.fetched, per_page)
+    return PageResult(
+        RawJSON(r.rows_json),
+        row_count,
+        r.fetched > per_page,
+        r.total_count,
+        (r.first_key, r.first_id) if row_count else None,
+        (r.last_key, r.last_id) if row_count else None,
+    )
+
+
+def json_page_sql(page_sql: str, columns: Sequence[str], keyed: bool, order: str, backwards: bool, window: bool) -> str:
+    """
+    Wrap a LIMIT+1 page query so Postgres renders the visible rows as a JSON array
+    (json_agg of json_build_object over `columns`, in display order) and also returns
+    the rows fetched, the window total and the sort key/id of the first and last row.
+    """
+    key_col = "sort_key" if keyed else None
+    fields = ", ".join(f"'{c}', {c}" for c in columns)
+    display_order = order_by_clause(key_col, "id", order)
+    reverse_order = order_by_clause(key_col, "id", order, True)
+    key = key_col or "NULL"
+    total = "(SELECT max(total_count) FROM page)" if window else "NULL"
+    return f"""
+        WITH page AS ({page_sql}),
+        shown AS (SELECT * FROM page {order_by_clause(key_col, "id", order, backwards)} LIMIT :per_page)
+        SELECT
+            (SELECT COALESCE(json_agg(json_build_object({fields}) {display_order}), '[]') FROM shown)::text AS rows_json,
+            (SELECT count(*) FROM page) AS fetched,
+            {total} AS total_count,
+            (SELECT {key} FROM shown {display_order} LIMIT 1) AS first_key,
+            (SELECT id FROM shown {display_order} LIMIT 1) AS first_id,
+            (SELECT {key} FROM shown {reverse_order} LIMIT 1) AS last_key,
+            (SELECT id FROM shown {reverse_order} LIMIT 1) AS last_id
+    """
+
+
+class ListStatements(NamedTuple):
+    """The statements a service's list_all runs, already bound to its search, filters and sort."""
+    count: Callable[[bool], TextClause]                     # estimate -> EXPLAIN or COUNT(*) statement
+    page: Callable[[Optional[str], bool], TextClause]       # (direction, window) -> LIMIT+1 page query
+    json_page: Callable[[Optional[str], bool], TextClause]  # same, wrapped by json_page_sql
+
+
+def list_page(
+    statements: ListStatements,
+    columns: Sequence[str],
+    params: Dict,
+    sort_key: str,
+    order: str,
+    page: int = 1,
+    per_page: int = 10,
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    total_mode: Optional[str] = None,
+    render: str = "python",
+    search: str = "",
+    suggest_candidates: Sequence[Tuple[str, str]] = (),
+    id_type: type = int,
+    key_types: Optional[Dict[str, type]] = None,
+) -> Dict:
+    """
+    Shared body of the list_all methods: decode the cursor, work out the total, run the
+    page query and build the pagination block. `params` holds the bound search/filter
+    parameters and is extended with the cursor and LIMIT/OFFSET ones. Sort keys are
+    text unless `key_types` says otherwise; "relevance" is always a float.
+    Returns {"data", "suggestions", "pagination", "error", "status"}.
+    """
+    cursor = after or before
+    direction = None
+    if cursor:
+        direction = "before" if before and not after else "after"
+        if not sort_key:
+            key_type = None
+        elif sort_key == "relevance":
+            key_type = float
+        else:
+            key_type = (key_types or {}).get(sort_key, str)
+        try:
+            cursor_key, cursor_id = decode_cursor(cursor, sort_key, order, key_type, id_type)
+        except ValueError:
+            return {
+                "data": None,
+                "suggestions": [],
+                "pagination": None,
+                "error": "Invalid pagination cursor.",
+                "status": HTTPStatus.BAD_REQUEST,
+            }
+        params.update({"cursor_key": cursor_key, "cursor_id": cursor_id})
+
+    # Always fetch one extra row so has_next never depends on the total
+    params.update({"limit": per_page + 1, "offset": 0 if cursor else (page - 1) * per_page})
+
+    # Totals: window count in the page query for offset pages; keyset predicates
+    # would shrink the window, so cursor pages count the filtered set separately.
+    # That COUNT(*) would run on every page of a scroll, so cursor pages only
+    # count when the caller asks for it.
+    if total_mode is None:
+        total_mode = "none" if cursor else "exact"
+    total = None
+    window = False
+    if total_mode == "estimate":
+        total = estimate_rows(statements.count(True), params)
+    elif total_mode == "exact":
+        if cursor:
+            total = count_rows(statements.count(False), params)
+        else:
+            window = True
+
+    if render == "database":
+        page_data = fetch_json_page(statements.json_page(direction, window), params, per_page)
+    else:
+        page_data = fetch_page(statements.page(direction, window), params, columns, per_page, direction == "before")
+
+    if window:
+        if page_data.row_count:
+            total = page_data.window_total
+        elif page > 1:
+            # Past the last page the window has no rows to report on
+            total = count_rows(statements.count(False), params)
+        else:
+            total = 0
+
+    has_more = page_data.has_more
+    if cursor:
+        has_next = has_more if direction == "after" else True
+        has_prev = has_more if direction == "before" else True
+    else:
+        has_next = has_more
+        has_prev = page > 1
+
+    total_pages = None
+    if total is not None:
+        total_pages = (total + per_page - 1) // per_page if per_page > 0 else 1
+
+    next_cursor = None
+    prev_cursor = None
+    if page_data.row_count:
+        if has_next:
+            next_cursor = encode_cursor(sort_key, order, *page_data.last)
+        if has_prev:
+            prev_cursor = encode_cursor(sort_key, order, *page_data.first)
+
+    suggestions = []
+    if search and not page_data.row_count and not cursor and page == 1:
+        suggestions = suggest(suggest_candidates, search)
+
+    return {
+        "data": page_data.data,
+        "suggestions": suggestions,
+        "pagination": {
+            "page": None if cursor else page,
+            "per_page": per_page,
+            "total": total,
+            "total_pages": total_pages,
+            "has_next": has_next,
+            "has_prev": has_prev,
+            "next_cursor": next_cursor,
+            "prev_cursor": prev_cursor,
+        },
+        "error": None,
+        "status": HTTPStatus.OK,
+    }
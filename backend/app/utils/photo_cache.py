@@ -0,0 +1,181 @@
+import hashlib
+import json
+import mimetypes
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from flask import Flask, current_app
+
+from .storage import StorageBackend
+
+
+class CachedPhoto(NamedTuple):
+    file: str
+    etag: Optional[str]
+    content_type: str
+
+
+class PhotoCache:
+    """
+    Size-bounded on-disk LRU cache of storage objects for the photo proxy.
+
+    Each object is a file named after a hash of its path, with a small JSON sidecar holding
+    the origin's ETag and content type. A file's mtime is when it was last validated
+    against the storage backend and its atime when it was last served, so the LRU order
+    survives restarts. Entries older than `revalidate_seconds` are revalidated with a
+    conditional fetch; if the backend cannot be reached the stale copy is served.
+
+    The index is per process. Workers sharing a directory each enforce the limit on what
+    they know of, so the directory can briefly exceed it by one worker's share.
+    """
+
+    def __init__(self, root: str, max_bytes: int, revalidate_seconds: int):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self.revalidate_seconds = revalidate_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # file -> size, least recent first
+        self._size = 0
+        self._scan()
+
+    def _scan(self) -> None:
+        found = []
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                if name.endswith(".json") or name.startswith(".fetch-"):
+                    continue
+                file = os.path.join(directory, name)
+                try:
+                    st = os.stat(file)
+                except FileNotFoundError:
+                    continue
+                found.append((st.st_atime, file, st.st_size))
+        for _, file, size in sorted(found):
+            self._entries[file] = size
+            self._size += size
+        self._evict()
+
+    def _file(self, path: str) -> str:
+        digest = hashlib.sha1(path.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, digest[:2], digest)
+
+    def get(self, storage: StorageBackend, path: str) -> Optional[CachedPhoto]:
+        """The cached copy of `path`, fetched or revalidated as needed; None if it does not exist."""
+        file = self._file(path)
+        meta = self._read_meta(file)
+        if meta is not None:
+            try:
+                age = time.time() - os.stat(file).st_mtime
+            except FileNotFoundError:
+                meta = None
+
+        if meta is not None and age < self.revalidate_seconds:
+            self._touch(file, validated=False)
+            return CachedPhoto(file, meta["etag"], meta["content_type"])
+
+        try:
+            fetched = storage.fetch(path, etag=meta["etag"] if meta else None)
+        except Exception as e:
+            if meta is None:
+                raise
+            current_app.logger.warning(f"Photo cache: revalidating '{path}' failed, serving cached copy: {e}")
+            self._touch(file, validated=False)
+            return CachedPhoto(file, meta["etag"], meta["content_type"])
+
+        if fetched is None:
+            self._remove(file)
+            return None
+        if fetched.not_modified and meta is not None:
+            self._touch(file, validated=True)
+            return CachedPhoto(file, meta["etag"], meta["content_type"])
+
+        content_type = fetched.content_type or mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self._store(file, fetched.chunks, {"etag": fetched.etag, "content_type": content_type})
+        return CachedPhoto(file, fetched.etag, content_type)
+
+    def _read_meta(self, file: str) -> Optional[dict]:
+        try:
+            with open(f"{file}.json", "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _store(self, file: str, chunks, meta: dict) -> None:
+        directory = os.path.dirname(file)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".fetch-")
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+            with open(f"{temp_path}.json", "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(f"{temp_path}.json", f"{file}.json")
+            os.replace(temp_path, file)
+        except BaseException:
+            for leftover in (temp_path, f"{temp_path}.json"):
+                try:
+                    os.unlink(leftover)
+                except FileNotFoundError:
+                    pass
+            raise
+
+        with self._lock:
+            self._size += size - self._entries.pop(file, 0)
+            self._entries[file] = size
+            self._evict(keep=file)
+
+    def _touch(self, file: str, validated: bool) -> None:
+        now = time.time()
+        try:
+            st = os.stat(file)
+            os.utime(file, (now, now if validated else st.st_mtime))
+        except FileNotFoundError:
+            return
+        with self._lock:
+            if file in self._entries:
+                self._entries.move_to_end(file)
+            else:
+                self._entries[file] = st.st_size
+                self._size += st.st_size
+                self._evict(keep=file)
+
+    def _remove(self, file: str) -> None:
+        with self._lock:
+            self._size -= self._entries.pop(file, 0)
+        for victim in (file, f"{file}.json"):
+            try:
+                os.unlink(victim)
+            except FileNotFoundError:
+                pass
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        """Drop least recently used files until the cache fits. Called with the lock held."""
+        for file in list(self._entries):
+            if self._size <= self.max_bytes:
+                break
+            if file == keep:
+                continue
+            self._size -= self._entries.pop(file)
+            for victim in (file, f"{file}.json"):
+                try:
+                    os.unlink(victim)
+                except FileNotFoundError:
+                    pass
+
+
+def init_photo_cache(app: Flask) -> None:
+    """Create the disk cache used by /api/photos."""
+    app.config.setdefault("PHOTO_CACHE_MAX_BYTES", 512 * 1024 * 1024)
+    app.config.setdefault("PHOTO_CACHE_REVALIDATE_SECONDS", 24 * 3600)
+    app.extensions["photo_cache"] = PhotoCache(
+        app.config["PHOTO_CACHE_DIR"],
+        app.config["PHOTO_CACHE_MAX_BYTES"],
+        app.config["PHOTO_CACHE_REVALIDATE_SECONDS"],
+    )
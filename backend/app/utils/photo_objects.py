@@ -0,0 +1,65 @@
+from typing import List, Optional
+
+from flask import current_app
+from sqlalchemy import text
+
+from .. import db
+
+# Hand out a stored copy of this content and mark it reused, which holds off its deletion
+# for PHOTO_REUSE_HOLD_SECONDS. The row lock orders this against release_photo_objects:
+# an object released first is not found, and one reused first is not released.
+REUSE_SQL = text(
+    "UPDATE photo_objects SET reused_at = now() WHERE path = ("
+    "SELECT path FROM photo_objects WHERE sha256 = :sha256 ORDER BY refcount DESC, path LIMIT 1"
+    ") RETURNING path"
+)
+
+REGISTER_SQL = text(
+    "INSERT INTO photo_objects (path, sha256) VALUES (:path, :sha256) "
+    "ON CONFLICT (path) DO UPDATE SET sha256 = EXCLUDED.sha256 WHERE photo_objects.sha256 IS NULL"
+)
+
+# Hash of an attached photo computed after the fact (by the variant job). Only an existing
+# row is updated: a photo released in the meantime must not become reusable again.
+FILL_HASH_SQL = text("UPDATE photo_objects SET sha256 = :sha256 WHERE path = :path AND sha256 IS NULL")
+
+# Of :paths, the objects that may be deleted: tracked ones with no references that were not
+# reused recently (their rows are removed here), and untracked ones no student references.
+RELEASE_SQL = text(
+    "WITH released AS ("
+    "DELETE FROM photo_objects WHERE path = ANY(:paths) AND refcount <= 0 "
+    "AND (reused_at IS NULL OR reused_at < now() - make_interval(secs => :hold)) "
+    "RETURNING path"
+    ") "
+    "SELECT path FROM released "
+    "UNION SELECT p FROM unnest(CAST(:paths AS varchar[])) AS p "
+    "WHERE NOT EXISTS (SELECT 1 FROM photo_objects o WHERE o.path = p) "
+    "AND NOT EXISTS (SELECT 1 FROM students s WHERE s.photo = p)"
+)
+
+
+def find_photo_by_hash(sha256: str) -> Optional[str]:
+    """Path of a stored photo with this SHA-256, reserved for reuse, or None. Commits."""
+    path = db.session.execute(REUSE_SQL, {"sha256": sha256}).scalar()
+    db.session.commit()
+    return path
+
+
+def register_photo_hash(path: str, sha256: str) -> None:
+    """Record the content hash of a stored photo so identical uploads can reuse it. Commits."""
+    db.session.execute(REGISTER_SQL, {"path": path, "sha256": sha256})
+    db.session.commit()
+
+
+def release_photo_objects(paths: List[str]) -> List[str]:
+    """
+    Subset of `paths` that is safe to delete from storage, forgetting their hashes so no
+    upload reuses them from here on. Runs in the caller's transaction, which must commit
+    before the objects are deleted.
+    """
+    if not paths:
+        return []
+    return list(db.session.execute(RELEASE_SQL, {
+        "paths": list(paths),
+        "hold": current_app.config["PHOTO_REUSE_HOLD_SECONDS"],
+    }).scalars())
@@ -0,0 +1,100 @@
+import threading
+import time
+from typing import Dict, List
+
+from flask import Flask
+from sqlalchemy import exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+# Upper bounds (ms) of the checkout wait histogram buckets; the last bucket is open-ended
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class WaitHistogram:
+    """Thread-safe histogram of how long callers waited for a pooled connection."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+        self.timeouts = 0
+
+    def record(self, wait_ms: float, timed_out: bool = False) -> None:
+        bucket = next((i for i, bound in enumerate(WAIT_BUCKETS_MS) if wait_ms <= bound), len(WAIT_BUCKETS_MS))
+        with self._lock:
+            self.counts[bucket] += 1
+            self.total += 1
+            self.sum_ms += wait_ms
+            self.max_ms = max(self.max_ms, wait_ms)
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counts = list(self.counts)
+            total, sum_ms, max_ms, timeouts = self.total, self.sum_ms, self.max_ms, self.timeouts
+
+        buckets: List[Dict] = [{"le_ms": bound, "count": counts[i]} for i, bound in enumerate(WAIT_BUCKETS_MS)]
+        buckets.append({"le_ms": None, "count": counts[-1]})
+        return {
+            "checkouts": total,
+            "timeouts": timeouts,
+            "avg_ms": round(sum_ms / total, 3) if total else 0.0,
+            "max_ms": round(max_ms, 3),
+            "buckets": buckets,
+        }
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool that records how long each checkout took (queueing, connecting and
+    pre-ping) and how many gave up after pool_timeout.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_histogram = WaitHistogram()
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.wait_histogram.record((time.perf_counter() - start) * 1000, timed_out=True)
+            raise
+        self.wait_histogram.record((time.perf_counter() - start) * 1000)
+        return connection
+
+    def recreate(self) -> "TimedQueuePool":
+        # dispose() swaps in a fresh pool; keep the history
+        pool = super().recreate()
+        pool.wait_histogram = self.wait_histogram
+        return pool
+
+
+def init_pool_metrics(app: Flask) -> None:
+    """Use TimedQueuePool for the app's engines. Must run before db.init_app()."""
+    options = dict(app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+    options.setdefault("poolclass", TimedQueuePool)
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+
+
+def pool_status(engine: Engine) -> Dict:
+    """Live counters for an engine's pool, plus the wait histogram when it is timed."""
+    pool = engine.pool
+    status = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            # QueuePool counts overflow from -size until the pool has filled up
+            "overflow": max(pool.overflow(), 0),
+            "timeout_s": pool.timeout(),
+        })
+    if isinstance(pool, TimedQueuePool):
+        status["wait"] = pool.wait_histogram.snapshot()
+    return status
@@ -0,0 +1,21 @@
+import functools
+
+from sqlalchemy import text
+
+
+def cached_statement(maxsize: int = 256):
+    """
+    Cache the text() statement produced by a SQL builder, keyed by its hashable
+    shape arguments (search mode, active filters, sort, direction, ...).
+
+    The builder's string assembly runs once per distinct shape; every later call
+    returns the same TextClause, so SQLAlchemy's compiled cache is hit directly and,
+    on drivers that prepare repeated statements (psycopg 3), the server-side plan is reused.
+    """
+    def decorator(builder):
+        @functools.lru_cache(maxsize=maxsize)
+        @functools.wraps(builder)
+        def wrapper(*shape):
+            return text(builder(*shape))
+        return wrapper
+    return decorator
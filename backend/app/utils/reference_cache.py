@@ -0,0 +1,75 @@
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import text
+
+from .. import db
+from .table_versions import forget_table_versions, table_versions
+
+
+class ReferenceData(NamedTuple):
+    """Snapshot of colleges and programs. The dicts are shared; copy before modifying."""
+    versions: Tuple[Optional[int], Optional[int]]
+    colleges_by_id: Dict[int, Dict]
+    colleges_by_code: Dict[str, Dict]
+    programs_by_id: Dict[int, Dict]
+    programs_by_code: Dict[str, Dict]
+    programs_by_college: Dict[int, List[Dict]]
+
+
+# Process-wide snapshot, replaced whenever the colleges/programs versions move on.
+_snapshot: Optional[ReferenceData] = None
+_lock = threading.Lock()
+
+
+def reference_data() -> ReferenceData:
+    """
+    Colleges and programs indexed by id, upper-cased code and college id.
+
+    The snapshot is checked against the colleges/programs table versions once per
+    request and reloaded (two small queries) when another worker has written to
+    either table. Writes made through this process call invalidate_reference_data().
+    """
+    global _snapshot
+    versions = table_versions()
+    key = (versions.get("colleges"), versions.get("programs"))
+
+    snapshot = _snapshot
+    if snapshot is None or snapshot.versions != key:
+        with _lock:
+            snapshot = _snapshot
+            if snapshot is None or snapshot.versions != key:
+                snapshot = _load(key)
+                _snapshot = snapshot
+    return snapshot
+
+
+def invalidate_reference_data() -> None:
+    """Discard the snapshot after a committed write to colleges or programs."""
+    global _snapshot
+    _snapshot = None
+    forget_table_versions()
+
+
+def _load(versions: Tuple[Optional[int], Optional[int]]) -> ReferenceData:
+    colleges = [
+        dict(r) for r in db.session.execute(text("SELECT id, code, name FROM colleges ORDER BY id")).mappings()
+    ]
+    programs = [
+        dict(r)
+        for r in db.session.execute(text("SELECT id, college_id, code, name FROM programs ORDER BY id")).mappings()
+    ]
+
+    programs_by_college: Dict[int, List[Dict]] = {}
+    for program in programs:
+        if program["college_id"] is not None:
+            programs_by_college.setdefault(program["college_id"], []).append(program)
+
+    return ReferenceData(
+        versions=versions,
+        colleges_by_id={c["id"]: c for c in colleges},
+        colleges_by_code={c["code"].upper(): c for c in colleges},
+        programs_by_id={p["id"]: p for p in programs},
+        programs_by_code={p["code"].upper(): p for p in programs},
+        programs_by_college=programs_by_college,
+    )
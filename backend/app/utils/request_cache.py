@@ -0,0 +1,35 @@
+from typing import Any, Dict, Hashable, Tuple
+
+from flask import g, has_app_context
+
+# Returned by cache_get when nothing is cached; None is a valid cached value ("does not exist").
+MISSING = object()
+
+
+def _entries() -> Dict[Tuple[str, Hashable], Any]:
+    if "_entity_cache" not in g:
+        g._entity_cache = {}
+    return g._entity_cache
+
+
+def cache_get(kind: str, key: Hashable) -> Any:
+    """
+    Look up an entity loaded earlier in the same request (or app context).
+    Routes and services share the cache, so a row read by a route for a precondition
+    check is not read again by the service it calls.
+    """
+    if not has_app_context():
+        return MISSING
+    return _entries().get((kind, key), MISSING)
+
+
+def cache_put(kind: str, key: Hashable, value: Any) -> Any:
+    """Remember an entity (or None for a confirmed miss) for the rest of the request and return it."""
+    if has_app_context():
+        _entries()[(kind, key)] = value
+    return value
+
+
+def cache_evict(kind: str, key: Hashable) -> None:
+    if has_app_context():
+        _entries().pop((kind, key), None)
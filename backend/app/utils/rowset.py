@@ -0,0 +1,36 @@
+from typing import Dict, Iterator, List, Sequence
+
+
+class RowSet:
+    """
+    Query rows plus their column names, handed from services to routes as fetched.
+    The app's JSON provider serializes it as a list of objects, building the dicts
+    only then. Rows may carry extra trailing columns (sort keys, window counts);
+    only the named leading columns are emitted.
+    """
+
+    __slots__ = ("columns", "rows")
+
+    def __init__(self, columns: Sequence[str], rows: Sequence[Sequence]):
+        self.columns = tuple(columns)
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __iter__(self) -> Iterator[Dict]:
+        columns = self.columns
+        return (dict(zip(columns, row)) for row in self.rows)
+
+    def as_dicts(self) -> List[Dict]:
+        columns = self.columns
+        return [dict(zip(columns, row)) for row in self.rows]
+
+
+class RawJSON:
+    """JSON text rendered elsewhere (e.g. by Postgres) that the JSON provider embeds as-is."""
+
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
@@ -0,0 +1,59 @@
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+
+from .. import db
+
+# Cached result of the pg_trgm probe; None until the first search runs.
+_trigram_enabled: Optional[bool] = None
+
+
+def trigram_enabled() -> bool:
+    """Return True when the pg_trgm extension is installed (checked once per process)."""
+    global _trigram_enabled
+    if _trigram_enabled is None:
+        try:
+            found = db.session.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).scalar()
+            _trigram_enabled = bool(found)
+        except Exception:
+            db.session.rollback()
+            _trigram_enabled = False
+    return _trigram_enabled
+
+
+def substring_clause(columns: Sequence[str]) -> str:
+    """
+    OR of ILIKE :search predicates. Each column has a gin_trgm_ops index, so the
+    planner can combine them with a BitmapOr instead of scanning the table.
+    """
+    return "(" + " OR ".join(f"{col} ILIKE :search" for col in columns) + ")"
+
+
+def relevance_expression(columns: Sequence[str]) -> str:
+    """Best word similarity of :search_term across columns, as a non-null float8 sort key."""
+    scores = ", ".join(f"COALESCE(word_similarity(:search_term, {col}), 0)" for col in columns)
+    return f"CAST(GREATEST({scores}) AS double precision)"
+
+
+def suggest(candidates: Sequence[Tuple[str, str]], term: str, limit: int = 5) -> List[str]:
+    """
+    "Did you mean" lookup: values from (table, column) candidates that are
+    trigram-similar to term, best match first. Returns [] without pg_trgm.
+    """
+    if not term or len(term) < 3 or not trigram_enabled():
+        return []
+
+    parts = [
+        f"SELECT {col} AS term, similarity({col}, :term) AS score FROM {table} WHERE {col} % :term"
+        for table, col in candidates
+    ]
+    sql = text(
+        f"SELECT term FROM ({' UNION ALL '.join(parts)}) t "
+        f"GROUP BY term ORDER BY MAX(score) DESC, term LIMIT :limit"
+    )
+    try:
+        rows = db.session.execute(sql, {"term": term, "limit": limit}).scalars().all()
+    except Exception:
+        db.session.rollback()
+        return []
+    return list(rows)
@@ -0,0 +1,17 @@
+from typing import Optional
+
+from flask import current_app
+from sqlalchemy import text
+
+from .. import db
+
+
+def set_statement_timeout(ms: Optional[int] = None) -> None:
+    """
+    Override the connection's statement_timeout for the rest of the current transaction
+    (SET LOCAL semantics, so the pooled connection goes back with the default).
+    Defaults to DB_BULK_STATEMENT_TIMEOUT_MS; 0 disables the limit.
+    """
+    if ms is None:
+        ms = current_app.config.get("DB_BULK_STATEMENT_TIMEOUT_MS", 0)
+    db.session.execute(text("SELECT set_config('statement_timeout', :ms, true)"), {"ms": str(int(ms))})
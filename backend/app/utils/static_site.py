@@ -0,0 +1,104 @@
+import mimetypes
+import os
+import re
+from typing import Dict, NamedTuple, Optional
+
+from flask import Response, current_app, request, send_file
+
+from .compression import COMPRESSIBLE_MIMETYPES, compressed_file, negotiate_encoding
+
+# Vite emits content-hashed names such as assets/index-BdX3k9aZ.js
+FINGERPRINTED = re.compile(r"^assets/.+-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+class StaticFile(NamedTuple):
+    path: str
+    size: int
+    mtime: float
+    etag: str
+    mimetype: str
+    immutable: bool
+
+
+class StaticSite:
+    """
+    Serves a built single-page app from memory and a startup manifest.
+
+    The build directory is walked once, so requests never stat the filesystem
+    to decide what to send. index.html is kept in memory and returned for client-side
+    routes. Fingerprinted assets get a one-year immutable Cache-Control, everything
+    else must revalidate; ETag and If-Modified-Since are answered with 304.
+    Compressible files are sent from the precompressed cache, others via send_file
+    so the WSGI server can use its file wrapper (sendfile).
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.realpath(root)
+        self.files: Dict[str, StaticFile] = {}
+        self.index: Optional[StaticFile] = None
+        self.index_body = b""
+        self.reload()
+
+    def reload(self) -> None:
+        files = {}
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                full_path = os.path.join(directory, name)
+                rel_path = os.path.relpath(full_path, self.root).replace(os.sep, "/")
+                stat = os.stat(full_path)
+                files[rel_path] = StaticFile(
+                    path=full_path,
+                    size=stat.st_size,
+                    mtime=stat.st_mtime,
+                    etag=f"{stat.st_mtime_ns:x}-{stat.st_size:x}",
+                    mimetype=mimetypes.guess_type(name)[0] or "application/octet-stream",
+                    immutable=bool(FINGERPRINTED.match(rel_path)),
+                )
+        self.files = files
+        self.index = files.get("index.html")
+        if self.index:
+            with open(self.index.path, "rb") as f:
+                self.index_body = f.read()
+
+    def lookup(self, path: str) -> Optional[StaticFile]:
+        """File to send for a request path: the file itself, or index.html for client-side routes."""
+        found = self.files.get(path)
+        if found:
+            return found
+        if path.startswith("assets/"):
+            # A missing hashed asset is a stale client; the SPA shell would not help it
+            return None
+        return self.index
+
+    def serve(self, path: str) -> Optional[Response]:
+        """Response for `path`, or None if there is nothing to send."""
+        static_file = self.lookup(path)
+        if static_file is None:
+            return None
+
+        encoding = None
+        if static_file.mimetype in COMPRESSIBLE_MIMETYPES and static_file.size >= current_app.config["COMPRESS_MIN_SIZE"]:
+            encoding = negotiate_encoding()
+
+        if encoding:
+            response = Response(compressed_file(static_file.path, encoding, static_file.etag), mimetype=static_file.mimetype)
+            response.headers["Content-Encoding"] = encoding
+            etag = f"{static_file.etag}-{encoding}"
+        elif static_file is self.index:
+            response = Response(self.index_body, mimetype=static_file.mimetype)
+            etag = static_file.etag
+        else:
+            response = send_file(static_file.path, mimetype=static_file.mimetype, etag=False, conditional=False)
+            etag = static_file.etag
+
+        if static_file.mimetype in COMPRESSIBLE_MIMETYPES:
+            response.vary.add("Accept-Encoding")
+        response.set_etag(etag)
+        response.last_modified = static_file.mtime
+        response.headers["Cache-Control"] = (
+            IMMUTABLE_CACHE_CONTROL if static_file.immutable else REVALIDATE_CACHE_CONTROL
+        )
+        return response.make_conditional(request)
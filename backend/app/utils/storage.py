@@ -0,0 +1,282 @@
+import hashlib
+import hmac
+import mimetypes
+import os
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import IO, Iterator, List, NamedTuple, Optional, Union
+from urllib.parse import quote
+
+from flask import Flask, current_app, url_for
+
+from . import supabase_storage
+from .uploads import UPLOAD_CHUNK_SIZE
+
+
+class StoredObject(NamedTuple):
+    path: str
+    updated_at: Union[datetime, str]  # datetime, or an ISO 8601 string as the API returned it
+
+
+class FetchedObject(NamedTuple):
+    not_modified: bool
+    chunks: Iterator[bytes]  # empty when not_modified
+    etag: Optional[str]
+    content_type: Optional[str]
+
+
+class StorageBackend(ABC):
+    """
+    Where student photos live. Keys are slash-separated paths such as
+    student_photos/<name>.jpg; every backend maps them onto its own layout.
+    Backends must be picklable: the image variant pool receives them as job arguments.
+    """
+
+    @abstractmethod
+    def get_public_url(self, path: Optional[str]) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def upload(self, data: Union[bytes, IO[bytes]], path: str, content_type: Optional[str] = None) -> str:
+        ...
+
+    @abstractmethod
+    def download(self, path: str) -> bytes:
+        ...
+
+    @abstractmethod
+    def delete_many(self, paths: List[str]) -> None:
+        """Delete objects; paths that do not exist are not an error."""
+
+    @abstractmethod
+    def size(self, path: str) -> Optional[int]:
+        """Size in bytes, or None if the object does not exist."""
+
+    @abstractmethod
+    def signed_upload_url(self, path: str) -> str:
+        """URL a client can PUT the object to without credentials."""
+
+    @abstractmethod
+    def iter_objects(self, prefix: str, page_size: int = 1000) -> Iterator[List[StoredObject]]:
+        """Every object under the `prefix` directory, recursively, in pages of at most page_size."""
+
+    @abstractmethod
+    def fetch(self, path: str, etag: Optional[str] = None) -> Optional[FetchedObject]:
+        """
+        Stream an object, or report it unchanged when it still matches `etag`.
+        None if the object does not exist. The chunks must be consumed or closed.
+        """
+
+
+class SupabaseStorage(StorageBackend):
+    """Supabase Storage over its HTTP API (see supabase_storage.py)."""
+
+    def get_public_url(self, path):
+        return supabase_storage.get_public_url(path)
+
+    def upload(self, data, path, content_type=None):
+        return supabase_storage.upload_object(data, path, content_type=content_type)
+
+    def download(self, path):
+        return supabase_storage.download_object(path)
+
+    def delete_many(self, paths):
+        supabase_storage.delete_objects(paths)
+
+    def size(self, path):
+        return supabase_storage.object_size(path)
+
+    def signed_upload_url(self, path):
+        return supabase_storage.create_signed_upload_url(path)
+
+    def fetch(self, path, etag=None):
+        resp = supabase_storage.fetch_object(path, etag=etag)
+        if resp.status_code in (400, 404):
+            resp.close()
+            return None
+        if resp.status_code == 304:
+            resp.close()
+            return FetchedObject(True, iter(()), etag, None)
+
+        def chunks():
+            with resp:
+                yield from resp.iter_content(UPLOAD_CHUNK_SIZE)
+
+        return FetchedObject(False, chunks(), resp.headers.get("ETag"), resp.headers.get("Content-Type"))
+
+    def iter_objects(self, prefix, page_size=1000):
+        folders = [prefix.strip("/")]
+        while folders:
+            folder = folders.pop()
+            offset = 0
+            while True:
+                entries = supabase_storage.list_objects(folder, limit=page_size, offset=offset)
+                page = []
+                for entry in entries:
+                    path = f"{folder}/{entry['name']}"
+                    if entry.get("id") is None:
+                        folders.append(path)
+                    else:
+                        page.append(StoredObject(path, entry.get("updated_at") or entry.get("created_at")))
+                if page:
+                    yield page
+                if len(entries) < page_size:
+                    break
+                offset += page_size
+
+
+class LocalStorage(StorageBackend):
+    """
+    Objects stored as files under `root`. Files are spread over two levels of
+    directories named after a hash of the key, so no directory grows past a few thousand
+    entries. Writes go to a temporary file in the target directory that is fsynced and
+    renamed into place, so readers never see a partial object. Objects are served by
+    the storage blueprint with send_file, which the WSGI server turns into sendfile().
+    """
+
+    def __init__(self, root: str, public_base_url: str, signing_key: str, upload_url_seconds: int):
+        self.root = os.path.abspath(root)
+        self.public_base_url = public_base_url.rstrip("/")
+        self.signing_key = signing_key
+        self.upload_url_seconds = upload_url_seconds
+
+    def file_path(self, path: str) -> str:
+        parts = path.split("/")
+        if not path or any(part in ("", ".", "..") for part in parts):
+            raise ValueError(f"Invalid storage path: {path!r}")
+        digest = hashlib.sha1(path.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, *parts[:-1], digest[:2], digest[2:4], parts[-1])
+
+    def get_public_url(self, path):
+        if not path:
+            return None
+        return f"{self.public_base_url}/{quote(path)}"
+
+    def upload(self, data, path, content_type=None):
+        target = self.file_path(path)
+        directory = os.path.dirname(target)
+        os.makedirs(directory, exist_ok=True)
+
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                if isinstance(data, (bytes, bytearray)):
+                    f.write(data)
+                else:
+                    while True:
+                        chunk = data.read(UPLOAD_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, target)
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        return path
+
+    def download(self, path):
+        try:
+            with open(self.file_path(path), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise RuntimeError(f"Storage object not found: {path}")
+
+    def delete_many(self, paths):
+        for path in paths:
+            if not path:
+                continue
+            try:
+                os.unlink(self.file_path(path))
+            except FileNotFoundError:
+                pass
+
+    def size(self, path):
+        try:
+            return os.stat(self.file_path(path)).st_size
+        except FileNotFoundError:
+            return None
+
+    def signed_upload_url(self, path):
+        expires = int(time.time()) + self.upload_url_seconds
+        return url_for(
+            "storage.upload_object",
+            path=path,
+            expires=expires,
+            signature=self.upload_signature(path, expires),
+            _external=True,
+        )
+
+    def fetch(self, path, etag=None):
+        file_path = self.file_path(path)
+        try:
+            st = os.stat(file_path)
+        except FileNotFoundError:
+            return None
+        current = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+        if etag == current:
+            return FetchedObject(True, iter(()), etag, None)
+
+        def chunks():
+            with open(file_path, "rb") as f:
+                yield from iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b"")
+
+        return FetchedObject(False, chunks(), current, mimetypes.guess_type(path)[0])
+
+    def iter_objects(self, prefix, page_size=1000):
+        page = []
+        for directory, _, names in os.walk(os.path.join(self.root, prefix.strip("/"))):
+            parts = os.path.relpath(directory, self.root).split(os.sep)
+            if len(parts) < 3:
+                continue
+            # <key dirs>/<shard>/<shard>/<name> -> <key dirs>/<name>
+            key_dir = "/".join(parts[:-2])
+            for name in names:
+                if name.startswith(".upload-"):
+                    continue
+                try:
+                    mtime = os.stat(os.path.join(directory, name)).st_mtime
+                except FileNotFoundError:
+                    continue
+                page.append(StoredObject(f"{key_dir}/{name}", datetime.fromtimestamp(mtime, timezone.utc)))
+                if len(page) >= page_size:
+                    yield page
+                    page = []
+        if page:
+            yield page
+
+    def upload_signature(self, path: str, expires: int) -> str:
+        message = f"{path}:{expires}".encode("utf-8")
+        return hmac.new(self.signing_key.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+    def verify_upload(self, path: str, expires: int, signature: str) -> bool:
+        if expires < time.time():
+            return False
+        return hmac.compare_digest(self.upload_signature(path, expires), signature)
+
+
+def init_storage(app: Flask) -> None:
+    """Create the backend named by STORAGE_BACKEND ("supabase" or "local")."""
+    app.config.setdefault("STORAGE_BACKEND", "supabase")
+    if app.config["STORAGE_BACKEND"] == "local":
+        backend = LocalStorage(
+            root=app.config["LOCAL_STORAGE_ROOT"],
+            public_base_url=app.config["LOCAL_STORAGE_URL"],
+            signing_key=app.config["SECRET_KEY"],
+            upload_url_seconds=app.config["PHOTO_UPLOAD_TOKEN_SECONDS"],
+        )
+    elif app.config["STORAGE_BACKEND"] == "supabase":
+        backend = SupabaseStorage()
+    else:
+        raise ValueError(f"Unknown STORAGE_BACKEND: {app.config['STORAGE_BACKEND']!r}")
+    app.extensions["storage"] = backend
+
+
+def get_storage() -> StorageBackend:
+    return current_app.extensions["storage"]
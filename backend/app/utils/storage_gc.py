@@ -0,0 +1,115 @@
+from typing import Dict, List
+
+import click
+from flask import Flask, current_app
+from sqlalchemy import text
+
+from .. import db
+from .photo_objects import release_photo_objects
+from .statement_timeout import set_statement_timeout
+from .storage import get_storage
+from .uploads import PHOTO_DIRECTORY
+
+# Scratch table for one collection run; dropped when its transaction ends
+CREATE_STAGING_SQL = text(
+    "CREATE TEMP TABLE storage_gc_objects (path text PRIMARY KEY, updated_at timestamptz NOT NULL) ON COMMIT DROP"
+)
+
+STAGE_PAGE_SQL = text(
+    "INSERT INTO storage_gc_objects (path, updated_at) "
+    "SELECT * FROM unnest(CAST(:paths AS text[]), CAST(:updated AS timestamptz[])) "
+    "ON CONFLICT (path) DO NOTHING"
+)
+
+# Live objects are the photos students reference or an upload reused recently, and those
+# photos' variants; anything else listed before the grace period is an orphan.
+ORPHANS_SQL = text(
+    "WITH live_photos AS ("
+    "SELECT photo AS path FROM students WHERE photo IS NOT NULL "
+    "UNION SELECT path FROM photo_objects WHERE reused_at >= now() - make_interval(secs => :hold)"
+    "), live AS ("
+    "SELECT path FROM live_photos "
+    "UNION SELECT unnest(ARRAY[v.thumbnail, v.webp, v.avif]) FROM photo_variants v "
+    "JOIN live_photos l ON l.path = v.photo"
+    ") "
+    "SELECT o.path FROM storage_gc_objects o LEFT JOIN live ON live.path = o.path "
+    "WHERE live.path IS NULL AND o.updated_at < now() - make_interval(secs => :grace) "
+    "ORDER BY o.path"
+)
+
+# Variants among :paths whose photo became live since the listing was compared
+# (originals are re-checked by release_photo_objects)
+LIVE_VARIANTS_SQL = text(
+    "SELECT unnest(ARRAY[v.thumbnail, v.webp, v.avif]) FROM photo_variants v "
+    "WHERE (v.thumbnail = ANY(:paths) OR v.webp = ANY(:paths) OR v.avif = ANY(:paths)) "
+    "AND (EXISTS (SELECT 1 FROM students s WHERE s.photo = v.photo) "
+    "OR EXISTS (SELECT 1 FROM photo_objects p WHERE p.path = v.photo "
+    "AND p.reused_at >= now() - make_interval(secs => :hold)))"
+)
+
+
+def collect_orphaned_photos(grace_seconds: int, page_size: int = 1000, dry_run: bool = False) -> Dict:
+    """
+    Delete stored photos (and variants) that no student references and that are older than
+    `grace_seconds`, e.g. uploads whose form was never submitted. The bucket listing is
+    staged page by page into a temporary table and compared against students with one
+    anti-join. Needs an app context; returns counts and, for dry runs, the orphan paths.
+    """
+    storage = get_storage()
+    hold = current_app.config["PHOTO_REUSE_HOLD_SECONDS"]
+    listed = 0
+    try:
+        set_statement_timeout()
+        db.session.execute(CREATE_STAGING_SQL)
+        for page in storage.iter_objects(PHOTO_DIRECTORY, page_size=page_size):
+            db.session.execute(STAGE_PAGE_SQL, {
+                "paths": [o.path for o in page],
+                "updated": [o.updated_at for o in page],
+            })
+            listed += len(page)
+        db.session.execute(text("ANALYZE storage_gc_objects"))
+        orphans: List[str] = list(db.session.execute(ORPHANS_SQL, {"grace": grace_seconds, "hold": hold}).scalars())
+    finally:
+        db.session.rollback()
+
+    stats = {"listed": listed, "orphans": len(orphans), "deleted": 0}
+    if dry_run:
+        stats["paths"] = orphans
+        return stats
+
+    for start in range(0, len(orphans), page_size):
+        batch = orphans[start:start + page_size]
+        # A photo attached or reused since the anti-join ran is kept
+        live = set(db.session.execute(LIVE_VARIANTS_SQL, {"paths": batch, "hold": hold}).scalars())
+        batch = release_photo_objects([p for p in batch if p not in live])
+        db.session.commit()
+
+        storage.delete_many(batch)
+        db.session.execute(text("DELETE FROM photo_variants WHERE photo = ANY(:paths)"), {"paths": batch})
+        db.session.commit()
+        stats["deleted"] += len(batch)
+
+    current_app.logger.info(
+        f"Storage GC: listed {stats['listed']} object(s), deleted {stats['deleted']} orphan(s)."
+    )
+    return stats
+
+
+def init_storage_gc(app: Flask) -> None:
+    """Register `flask storage-gc`, meant to run from cron."""
+    app.config.setdefault("STORAGE_GC_GRACE_SECONDS", 24 * 3600)
+    app.config.setdefault("STORAGE_GC_PAGE_SIZE", 1000)
+
+    @app.cli.command("storage-gc")
+    @click.option("--dry-run", is_flag=True, help="List orphans without deleting them.")
+    @click.option("--grace", type=int, default=None, help="Keep objects younger than this many seconds.")
+    def storage_gc_command(dry_run: bool, grace: int) -> None:
+        """Delete student photos in storage that no student references."""
+        stats = collect_orphaned_photos(
+            grace if grace is not None else app.config["STORAGE_GC_GRACE_SECONDS"],
+            page_size=app.config["STORAGE_GC_PAGE_SIZE"],
+            dry_run=dry_run,
+        )
+        for path in stats.pop("paths", []):
+            click.echo(path)
+        click.echo(", ".join(f"{key}: {value}" for key, value in stats.items()))
@@ -0,0 +1,188 @@
+import threading
+from typing import Dict, List
+
+from flask import Flask, current_app
+from sqlalchemy import text
+
+from .. import db
+from .photo_objects import release_photo_objects
+from .storage import get_storage
+
+# Claim due rows for this worker: pushing next_attempt_at out by the lease hides them from
+# other workers while the storage call runs, and makes them due again if this one crashes.
+CLAIM_SQL = text(
+    "UPDATE storage_outbox SET attempts = attempts + 1, "
+    "next_attempt_at = now() + make_interval(secs => :lease) "
+    "WHERE id IN ("
+    "SELECT id FROM storage_outbox WHERE next_attempt_at <= now() "
+    "ORDER BY next_attempt_at, id LIMIT :limit FOR UPDATE SKIP LOCKED"
+    ") RETURNING id, path"
+)
+
+# Push rows for unreferenced photos that an upload reused back until the reuse hold ends
+HOLD_SQL = text(
+    "UPDATE storage_outbox o SET next_attempt_at = p.reused_at + make_interval(secs => :hold) "
+    "FROM photo_objects p WHERE o.id = ANY(:ids) AND p.path = o.path AND p.refcount <= 0 "
+    "AND p.reused_at >= now() - make_interval(secs => :hold) RETURNING o.id"
+)
+
+# Exponential backoff with jitter: base * 2^(attempts - 1), capped, scaled by 0.5-1.0
+RETRY_SQL = text(
+    "UPDATE storage_outbox SET last_error = :error, "
+    "next_attempt_at = now() + make_interval(secs => "
+    "LEAST(:max_backoff, :base_backoff * power(2, attempts - 1)) * (0.5 + random() / 2)) "
+    "WHERE id = ANY(:ids)"
+)
+
+
+class StorageOutboxWorker:
+    """
+    Background thread that deletes storage objects queued in storage_outbox.
+
+    Each pass claims a batch of due rows, skips paths a student references again,
+    holds back unreferenced ones an upload reused recently (see photo_objects), removes
+    the rest and their image variants with one bulk storage call and deletes the rows.
+    A failed call leaves the rows in place with an exponential backoff, so nothing is
+    lost if the storage backend is down or the process dies mid-batch.
+    """
+
+    def __init__(self, app: Flask):
+        self.app = app
+        self.config = app.config
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._table_checked = False
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="storage-outbox", daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    if not self._table_checked:
+                        if not self._table_exists():
+                            self.app.logger.warning("storage_outbox table not found; storage outbox worker stopped.")
+                            return
+                        self._table_checked = True
+                    # Keep going while full batches come back
+                    while self.drain_once() >= self.config["STORAGE_OUTBOX_BATCH_SIZE"]:
+                        pass
+            except Exception:
+                self.app.logger.exception("Storage outbox pass failed.")
+            self._wake.wait(self.config["STORAGE_OUTBOX_POLL_SECONDS"])
+            self._wake.clear()
+
+    def _table_exists(self) -> bool:
+        exists = db.session.execute(text("SELECT to_regclass('storage_outbox') IS NOT NULL")).scalar()
+        db.session.rollback()
+        return bool(exists)
+
+    def drain_once(self) -> int:
+        """Process one batch of due rows; returns how many were claimed. Needs an app context."""
+        try:
+            claimed = db.session.execute(CLAIM_SQL, {
+                "lease": self.config["STORAGE_OUTBOX_LEASE_SECONDS"],
+                "limit": self.config["STORAGE_OUTBOX_BATCH_SIZE"],
+            }).mappings().all()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        if not claimed:
+            return 0
+
+        ids = [r["id"] for r in claimed]
+        paths = sorted({r["path"] for r in claimed})
+        try:
+            orphans = release_photo_objects(paths)
+            # Unreferenced objects an upload reused recently wait out the hold
+            held = set(db.session.execute(HOLD_SQL, {
+                "ids": ids, "hold": self.config["PHOTO_REUSE_HOLD_SECONDS"],
+            }).scalars())
+            variants = db.session.execute(
+                text("SELECT thumbnail, webp, avif FROM photo_variants WHERE photo = ANY(:paths)"), {"paths": orphans}
+            ).all()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        ids = [i for i in ids if i not in held]
+        try:
+            get_storage().delete_many(orphans + [v for row in variants for v in row if v])
+        except Exception as e:
+            self._retry_later(ids, str(e))
+            self.app.logger.warning(f"Storage outbox: deleting {len(orphans)} object(s) failed, will retry: {e}")
+            return len(claimed)
+
+        db.session.execute(text("DELETE FROM photo_variants WHERE photo = ANY(:paths)"), {"paths": orphans})
+        db.session.execute(text("DELETE FROM storage_outbox WHERE id = ANY(:ids)"), {"ids": ids})
+        db.session.commit()
+        return len(claimed)
+
+    def _retry_later(self, ids: List[int], error: str) -> None:
+        try:
+            db.session.execute(RETRY_SQL, {
+                "ids": ids,
+                "error": error[:1000],
+                "base_backoff": self.config["STORAGE_OUTBOX_BASE_BACKOFF_SECONDS"],
+                "max_backoff": self.config["STORAGE_OUTBOX_MAX_BACKOFF_SECONDS"],
+            })
+            db.session.commit()
+        except Exception:
+            # The lease still expires, so the rows come back without the backoff
+            db.session.rollback()
+            self.app.logger.exception("Storage outbox: failed to reschedule rows.")
+
+
+def init_storage_outbox(app: Flask) -> None:
+    """
+    Set up the outbox worker for this process. Unless STORAGE_OUTBOX_WORKER is disabled it
+    starts with the first request, so CLI commands and a preloading master never run it.
+    """
+    defaults: Dict = {
+        "STORAGE_OUTBOX_WORKER": True,
+        "STORAGE_OUTBOX_POLL_SECONDS": 5.0,
+        "STORAGE_OUTBOX_BATCH_SIZE": 100,
+        "STORAGE_OUTBOX_LEASE_SECONDS": 300,
+        "STORAGE_OUTBOX_BASE_BACKOFF_SECONDS": 5,
+        "STORAGE_OUTBOX_MAX_BACKOFF_SECONDS": 3600,
+    }
+    for key, value in defaults.items():
+        app.config.setdefault(key, value)
+
+    worker = StorageOutboxWorker(app)
+    app.extensions["storage_outbox"] = worker
+    if app.config["STORAGE_OUTBOX_WORKER"]:
+        app.before_request(worker.start)
+
+
+def enqueue_storage_deletes(paths: List[str]) -> None:
+    """Queue objects that were never attached to a student, and commit."""
+    db.session.execute(
+        text("INSERT INTO storage_outbox (path) SELECT unnest(CAST(:paths AS varchar[]))"), {"paths": list(paths)}
+    )
+    db.session.commit()
+    wake_storage_outbox()
+
+
+def wake_storage_outbox() -> None:
+    """Ask this process's worker to run now, e.g. right after a write that queued deletes."""
+    worker = current_app.extensions.get("storage_outbox")
+    if worker is not None:
+        worker.wake()
@@ -1,13 +1,34 @@
 import os
 import requests
+from requests.adapters import HTTPAdapter
 from urllib.parse import quote
-from typing import Optional
+from typing import IO, List, Optional, Union
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 STORAGE_BUCKET = os.getenv("SUPABASE_BUCKET", "student-photos")
 
 
+def _new_session() -> requests.Session:
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+    session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+    return session
+
+
+# Shared keep-alive session: requests to the storage API reuse pooled connections
+_http = _new_session()
+
+
+def _auth_headers() -> dict:
+    if not SUPABASE_URL or not SERVICE_ROLE_KEY:
+        raise RuntimeError("Supabase service credentials not configured (SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY).")
+    return {
+        "Authorization": f"Bearer {SERVICE_ROLE_KEY}",
+        "apikey": SERVICE_ROLE_KEY,
+    }
+
+
 def get_public_url(path: str | None) -> str | None:
     if not path:
         return None
@@ -18,25 +39,105 @@ def delete_object(path: str) -> None:
     if not path:
         return
 
-    if not SUPABASE_URL or not SERVICE_ROLE_KEY:
-        raise RuntimeError("Supabase service credentials not configured (SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY).")
+    headers = _auth_headers()
+    encoded_path = quote(path, safe="")
+    url = f"{SUPABASE_URL}/storage/v1/object/{STORAGE_BUCKET}/{encoded_path}"
 
+    resp = _http.delete(url, headers=headers, timeout=15)
+    if not resp.ok:
+        raise RuntimeError(f"Failed to delete storage object ({resp.status_code}): {resp.text}")
+
+
+def delete_objects(paths: List[str]) -> None:
+    """Delete many objects with one bulk request. Paths that no longer exist are not an error."""
+    paths = [p for p in paths if p]
+    if not paths:
+        return
+
+    headers = _auth_headers()
+    url = f"{SUPABASE_URL}/storage/v1/object/{STORAGE_BUCKET}"
+
+    resp = _http.delete(url, headers=headers, json={"prefixes": paths}, timeout=30)
+    if not resp.ok:
+        raise RuntimeError(f"Failed to delete storage objects ({resp.status_code}): {resp.text}")
+
+
+def download_object(path: str) -> bytes:
+    headers = _auth_headers()
     encoded_path = quote(path, safe="")
     url = f"{SUPABASE_URL}/storage/v1/object/{STORAGE_BUCKET}/{encoded_path}"
 
-    headers = {
-        "Authorization": f"Bearer {SERVICE_ROLE_KEY}",
-        "apikey": SERVICE_ROLE_KEY,
-    }
+    resp = _http.get(url, headers=headers, timeout=30)
+    if not resp.ok:
+        raise RuntimeError(f"Failed to download storage object ({resp.status_code}): {resp.text}")
+    return resp.content
+
+
+def fetch_object(path: str, etag: Optional[str] = None) -> requests.Response:
+    """
+    Streaming GET of an object, conditional on `etag` when given. The caller checks the
+    status (200, 304, or 400/404 for a missing object) and closes the response.
+    """
+    headers = _auth_headers()
+    if etag:
+        headers["If-None-Match"] = etag
+    encoded_path = quote(path, safe="")
+    url = f"{SUPABASE_URL}/storage/v1/object/{STORAGE_BUCKET}/{encoded_path}"
+
+    resp = _http.get(url, headers=headers, stream=True, timeout=30)
+    if not resp.ok and resp.status_code not in (304, 400, 404):
+        resp.close()
+        raise RuntimeError(f"Failed to fetch storage object ({resp.status_code})")
+    return resp
+
 
-    resp = requests.delete(url, headers=headers, timeout=15)
+def object_size(path: str) -> Optional[int]:
+    """Size in bytes of a stored object, or None if it does not exist."""
+    headers = _auth_headers()
+    encoded_path = quote(path, safe="")
+    url = f"{SUPABASE_URL}/storage/v1/object/{STORAGE_BUCKET}/{encoded_path}"
+
+    resp = _http.head(url, headers=headers, timeout=15)
+    if resp.status_code in (400, 404):
+        return None
     if not resp.ok:
-        raise RuntimeError(f"Failed to delete storage object ({resp.status_code}): {resp.text}")
+        raise RuntimeError(f"Failed to read storage object ({resp.status_code})")
+    return int(resp.headers.get("Content-Length", 0))
 
 
-def upload_object(file_bytes: bytes, dest_path: str, content_type: str | None = None) -> str:
-    if not SUPABASE_URL or not SERVICE_ROLE_KEY:
-        raise RuntimeError("Supabase service credentials not configured (SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY).")
+def list_objects(prefix: str, limit: int = 1000, offset: int = 0) -> List[dict]:
+    """
+    One page of the entries directly under `prefix`, sorted by name. Sub-folders come back
+    as entries whose "id" is null; their contents need their own listing.
+    """
+    headers = _auth_headers()
+    url = f"{SUPABASE_URL}/storage/v1/object/list/{STORAGE_BUCKET}"
+    body = {"prefix": prefix, "limit": limit, "offset": offset, "sortBy": {"column": "name", "order": "asc"}}
+
+    resp = _http.post(url, headers=headers, json=body, timeout=30)
+    if not resp.ok:
+        raise RuntimeError(f"Failed to list storage objects ({resp.status_code}): {resp.text}")
+    return resp.json()
+
+
+def create_signed_upload_url(dest_path: str) -> str:
+    """
+    URL the client can PUT the file to directly, without credentials.
+    Supabase fixes the lifetime of signed upload URLs at two hours.
+    """
+    headers = _auth_headers()
+    encoded_path = quote(dest_path, safe="")
+    url = f"{SUPABASE_URL}/storage/v1/object/upload/sign/{STORAGE_BUCKET}/{encoded_path}"
+
+    resp = _http.post(url, headers=headers, timeout=15)
+    if not resp.ok:
+        raise RuntimeError(f"Failed to sign upload URL ({resp.status_code}): {resp.text}")
+    return f"{SUPABASE_URL}/storage/v1{resp.json()['url']}"
+
+
+def upload_object(file_bytes: Union[bytes, IO[bytes]], dest_path: str, content_type: str | None = None) -> str:
+    """Upload bytes or a readable stream; streams are sent in chunks rather than buffered."""
+    headers = _auth_headers()
 
     if not dest_path:
         raise ValueError("dest_path is required")
@@ -44,14 +145,10 @@ def upload_object(file_bytes: bytes, dest_path: str, content_type: str | None =
     encoded_path = quote(dest_path, safe="")
     upload_url = f"{SUPABASE_URL}/storage/v1/object/{STORAGE_BUCKET}/{encoded_path}"
 
-    headers = {
-        "Authorization": f"Bearer {SERVICE_ROLE_KEY}",
-        "apikey": SERVICE_ROLE_KEY,
-    }
     if content_type:
         headers["Content-Type"] = content_type
 
-    resp = requests.put(upload_url, data=file_bytes, headers=headers, timeout=30)
+    resp = _http.put(upload_url, data=file_bytes, headers=headers, timeout=30)
     if not resp.ok:
         raise RuntimeError(f"Failed to upload storage object ({resp.status_code}): {resp.text}")
 
@@ -0,0 +1,42 @@
+from typing import Dict, Optional
+
+from sqlalchemy import text
+
+from .. import db
+from .request_cache import MISSING, cache_evict, cache_get, cache_put
+
+# Cached result of the table_changes probe; None until the first lookup.
+_versions_available: Optional[bool] = None
+
+# Folded counters plus the changes logged since the last fold, read in one snapshot
+VERSIONS_SQL = text(
+    "SELECT table_name, CAST(sum(n) AS bigint) AS version FROM ("
+    "SELECT table_name, version AS n FROM table_versions "
+    "UNION ALL SELECT table_name, count(*) FROM table_changes GROUP BY table_name"
+    ") v GROUP BY table_name"
+)
+
+
+def table_versions() -> Dict[str, int]:
+    """
+    Change version of every tracked table (see table_changes in create_tables.sql),
+    read with one query and remembered for the rest of the request. Returns {} when
+    the table has not been created, so callers fall back to per-process invalidation.
+    """
+    global _versions_available
+    cached = cache_get("table_versions", None)
+    if cached is not MISSING:
+        return cached
+
+    if _versions_available is None:
+        _versions_available = bool(db.session.execute(text("SELECT to_regclass('table_changes')")).scalar())
+    if not _versions_available:
+        return cache_put("table_versions", None, {})
+
+    rows = db.session.execute(VERSIONS_SQL).all()
+    return cache_put("table_versions", None, {r.table_name: r.version for r in rows})
+
+
+def forget_table_versions() -> None:
+    """Drop the request's remembered versions, e.g. after this request committed a write."""
+    cache_evict("table_versions", None)
@@ -0,0 +1,111 @@
+import hashlib
+import re
+import tempfile
+import uuid
+from typing import IO, Iterator, Optional, Tuple
+
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+# Allowance for multipart boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Non-seekable bodies are kept in memory up to this size while they are hashed
+UPLOAD_SPOOL_BYTES = 1024 * 1024
+
+PHOTO_DIRECTORY = "student_photos"
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class LimitedReader:
+    """
+    Read-only, iterable view of an incoming body that raises UploadTooLarge as soon as
+    more than `limit` bytes have come through. Handing it to requests streams the body
+    to the storage backend chunk by chunk, with Content-Length when `length` is known
+    and chunked transfer encoding otherwise.
+    """
+
+    def __init__(self, stream: IO[bytes], limit: int, length: Optional[int] = None):
+        self.stream = stream
+        self.limit = limit
+        self.len = length or 0  # requests reads this for Content-Length; 0 means chunked
+        self.bytes_read = 0
+        self.exceeded = False
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            # Whole remaining body, read in chunks so the limit still applies as it comes in
+            return b"".join(iter(lambda: self.read(UPLOAD_CHUNK_SIZE), b""))
+        chunk = self.stream.read(size)
+        self.bytes_read += len(chunk)
+        if self.bytes_read > self.limit:
+            self.exceeded = True
+            raise UploadTooLarge(f"Upload exceeds {self.limit} bytes.")
+        return chunk
+
+    def __iter__(self) -> Iterator[bytes]:
+        while True:
+            chunk = self.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def stream_size(stream: IO[bytes]) -> int:
+    """Size of a seekable stream (e.g. a spooled multipart file), leaving it rewound."""
+    stream.seek(0, 2)
+    size = stream.tell()
+    stream.seek(0)
+    return size
+
+
+def hash_upload(body: IO[bytes]) -> Tuple[str, IO[bytes]]:
+    """
+    SHA-256 hex digest of an upload and a stream positioned at its start. Seekable bodies
+    (spooled multipart files) are read twice; others are copied to a spooled temporary file
+    as they are hashed. A LimitedReader body raises UploadTooLarge from here.
+    """
+    digest = hashlib.sha256()
+    seekable = getattr(body, "seekable", None)
+    if seekable is not None and seekable():
+        for chunk in iter(lambda: body.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+        body.seek(0)
+        return digest.hexdigest(), body
+
+    spool = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES)
+    for chunk in iter(lambda: body.read(UPLOAD_CHUNK_SIZE), b""):
+        digest.update(chunk)
+        spool.write(chunk)
+    spool.seek(0)
+    return digest.hexdigest(), spool
+
+
+def new_photo_path(filename: str) -> str:
+    """Fresh storage path for a student photo, keeping a sanitised extension of the upload's name."""
+    raw_ext = filename.rsplit(".", 1)[-1] if "." in filename else "jpg"
+    ext = re.sub(r"[^a-zA-Z0-9]", "", raw_ext).lower() or "jpg"
+    return f"{PHOTO_DIRECTORY}/{uuid.uuid4().hex}.{ext}"
+
+
+def _upload_serializer() -> URLSafeTimedSerializer:
+    return URLSafeTimedSerializer(current_app.config["SECRET_KEY"], salt="student-photo-upload")
+
+
+def sign_photo_upload(path: str) -> str:
+    """Token proving `path` was issued by this API for a direct upload."""
+    return _upload_serializer().dumps(path)
+
+
+def verify_photo_upload(token: str, path: str) -> bool:
+    """True if `token` was issued for `path` within PHOTO_UPLOAD_TOKEN_SECONDS."""
+    try:
+        signed_path = _upload_serializer().loads(token, max_age=current_app.config["PHOTO_UPLOAD_TOKEN_SECONDS"])
+    except BadSignature:
+        return False
+    return signed_path == path
@@ -1,8 +1,6 @@
 from typing import Optional, Tuple
 
-from sqlalchemy import text
-
-from .. import db
+from .reference_cache import reference_data
 
 
 def validate_college_code_unique(code: str, exclude_id: Optional[int] = None) -> Tuple[bool, str]:
@@ -10,14 +8,8 @@ def validate_college_code_unique(code: str, exclude_id: Optional[int] = None) ->
     if not code_norm:
         return False, "College code cannot be empty."
 
-    params = {"code": code_norm}
-    sql = "SELECT id FROM colleges WHERE UPPER(code) = :code"
-    if exclude_id:
-        sql += " AND id != :exclude_id"
-        params["exclude_id"] = exclude_id
-
-    row = db.session.execute(text(sql), params).mappings().first()
-    if row:
+    row = reference_data().colleges_by_code.get(code_norm)
+    if row and row["id"] != exclude_id:
         return False, f"College code '{code_norm}' already exists."
 
     return True, ""
@@ -28,14 +20,8 @@ def validate_program_code_unique(code: str, exclude_id: Optional[int] = None) ->
     if not code_norm:
         return False, "Program code cannot be empty."
 
-    params = {"code": code_norm}
-    sql = "SELECT id FROM programs WHERE UPPER(code) = :code"
-    if exclude_id:
-        sql += " AND id != :exclude_id"
-        params["exclude_id"] = exclude_id
-
-    row = db.session.execute(text(sql), params).mappings().first()
-    if row:
+    row = reference_data().programs_by_code.get(code_norm)
+    if row and row["id"] != exclude_id:
         return False, f"Program code '{code_norm}' already exists."
 
-    return True, ""
\ No newline at end of file
+    return True, ""
@@ -1,3 +1,6 @@
+-- Trigram matching for indexed substring (ILIKE '%term%') and fuzzy search
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- Create colleges table
 CREATE TABLE IF NOT EXISTS colleges (
     id SERIAL PRIMARY KEY,
@@ -23,6 +26,7 @@ CREATE INDEX IF NOT EXISTS idx_programs_college_id ON programs(college_id);
 
 -- Create students table
 -- NOTE: photo column stores the storage path/filename in Supabase (nullable).
+-- Foreign keys to students(id) should be declared ON UPDATE CASCADE so ID changes stay a single UPDATE.
 CREATE TABLE IF NOT EXISTS students (
     photo VARCHAR(255),
     id VARCHAR(20) PRIMARY KEY,
@@ -39,6 +43,23 @@ CREATE INDEX IF NOT EXISTS idx_students_program_id ON students(program_id);
 CREATE INDEX IF NOT EXISTS idx_students_first_name ON students(first_name);
 CREATE INDEX IF NOT EXISTS idx_students_last_name ON students(last_name);
 
+-- Composite (sort key, id) indexes backing keyset pagination on the list endpoints
+CREATE INDEX IF NOT EXISTS idx_students_first_name_id ON students(first_name, id);
+CREATE INDEX IF NOT EXISTS idx_students_last_name_id ON students(last_name, id);
+CREATE INDEX IF NOT EXISTS idx_students_year_level_id ON students(year_level, id);
+CREATE INDEX IF NOT EXISTS idx_students_gender_id ON students(gender, id);
+CREATE INDEX IF NOT EXISTS idx_programs_name_id ON programs(name, id);
+CREATE INDEX IF NOT EXISTS idx_colleges_name_id ON colleges(name, id);
+
+-- Trigram GIN indexes backing substring search and "did you mean" suggestions
+CREATE INDEX IF NOT EXISTS idx_students_id_trgm ON students USING gin (id gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_students_first_name_trgm ON students USING gin (first_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_students_last_name_trgm ON students USING gin (last_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_programs_code_trgm ON programs USING gin (code gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_programs_name_trgm ON programs USING gin (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_colleges_code_trgm ON colleges USING gin (code gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_colleges_name_trgm ON colleges USING gin (name gin_trgm_ops);
+
 -- Create users table for authentication
 CREATE TABLE IF NOT EXISTS users (
     id SERIAL PRIMARY KEY,
@@ -48,4 +69,151 @@ CREATE TABLE IF NOT EXISTS users (
 );
 
 -- Index for faster email lookups
-CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
+-- Per-table change counters, so every worker can tell when its cached copy of a table is
+-- stale. A table's version is its row in table_versions plus its rows in table_changes.
+-- Statement-level triggers only insert into table_changes, so concurrent writers never
+-- wait on a shared counter row; the rows become visible when the writing transaction
+-- commits, together with the change itself.
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name VARCHAR(63) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO table_versions (table_name, version)
+VALUES ('colleges', 0), ('programs', 0), ('students', 0), ('photo_variants', 0)
+ON CONFLICT (table_name) DO NOTHING;
+
+CREATE TABLE IF NOT EXISTS table_changes (
+    id BIGSERIAL PRIMARY KEY,
+    table_name VARCHAR(63) NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_table_changes_table ON table_changes(table_name);
+
+CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+DECLARE
+    change_id BIGINT;
+BEGIN
+    INSERT INTO table_changes (table_name) VALUES (TG_TABLE_NAME) RETURNING id INTO change_id;
+    -- Every 1000th change folds the log into table_versions. The advisory lock keeps it to
+    -- one transaction at a time and nothing else writes table_versions, so no writer waits.
+    IF change_id % 1000 = 0 AND pg_try_advisory_xact_lock(hashtext('table_changes')) THEN
+        WITH folded AS (
+            DELETE FROM table_changes RETURNING table_name
+        )
+        INSERT INTO table_versions (table_name, version)
+        SELECT table_name, count(*) FROM folded GROUP BY table_name
+        ON CONFLICT (table_name) DO UPDATE SET version = table_versions.version + EXCLUDED.version;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_colleges_version ON colleges;
+CREATE TRIGGER trg_colleges_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON colleges
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+
+DROP TRIGGER IF EXISTS trg_programs_version ON programs;
+CREATE TRIGGER trg_programs_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON programs
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+
+DROP TRIGGER IF EXISTS trg_students_version ON students;
+CREATE TRIGGER trg_students_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON students
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+
+-- Storage objects waiting to be deleted. Rows are added by the triggers below in the same
+-- transaction that drops the last reference to a photo (see photo_objects), and drained by the storage
+-- outbox worker (app/utils/storage_outbox.py) with bulk deletes and backoff.
+CREATE TABLE IF NOT EXISTS storage_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    path VARCHAR(255) NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    last_error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_storage_outbox_next_attempt ON storage_outbox(next_attempt_at);
+CREATE INDEX IF NOT EXISTS idx_students_photo ON students(photo);
+
+-- One row per stored student photo: its content hash, for reusing an identical upload,
+-- and how many students reference it. The triggers below keep refcount current and queue
+-- the object for deletion when it drops to zero. reused_at is set when an upload is
+-- answered with this object, which holds off its deletion until the form is saved.
+CREATE TABLE IF NOT EXISTS photo_objects (
+    path VARCHAR(255) PRIMARY KEY,
+    sha256 CHAR(64),
+    refcount INTEGER NOT NULL DEFAULT 0,
+    reused_at TIMESTAMP WITH TIME ZONE,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_photo_objects_sha256 ON photo_objects(sha256);
+
+-- (Re)count references from the current students
+INSERT INTO photo_objects (path, refcount)
+SELECT photo, count(*) FROM students WHERE photo IS NOT NULL AND photo <> '' GROUP BY photo
+ON CONFLICT (path) DO UPDATE SET refcount = EXCLUDED.refcount;
+
+CREATE OR REPLACE FUNCTION count_photo_references() RETURNS trigger AS $$
+DECLARE
+    paths VARCHAR[];
+    deltas INTEGER[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(photo), array_agg(1) INTO paths, deltas FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(photo), array_agg(-1) INTO paths, deltas FROM old_rows;
+    ELSE
+        SELECT array_agg(photo), array_agg(n) INTO paths, deltas FROM (
+            SELECT photo, 1 AS n FROM new_rows UNION ALL SELECT photo, -1 FROM old_rows
+        ) c;
+    END IF;
+
+    -- Net change per path, so updates that keep the photo touch nothing
+    WITH changes AS (
+        SELECT path, sum(delta) AS delta FROM unnest(paths, deltas) AS c(path, delta)
+        WHERE path IS NOT NULL AND path <> ''
+        GROUP BY path HAVING sum(delta) <> 0
+    ), counted AS (
+        INSERT INTO photo_objects (path, refcount) SELECT path, delta FROM changes
+        ON CONFLICT (path) DO UPDATE SET refcount = photo_objects.refcount + EXCLUDED.refcount
+        RETURNING path, refcount
+    )
+    INSERT INTO storage_outbox (path) SELECT path FROM counted WHERE refcount <= 0;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_students_photo_insert ON students;
+CREATE TRIGGER trg_students_photo_insert AFTER INSERT ON students
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION count_photo_references();
+
+DROP TRIGGER IF EXISTS trg_students_photo_update ON students;
+CREATE TRIGGER trg_students_photo_update AFTER UPDATE ON students
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION count_photo_references();
+
+DROP TRIGGER IF EXISTS trg_students_photo_delete ON students;
+CREATE TRIGGER trg_students_photo_delete AFTER DELETE ON students
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION count_photo_references();
+
+DROP FUNCTION IF EXISTS enqueue_orphaned_photos();
+
+-- Derived images of a student photo (avatar thumbnail, full-size WebP/AVIF), written by
+-- the image variant pipeline once they are stored. Photos without a row are served as is.
+CREATE TABLE IF NOT EXISTS photo_variants (
+    photo VARCHAR(255) PRIMARY KEY,
+    thumbnail VARCHAR(255),
+    webp VARCHAR(255),
+    avif VARCHAR(255),
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+);
+
+-- The student list embeds the thumbnail, so its conditional GETs track this table too
+DROP TRIGGER IF EXISTS trg_photo_variants_version ON photo_variants;
+CREATE TRIGGER trg_photo_variants_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON photo_variants
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
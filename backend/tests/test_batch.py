@@ -0,0 +1,91 @@
+import pytest
+from sqlalchemy import text
+
+from app import db
+from app.utils.batch import MAX_BATCH_OPERATIONS, parse_batch_operations
+
+
+def test_parse_batch_operations():
+    operations, error = parse_batch_operations({"operations": [
+        {"op": "create", "data": {"code": "CCS"}},
+        {"op": "update", "id": 4, "data": {"name": "Engineering"}},
+        {"op": "delete", "id": 5},
+    ]})
+    assert error is None
+    assert operations == [
+        {"index": 0, "op": "create", "id": None, "data": {"code": "CCS"}},
+        {"index": 1, "op": "update", "id": 4, "data": {"name": "Engineering"}},
+        {"index": 2, "op": "delete", "id": 5, "data": {}},
+    ]
+
+
+@pytest.mark.parametrize("payload, message", [
+    (None, "non-empty list"),
+    ({"operations": []}, "non-empty list"),
+    ({"operations": {"op": "create"}}, "non-empty list"),
+    ({"operations": [{"op": "upsert"}]}, "Operation 0: 'op'"),
+    ({"operations": [{"op": "create", "data": {}}, "delete"]}, "Operation 1: 'op'"),
+    ({"operations": [{"op": "create", "data": [1]}]}, "'data' must be an object"),
+    ({"operations": [{"op": "update", "data": {}}]}, "'id' is required for update"),
+    ({"operations": [{"op": "delete", "id": ""}]}, "'id' is required for delete"),
+    ({"operations": [{"op": "delete", "id": 1}] * (MAX_BATCH_OPERATIONS + 1)}, "at most"),
+])
+def test_parse_batch_operations_rejects_bad_envelopes(payload, message):
+    operations, error = parse_batch_operations(payload)
+    assert operations == []
+    assert message in error
+
+
+@pytest.fixture
+def existing_college(database):
+    with database.app_context():
+        college_id = db.session.execute(
+            text("INSERT INTO colleges (code, name) VALUES ('ZZTEST1', 'Batch Test College') RETURNING id")
+        ).scalar()
+        db.session.commit()
+    yield college_id
+    with database.app_context():
+        db.session.execute(text("DELETE FROM colleges WHERE code LIKE 'ZZTEST%'"))
+        db.session.commit()
+
+
+def statuses(response):
+    assert response.status_code == 200
+    return [r["status"] for r in response.get_json()["results"]]
+
+
+def test_batch_reports_conflicts_per_operation(client, existing_college):
+    response = client.post("/api/colleges/batch", json={"operations": [
+        {"op": "create", "data": {"code": "ZZTEST2", "name": "New"}},
+        {"op": "create", "data": {"code": "zztest2", "name": "Same code again"}},
+        {"op": "create", "data": {"code": "ZZTEST1", "name": "Code already taken"}},
+        {"op": "update", "id": existing_college, "data": {"name": "Renamed"}},
+        {"op": "delete", "id": existing_college},
+    ]})
+    assert statuses(response) == [201, 400, 409, 200, 400]
+
+    results = response.get_json()["results"]
+    assert "more than once" in results[1]["error"]
+    assert "more than once" in results[4]["error"]
+    assert results[3]["data"]["name"] == "Renamed"
+
+
+def test_atomic_batch_writes_nothing_when_an_operation_fails(client, existing_college):
+    response = client.post("/api/colleges/batch", json={"atomic": True, "operations": [
+        {"op": "create", "data": {"code": "ZZTEST3", "name": "New"}},
+        {"op": "update", "id": existing_college, "data": {"code": "ZZTEST3"}},
+    ]})
+    assert statuses(response) == [424, 400]
+
+    with client.application.app_context():
+        codes = db.session.execute(text("SELECT code FROM colleges WHERE code LIKE 'ZZTEST%' ORDER BY code")).scalars()
+        assert list(codes) == ["ZZTEST1"]
+
+
+@pytest.mark.parametrize("data", [{"first_name": 123}, {"id": 20200001}, {"gender": ["Male"]}])
+def test_student_batch_update_rejects_non_string_fields(database, client, data):
+    response = client.post("/api/students/batch", json={"operations": [
+        {"op": "update", "id": "2024-0001", "data": data},
+    ]})
+    assert statuses(response) == [400]
+    assert "must be a string" in response.get_json()["results"][0]["error"]
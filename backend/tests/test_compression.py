@@ -0,0 +1,84 @@
+import gzip
+
+import pytest
+from flask import Response
+
+from app.utils import compression
+from app.utils.compression import compress_response, negotiate_encoding
+
+BODY = b'{"students": [' + b",".join(b'{"id": "2024-%04d"}' % i for i in range(100)) + b"]}"
+
+
+@pytest.fixture
+def without_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+
+
+@pytest.mark.parametrize("accept, expected", [
+    ("gzip, deflate", "gzip"),
+    ("br, gzip", "gzip"),
+    ("identity", None),
+    ("gzip;q=0", None),
+    ("", None),
+])
+def test_negotiate_encoding_without_brotli(app, without_brotli, accept, expected):
+    with app.test_request_context(headers={"Accept-Encoding": accept}):
+        assert negotiate_encoding() == expected
+
+
+@pytest.mark.parametrize("accept, expected", [
+    ("gzip, deflate, br", "br"),
+    ("br;q=0.5, gzip", "gzip"),
+    ("gzip", "gzip"),
+])
+def test_negotiate_encoding_with_brotli(app, accept, expected):
+    pytest.importorskip("brotli")
+    with app.test_request_context(headers={"Accept-Encoding": accept}):
+        assert negotiate_encoding() == expected
+
+
+def test_large_json_is_gzipped(app, without_brotli):
+    with app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+        response = Response(BODY, mimetype="application/json")
+        response.set_etag("abc")
+        response = compress_response(response)
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.vary
+    assert gzip.decompress(response.get_data()) == BODY
+    # The compressed bytes differ, so only a weak validator still holds
+    assert response.get_etag() == ("abc", True)
+
+
+def test_brotli_round_trip(app):
+    brotli = pytest.importorskip("brotli")
+    with app.test_request_context(headers={"Accept-Encoding": "br"}):
+        response = compress_response(Response(BODY, mimetype="application/json"))
+    assert response.headers["Content-Encoding"] == "br"
+    assert brotli.decompress(response.get_data()) == BODY
+
+
+def test_small_bodies_are_sent_as_is_but_vary(app):
+    with app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+        response = compress_response(Response(b'{"ok": true}', mimetype="application/json"))
+    assert "Content-Encoding" not in response.headers
+    assert "Accept-Encoding" in response.vary
+
+
+@pytest.mark.parametrize("response", [
+    Response(BODY, mimetype="image/jpeg"),
+    Response(BODY, status=404, mimetype="application/json"),
+    Response(BODY, mimetype="application/json", headers={"Content-Encoding": "gzip"}),
+], ids=["not compressible", "error status", "already encoded"])
+def test_ineligible_responses_are_untouched(app, response):
+    with app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+        result = compress_response(response)
+    assert result.get_data() == BODY
+    assert "Accept-Encoding" not in result.vary
+
+
+def test_no_acceptable_encoding(app):
+    with app.test_request_context(headers={"Accept-Encoding": "identity"}):
+        response = compress_response(Response(BODY, mimetype="application/json"))
+    assert "Content-Encoding" not in response.headers
+    assert response.get_data() == BODY
@@ -0,0 +1,111 @@
+import pytest
+from flask import Flask, jsonify
+from sqlalchemy import text
+
+from app import db
+from app.utils import etag as etag_module
+from app.utils.etag import versioned_etag
+
+
+@pytest.fixture
+def versions(monkeypatch):
+    current = {"colleges": 1, "programs": 1}
+    monkeypatch.setattr(etag_module, "table_versions", lambda: current)
+    return current
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+@pytest.fixture
+def view_client(calls):
+    app = Flask(__name__)
+
+    @app.get("/colleges")
+    @versioned_etag("colleges")
+    def colleges():
+        calls.append("colleges")
+        return jsonify({"colleges": []})
+
+    @app.get("/missing")
+    @versioned_etag("colleges")
+    def missing():
+        calls.append("missing")
+        return jsonify({"message": "Not found."}), 404
+
+    return app.test_client()
+
+
+def test_etag_and_304(view_client, versions, calls):
+    first = view_client.get("/colleges")
+    etag, weak = first.get_etag()
+    assert first.status_code == 200 and weak
+    assert first.headers["Cache-Control"] == "no-cache"
+
+    again = view_client.get("/colleges", headers={"If-None-Match": f'W/"{etag}"'})
+    assert again.status_code == 304
+    assert again.get_etag() == (etag, True)
+    assert calls == ["colleges"]  # answered without running the view
+
+
+def test_etag_follows_the_table_versions(view_client, versions):
+    etag = view_client.get("/colleges").get_etag()[0]
+
+    versions["programs"] += 1  # not read by this view
+    assert view_client.get("/colleges", headers={"If-None-Match": f'W/"{etag}"'}).status_code == 304
+
+    versions["colleges"] += 1
+    changed = view_client.get("/colleges", headers={"If-None-Match": f'W/"{etag}"'})
+    assert changed.status_code == 200
+    assert changed.get_etag()[0] != etag
+
+
+def test_etag_depends_on_the_query_string(view_client, versions):
+    assert view_client.get("/colleges?page=1").get_etag() != view_client.get("/colleges?page=2").get_etag()
+
+
+def test_errors_carry_no_etag(view_client, versions):
+    response = view_client.get("/missing")
+    assert response.status_code == 404
+    assert response.get_etag() == (None, None)
+
+
+def test_views_run_when_versions_are_unavailable(view_client, monkeypatch, calls):
+    monkeypatch.setattr(etag_module, "table_versions", lambda: {})
+    response = view_client.get("/colleges", headers={"If-None-Match": "*"})
+    assert response.status_code == 200
+    assert response.get_etag() == (None, None)
+    assert calls == ["colleges"]
+
+
+@pytest.fixture
+def cleanup(database):
+    yield
+    with database.app_context():
+        db.session.execute(text("DELETE FROM photo_variants WHERE photo LIKE 'student_photos/etag-test%'"))
+        db.session.execute(text("DELETE FROM colleges WHERE code = 'ZZETAG'"))
+        db.session.commit()
+
+
+def test_list_revalidates_after_a_write(database, client, cleanup):
+    etag = client.get("/api/colleges").get_etag()[0]
+    assert client.get("/api/colleges", headers={"If-None-Match": f'W/"{etag}"'}).status_code == 304
+
+    with database.app_context():
+        db.session.execute(text("INSERT INTO colleges (code, name) VALUES ('ZZETAG', 'ETag Test')"))
+        db.session.commit()
+    assert client.get("/api/colleges", headers={"If-None-Match": f'W/"{etag}"'}).status_code == 200
+
+
+def test_student_list_revalidates_when_a_thumbnail_is_added(database, client, cleanup):
+    etag = client.get("/api/students").get_etag()[0]
+
+    with database.app_context():
+        db.session.execute(text(
+            "INSERT INTO photo_variants (photo, thumbnail) "
+            "VALUES ('student_photos/etag-test.jpg', 'student_photos/thumbs/etag-test.webp')"
+        ))
+        db.session.commit()
+    assert client.get("/api/students", headers={"If-None-Match": f'W/"{etag}"'}).status_code == 200
@@ -0,0 +1,108 @@
+import base64
+import json
+
+import pytest
+
+from app.utils.pagination import (
+    decode_cursor,
+    encode_cursor,
+    keyset_clause,
+    order_by_clause,
+    trim_keyset_page,
+)
+
+
+def forge(payload) -> str:
+    raw = json.dumps(payload).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def test_cursor_round_trip():
+    token = encode_cursor("last_name", "asc", "Dela Cruz", "2024-0001")
+    assert "=" not in token
+    assert decode_cursor(token, "last_name", "asc", str, str) == ("Dela Cruz", "2024-0001")
+
+
+def test_cursor_round_trip_without_sort_key():
+    token = encode_cursor("", "desc", None, 42)
+    assert decode_cursor(token, "", "desc", None, int) == (None, 42)
+
+
+@pytest.mark.parametrize("token", ["", "not base64!", forge([1, 2]), forge({"s": "name", "o": "asc", "k": "x"})])
+def test_malformed_cursor_is_rejected(token):
+    with pytest.raises(ValueError):
+        decode_cursor(token, "name", "asc", str, int)
+
+
+def test_cursor_for_another_sort_is_rejected():
+    token = encode_cursor("name", "asc", "Engineering", 3)
+    with pytest.raises(ValueError, match="sort order"):
+        decode_cursor(token, "code", "asc", str, int)
+    with pytest.raises(ValueError, match="sort order"):
+        decode_cursor(token, "name", "desc", str, int)
+
+
+@pytest.mark.parametrize("key, row_id, key_type, id_type", [
+    ({"x": 1}, 3, str, int),          # key of the wrong type
+    ("Engineering", "3", str, int),   # id of the wrong type
+    ("Engineering", True, str, int),  # bools are not integers here
+    (3, 2 ** 31, int, int),           # out of int4 range
+    ("x", 3, None, int),              # key on an id-only sort
+    (float("nan"), 3, float, int),    # json accepts NaN; Postgres would sort it last
+])
+def test_tampered_cursor_values_are_rejected(key, row_id, key_type, id_type):
+    token = forge({"s": "name", "o": "asc", "k": key, "id": row_id})
+    with pytest.raises(ValueError):
+        decode_cursor(token, "name", "asc", key_type, id_type)
+
+
+def test_relevance_cursor_accepts_integral_scores():
+    token = encode_cursor("relevance", "desc", 1, 7)
+    assert decode_cursor(token, "relevance", "desc", float, int) == (1, 7)
+
+
+@pytest.mark.parametrize("order, backwards, op", [
+    ("asc", False, ">"),
+    ("asc", True, "<"),
+    ("desc", False, "<"),
+    ("desc", True, ">"),
+])
+def test_keyset_clause_direction(order, backwards, op):
+    assert keyset_clause("s.last_name", "s.id", order, backwards) == f"(s.last_name, s.id) {op} (:cursor_key, :cursor_id)"
+    assert keyset_clause(None, "s.id", order, backwards) == f"s.id {op} :cursor_id"
+
+
+@pytest.mark.parametrize("order, backwards, direction", [
+    ("asc", False, "ASC"),
+    ("asc", True, "DESC"),
+    ("desc", False, "DESC"),
+    ("desc", True, "ASC"),
+])
+def test_order_by_clause_reverses_when_paging_backwards(order, backwards, direction):
+    assert order_by_clause("name", "id", order, backwards) == f"ORDER BY name {direction}, id {direction}"
+    assert order_by_clause(None, "id", order, backwards) == f"ORDER BY id {direction}"
+
+
+def test_trim_keyset_page_forwards():
+    rows, has_more = trim_keyset_page([1, 2, 3, 4], 3, backwards=False)
+    assert rows == [1, 2, 3] and has_more
+    rows, has_more = trim_keyset_page([1, 2], 3, backwards=False)
+    assert rows == [1, 2] and not has_more
+
+
+def test_trim_keyset_page_backwards_restores_display_order():
+    # Backward pages are fetched in reverse order, nearest the cursor first
+    rows, has_more = trim_keyset_page([9, 8, 7, 6], 3, backwards=True)
+    assert rows == [7, 8, 9] and has_more
+
+
+def test_list_rejects_invalid_cursor(database, client):
+    response = client.get("/api/colleges?after=garbage")
+    assert response.status_code == 400
+    assert response.get_json()["message"] == "Invalid pagination cursor."
+
+
+def test_list_rejects_cursor_with_wrong_value_types(database, client):
+    token = forge({"s": "year_level", "o": "asc", "k": "1", "id": "2024-0001"})
+    response = client.get(f"/api/students?sort_by=year_level&after={token}")
+    assert response.status_code == 400
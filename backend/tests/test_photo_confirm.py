@@ -0,0 +1,86 @@
+import hashlib
+import io
+
+import pytest
+from sqlalchemy import text
+
+from app import db
+from app.utils.image_variants import build_variants
+from app.utils.storage import LocalStorage
+from app.utils.uploads import sign_photo_upload
+
+STUDENT_ID = "9999-0701"
+
+
+@pytest.fixture
+def storage(database, tmp_path, monkeypatch):
+    storage = LocalStorage(str(tmp_path), "/api/storage", "signing-key", upload_url_seconds=900)
+    monkeypatch.setitem(database.extensions, "storage", storage)
+    return storage
+
+
+@pytest.fixture
+def student(database, storage, monkeypatch):
+    with database.app_context():
+        program_id = db.session.execute(text("SELECT id FROM programs ORDER BY id LIMIT 1")).scalar()
+        if program_id is None:
+            pytest.skip("No programs to enrol the student in")
+        db.session.execute(text(
+            "INSERT INTO students (id, first_name, last_name, program_id, year_level, gender) "
+            "VALUES (:id, 'Direct', 'Upload', :program_id, 1, 'Male')"
+        ), {"id": STUDENT_ID, "program_id": program_id})
+        db.session.commit()
+
+    # Confirming must not read the photo back through the API
+    def no_reads(*args, **kwargs):
+        raise AssertionError("the photo was read during confirm")
+    monkeypatch.setattr(storage, "fetch", no_reads)
+    monkeypatch.setattr(storage, "download", no_reads)
+
+    yield STUDENT_ID
+    with database.app_context():
+        db.session.execute(text("DELETE FROM students WHERE id = :id"), {"id": STUDENT_ID})
+        db.session.execute(text("DELETE FROM storage_outbox WHERE path LIKE 'student_photos/confirm-%'"))
+        db.session.execute(text("DELETE FROM photo_objects WHERE path LIKE 'student_photos/confirm-%'"))
+        db.session.commit()
+
+
+def confirm(app, client, path):
+    with app.app_context():
+        token = sign_photo_upload(path)
+    return client.post(f"/api/students/{STUDENT_ID}/photo", json={"path": path, "token": token})
+
+
+def test_confirm_attaches_the_upload(database, client, storage, student):
+    storage.upload(b"photo", "student_photos/confirm-ok.jpg")
+    response = confirm(database, client, "student_photos/confirm-ok.jpg")
+    assert response.status_code == 200
+    assert response.get_json()["photo"] == "student_photos/confirm-ok.jpg"
+
+
+def test_confirm_missing_upload(database, client, storage, student):
+    assert confirm(database, client, "student_photos/confirm-missing.jpg").status_code == 404
+
+
+def test_confirm_oversize_upload_is_queued_for_deletion(database, client, storage, student, monkeypatch):
+    monkeypatch.setitem(database.config, "MAX_PHOTO_BYTES", 4)
+    storage.upload(b"photo", "student_photos/confirm-big.jpg")
+    assert confirm(database, client, "student_photos/confirm-big.jpg").status_code == 413
+    with database.app_context():
+        queued = db.session.execute(
+            text("SELECT count(*) FROM storage_outbox WHERE path = 'student_photos/confirm-big.jpg'")
+        ).scalar()
+    assert queued == 1
+
+
+def test_variant_job_hashes_the_original(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    buffer = io.BytesIO()
+    Image.new("RGB", (300, 200), (0, 90, 30)).save(buffer, "JPEG")
+    storage = LocalStorage(str(tmp_path), "/api/storage", "signing-key", upload_url_seconds=900)
+    storage.upload(buffer.getvalue(), "student_photos/original.jpg")
+
+    paths, sha256 = build_variants(storage, "student_photos/original.jpg")
+    assert sha256 == hashlib.sha256(buffer.getvalue()).hexdigest()
+    assert paths["thumbnail"] == "student_photos/thumbs/original.webp"
+    assert storage.size(paths["thumbnail"]) > 0
@@ -0,0 +1,113 @@
+import gzip
+
+import pytest
+
+from app.utils.static_site import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, StaticSite
+
+SCRIPT = b"console.log('student information system');\n" * 50
+
+
+@pytest.fixture
+def site(tmp_path, app, monkeypatch):
+    monkeypatch.setattr("app.utils.compression.brotli", None)
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "index.html").write_bytes(b"<!doctype html><div id=root></div>")
+    (tmp_path / "assets" / "index-BdX3k9aZ.js").write_bytes(SCRIPT)
+    (tmp_path / "assets" / "logo-Q1w2E3r4.png").write_bytes(b"\x89PNG" + b"\0" * 2000)
+    (tmp_path / "robots.txt").write_bytes(b"User-agent: *\n")
+    return StaticSite(str(tmp_path))
+
+
+def serve(app, site, path, headers=None):
+    with app.test_request_context(f"/{path}", headers=headers or {}):
+        response = site.serve(path)
+        if response is not None:
+            response.direct_passthrough = False
+        return response
+
+
+def test_manifest(site):
+    assert sorted(site.files) == ["assets/index-BdX3k9aZ.js", "assets/logo-Q1w2E3r4.png", "index.html", "robots.txt"]
+    assert site.files["assets/index-BdX3k9aZ.js"].immutable
+    assert site.files["assets/index-BdX3k9aZ.js"].mimetype in ("application/javascript", "text/javascript")
+    assert not site.files["index.html"].immutable
+    assert not site.files["robots.txt"].immutable
+    assert site.index_body == b"<!doctype html><div id=root></div>"
+
+
+def test_manifest_is_only_refreshed_by_reload(site, tmp_path):
+    (tmp_path / "late.txt").write_bytes(b"added after startup")
+    assert site.lookup("late.txt") is site.index
+    site.reload()
+    assert site.lookup("late.txt").path == str(tmp_path / "late.txt")
+
+
+def test_client_routes_get_the_index(app, site):
+    response = serve(app, site, "students/2024-0001")
+    assert response.status_code == 200
+    assert response.get_data() == site.index_body
+    assert response.headers["Cache-Control"] == REVALIDATE_CACHE_CONTROL
+
+
+def test_missing_hashed_asset_is_not_answered_with_the_index(app, site):
+    assert serve(app, site, "assets/index-OldHash1.js") is None
+
+
+def test_fingerprinted_asset_is_precompressed_and_immutable(app, site):
+    response = serve(app, site, "assets/index-BdX3k9aZ.js", {"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.get_data()) == SCRIPT
+    assert response.headers["Cache-Control"] == IMMUTABLE_CACHE_CONTROL
+    assert "Accept-Encoding" in response.vary
+    assert response.get_etag()[0].endswith("-gzip")
+
+
+def test_uncompressed_variant_has_its_own_etag(app, site):
+    plain = serve(app, site, "assets/index-BdX3k9aZ.js")
+    gzipped = serve(app, site, "assets/index-BdX3k9aZ.js", {"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in plain.headers
+    assert plain.get_data() == SCRIPT
+    assert plain.get_etag()[0] != gzipped.get_etag()[0]
+
+
+def test_binary_files_are_sent_as_is(app, site):
+    response = serve(app, site, "assets/logo-Q1w2E3r4.png", {"Accept-Encoding": "gzip"})
+    assert response.mimetype == "image/png"
+    assert "Content-Encoding" not in response.headers
+    assert "Accept-Encoding" not in response.vary
+    assert response.get_data() == b"\x89PNG" + b"\0" * 2000
+
+
+def test_if_none_match_gets_304(app, site):
+    etag = serve(app, site, "assets/index-BdX3k9aZ.js", {"Accept-Encoding": "gzip"}).get_etag()[0]
+    response = serve(app, site, "assets/index-BdX3k9aZ.js", {"Accept-Encoding": "gzip", "If-None-Match": f'"{etag}"'})
+    assert response.status_code == 304
+
+
+def test_if_modified_since_gets_304(app, site):
+    last_modified = serve(app, site, "robots.txt").headers["Last-Modified"]
+    response = serve(app, site, "robots.txt", {"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+
+
+def test_precompressed_assets_are_served_without_touching_the_filesystem(app, site, monkeypatch):
+    serve(app, site, "assets/index-BdX3k9aZ.js", {"Accept-Encoding": "gzip"})
+
+    def no_filesystem(*args, **kwargs):
+        raise AssertionError("the filesystem was accessed")
+    monkeypatch.setattr("os.stat", no_filesystem)
+    monkeypatch.setattr("builtins.open", no_filesystem)
+
+    response = serve(app, site, "assets/index-BdX3k9aZ.js", {"Accept-Encoding": "gzip"})
+    assert gzip.decompress(response.get_data()) == SCRIPT
+
+
+def test_reload_picks_up_changed_contents(app, site, tmp_path):
+    serve(app, site, "assets/index-BdX3k9aZ.js", {"Accept-Encoding": "gzip"})
+    changed = SCRIPT + b"console.log('rebuilt');\n"
+    (tmp_path / "assets" / "index-BdX3k9aZ.js").write_bytes(changed)
+    site.reload()
+
+    response = serve(app, site, "assets/index-BdX3k9aZ.js", {"Accept-Encoding": "gzip"})
+    assert gzip.decompress(response.get_data()) == changed
@@ -0,0 +1,34 @@
+import pytest
+
+from app.utils.storage import LocalStorage, StorageBackend, SupabaseStorage
+
+
+def test_incomplete_backend_cannot_be_created():
+    class PartialStorage(StorageBackend):
+        def get_public_url(self, path):
+            return path
+
+    with pytest.raises(TypeError, match="abstract"):
+        PartialStorage()
+
+
+def test_backends_implement_the_interface():
+    LocalStorage("/nonexistent", "/api/storage", "signing-key", upload_url_seconds=900)
+    SupabaseStorage()
+
+
+def test_local_storage_round_trip(tmp_path):
+    storage = LocalStorage(str(tmp_path), "/api/storage", "signing-key", upload_url_seconds=900)
+    storage.upload(b"photo", "student_photos/a.jpg")
+    assert storage.size("student_photos/a.jpg") == 5
+    assert storage.download("student_photos/a.jpg") == b"photo"
+    assert [o.path for page in storage.iter_objects("student_photos") for o in page] == ["student_photos/a.jpg"]
+
+    storage.delete_many(["student_photos/a.jpg", "student_photos/missing.jpg"])
+    assert storage.size("student_photos/a.jpg") is None
+
+
+@pytest.mark.parametrize("path", ["", "student_photos/../secret", "student_photos//a.jpg", "./a.jpg"])
+def test_local_storage_rejects_unsafe_paths(tmp_path, path):
+    with pytest.raises(ValueError):
+        LocalStorage(str(tmp_path), "/api/storage", "signing-key", upload_url_seconds=900).file_path(path)
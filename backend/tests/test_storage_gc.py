@@ -0,0 +1,102 @@
+import os
+import time
+
+import pytest
+from sqlalchemy import text
+
+from app import db
+from app.utils.storage import LocalStorage
+from app.utils.storage_gc import collect_orphaned_photos
+
+DAY = 24 * 3600
+STUDENT_ID = "9999-0901"
+
+
+@pytest.fixture
+def storage(database, tmp_path, monkeypatch):
+    storage = LocalStorage(str(tmp_path), "/api/storage", "signing-key", upload_url_seconds=900)
+    monkeypatch.setitem(database.extensions, "storage", storage)
+    yield storage
+    with database.app_context():
+        db.session.execute(text("DELETE FROM students WHERE id = :id"), {"id": STUDENT_ID})
+        db.session.execute(text("DELETE FROM photo_variants WHERE photo LIKE 'student_photos/gc-%'"))
+        db.session.execute(text("DELETE FROM photo_objects WHERE path LIKE 'student_photos/gc-%'"))
+        db.session.execute(text("DELETE FROM storage_outbox WHERE path LIKE 'student_photos/gc-%'"))
+        db.session.commit()
+
+
+def put(storage, path, age_seconds):
+    storage.upload(b"photo", path)
+    mtime = time.time() - age_seconds
+    os.utime(storage.file_path(path), (mtime, mtime))
+
+
+def stored(storage):
+    return sorted(o.path for page in storage.iter_objects("student_photos") for o in page)
+
+
+@pytest.fixture
+def objects(database, storage):
+    put(storage, "student_photos/gc-orphan.jpg", 2 * DAY)
+    put(storage, "student_photos/thumbs/gc-orphan.webp", 2 * DAY)
+    put(storage, "student_photos/gc-in-progress.jpg", 60)
+    put(storage, "student_photos/gc-used.jpg", 2 * DAY)
+    put(storage, "student_photos/thumbs/gc-used.webp", 2 * DAY)
+    put(storage, "student_photos/gc-reused.jpg", 2 * DAY)
+
+    with database.app_context():
+        db.session.execute(text(
+            "INSERT INTO students (id, first_name, last_name, year_level, gender, photo) "
+            "VALUES (:id, 'Storage', 'Collector', 1, 'Other', 'student_photos/gc-used.jpg')"
+        ), {"id": STUDENT_ID})
+        db.session.execute(text(
+            "INSERT INTO photo_variants (photo, thumbnail) VALUES "
+            "('student_photos/gc-orphan.jpg', 'student_photos/thumbs/gc-orphan.webp'), "
+            "('student_photos/gc-used.jpg', 'student_photos/thumbs/gc-used.webp')"
+        ))
+        # Handed out again for an identical upload whose form is still open
+        db.session.execute(text(
+            "INSERT INTO photo_objects (path, refcount, reused_at) VALUES ('student_photos/gc-reused.jpg', 0, now())"
+        ))
+        db.session.commit()
+    return storage
+
+
+def test_dry_run_lists_old_orphans_only(database, objects):
+    with database.app_context():
+        stats = collect_orphaned_photos(grace_seconds=DAY, page_size=2, dry_run=True)
+
+    assert stats["listed"] == 6
+    assert stats["paths"] == ["student_photos/gc-orphan.jpg", "student_photos/thumbs/gc-orphan.webp"]
+    assert stats["deleted"] == 0
+    assert len(stored(objects)) == 6
+
+
+def test_collection_keeps_objects_within_the_grace_period(database, objects):
+    with database.app_context():
+        stats = collect_orphaned_photos(grace_seconds=DAY, page_size=2)
+        variants = db.session.execute(
+            text("SELECT photo FROM photo_variants WHERE photo LIKE 'student_photos/gc-%' ORDER BY photo")
+        ).scalars().all()
+
+    assert stats["orphans"] == stats["deleted"] == 2
+    assert stored(objects) == [
+        "student_photos/gc-in-progress.jpg",
+        "student_photos/gc-reused.jpg",
+        "student_photos/gc-used.jpg",
+        "student_photos/thumbs/gc-used.webp",
+    ]
+    assert variants == ["student_photos/gc-used.jpg"]
+
+
+def test_shorter_grace_collects_recent_uploads(database, objects):
+    with database.app_context():
+        stats = collect_orphaned_photos(grace_seconds=10, dry_run=True)
+    assert "student_photos/gc-in-progress.jpg" in stats["paths"]
+
+
+def test_reuse_hold_expires(database, objects, monkeypatch):
+    monkeypatch.setitem(database.config, "PHOTO_REUSE_HOLD_SECONDS", 0)
+    with database.app_context():
+        stats = collect_orphaned_photos(grace_seconds=DAY, dry_run=True)
+    assert "student_photos/gc-reused.jpg" in stats["paths"]
@@ -0,0 +1,65 @@
+import io
+import json
+
+import pytest
+from sqlalchemy import text
+
+from app import db
+
+
+@pytest.fixture
+def program_id(database):
+    with database.app_context():
+        program = db.session.execute(text("SELECT id FROM programs ORDER BY id LIMIT 1")).scalar()
+    if program is None:
+        pytest.skip("No programs to import students into")
+    yield program
+    with database.app_context():
+        db.session.execute(text("DELETE FROM students WHERE id LIKE '9999-06%'"))
+        db.session.commit()
+
+
+def student(student_id, program_id, **fields):
+    return {"id": student_id, "first_name": "Import", "last_name": "Test", "program_id": program_id,
+            "year_level": 1, "gender": "Female", **fields}
+
+
+def post_import(client, body: bytes, filename: str):
+    return client.post(
+        "/api/students/import",
+        data={"file": (io.BytesIO(body), filename)},
+        content_type="multipart/form-data",
+    )
+
+
+def test_ndjson_bad_lines_are_row_errors(client, program_id):
+    lines = [
+        json.dumps(student("9999-0601", program_id)),
+        '{"id": "9999-0602", first_name}',
+        json.dumps(student("9999-0603", program_id, first_name="Nul\u0000Byte")),
+        "[1, 2]",
+        json.dumps(student("9999-0604", program_id)),
+    ]
+    response = post_import(client, "\n".join(lines).encode("utf-8"), "students.ndjson")
+
+    assert response.status_code == 200
+    report = response.get_json()
+    assert report["inserted"] == 2 and report["rejected"] == 3
+    assert [e["row"] for e in report["errors"]] == [2, 3, 4]
+    assert report["errors"][0]["message"].startswith("Invalid JSON")
+    assert report["errors"][1]["message"] == "Fields cannot contain NUL characters."
+    assert report["errors"][2]["message"] == "Row must be a JSON object."
+
+
+def test_csv_nul_byte_is_a_row_error(client, program_id):
+    body = (
+        "id,first_name,last_name,program_id,year_level,gender\n"
+        f"9999-0611,Import,Te\x00st,{program_id},1,Male\n"
+        f"9999-0612,Import,Test,{program_id},1,Male\n"
+    ).encode("utf-8")
+    response = post_import(client, body, "students.csv")
+
+    assert response.status_code == 200
+    report = response.get_json()
+    assert report["inserted"] == 1
+    assert report["errors"] == [{"row": 2, "id": "9999-0611", "message": "Fields cannot contain NUL characters."}]
@@ -0,0 +1,157 @@
+import hashlib
+import io
+import time
+
+import pytest
+
+from app.utils.storage import LocalStorage
+from app.utils.uploads import (
+    UPLOAD_CHUNK_SIZE,
+    LimitedReader,
+    UploadTooLarge,
+    hash_upload,
+    sign_photo_upload,
+    verify_photo_upload,
+)
+
+
+def test_limited_reader_passes_bodies_within_the_limit():
+    reader = LimitedReader(io.BytesIO(b"x" * 100), limit=100, length=100)
+    assert reader.len == 100
+    assert b"".join(reader) == b"x" * 100
+    assert reader.bytes_read == 100 and not reader.exceeded
+
+
+def test_limited_reader_stops_once_the_limit_is_passed():
+    reader = LimitedReader(io.BytesIO(b"x" * 101), limit=100)
+    assert reader.len == 0  # unknown length: streamed with chunked encoding
+    assert reader.read(60) == b"x" * 60
+    with pytest.raises(UploadTooLarge):
+        reader.read(60)
+    assert reader.exceeded
+
+
+def test_limited_reader_read_returns_the_whole_body():
+    body = b"x" * (3 * UPLOAD_CHUNK_SIZE + 1)
+    assert LimitedReader(io.BytesIO(body), limit=len(body)).read() == body
+    assert LimitedReader(io.BytesIO(body), limit=len(body)).read(None) == body
+
+
+def test_limited_reader_read_to_eof_enforces_the_limit():
+    reader = LimitedReader(io.BytesIO(b"x" * (3 * UPLOAD_CHUNK_SIZE)), limit=2 * UPLOAD_CHUNK_SIZE)
+    with pytest.raises(UploadTooLarge):
+        reader.read()
+    assert reader.bytes_read == 3 * UPLOAD_CHUNK_SIZE
+
+
+def test_hash_upload_raises_for_oversize_unseekable_bodies():
+    with pytest.raises(UploadTooLarge):
+        hash_upload(LimitedReader(io.BytesIO(b"x" * 200), limit=100))
+
+
+def test_hash_upload_spools_unseekable_bodies():
+    sha256, body = hash_upload(LimitedReader(io.BytesIO(b"photo"), limit=100))
+    assert sha256 == hashlib.sha256(b"photo").hexdigest()
+    assert body.read() == b"photo"
+
+
+@pytest.fixture
+def small_limit(app, monkeypatch):
+    monkeypatch.setitem(app.config, "MAX_PHOTO_BYTES", 1000)
+
+
+def test_raw_upload_refused_from_content_length(client, small_limit):
+    response = client.post("/api/students/upload-photo", data=b"x" * 1001, content_type="image/jpeg")
+    assert response.status_code == 413
+
+
+def test_raw_upload_without_content_length_is_cut_off(client, small_limit):
+    response = client.post(
+        "/api/students/upload-photo",
+        input_stream=io.BytesIO(b"x" * 5000),
+        content_type="image/jpeg",
+        environ_overrides={"wsgi.input_terminated": True},
+    )
+    assert response.status_code == 413
+
+
+def test_multipart_upload_over_the_limit(client, small_limit):
+    response = client.post(
+        "/api/students/upload-photo",
+        data={"photo": (io.BytesIO(b"x" * 1001), "photo.jpg", "image/jpeg")},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 413
+
+
+def test_multipart_upload_refused_from_content_length(client, small_limit):
+    response = client.post(
+        "/api/students/upload-photo",
+        data={"photo": (io.BytesIO(b"x" * (1000 + 128 * 1024)), "photo.jpg", "image/jpeg")},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 413
+
+
+def test_photo_upload_token_is_bound_to_its_path(app):
+    with app.app_context():
+        token = sign_photo_upload("student_photos/a.jpg")
+        assert verify_photo_upload(token, "student_photos/a.jpg")
+        assert not verify_photo_upload(token, "student_photos/b.jpg")
+        assert not verify_photo_upload(token[:-2] + "xx", "student_photos/a.jpg")
+        assert not verify_photo_upload("", "student_photos/a.jpg")
+
+
+def test_photo_upload_token_expires(app, monkeypatch):
+    lifetime = app.config["PHOTO_UPLOAD_TOKEN_SECONDS"]
+    time_now = time.time()
+    with app.app_context():
+        with monkeypatch.context() as m:
+            m.setattr(time, "time", lambda: time_now - lifetime + 5)
+            fresh = sign_photo_upload("student_photos/a.jpg")
+            m.setattr(time, "time", lambda: time_now - lifetime - 5)
+            expired = sign_photo_upload("student_photos/a.jpg")
+        assert verify_photo_upload(fresh, "student_photos/a.jpg")
+        assert not verify_photo_upload(expired, "student_photos/a.jpg")
+
+
+def test_photo_upload_token_from_another_secret_is_rejected(app, monkeypatch):
+    with app.app_context():
+        token = sign_photo_upload("student_photos/a.jpg")
+        monkeypatch.setitem(app.config, "SECRET_KEY", "another-secret-key-0123456789abcdef")
+        assert not verify_photo_upload(token, "student_photos/a.jpg")
+
+
+def test_confirm_rejects_an_invalid_token(client):
+    response = client.post("/api/students/2024-0001/photo", json={"path": "student_photos/a.jpg", "token": "forged"})
+    assert response.status_code == 400
+
+
+def test_local_upload_url_signature():
+    storage = LocalStorage("/nonexistent", "/api/storage", "signing-key", upload_url_seconds=900)
+    expires = int(time.time()) + 60
+    signature = storage.upload_signature("student_photos/a.jpg", expires)
+    assert storage.verify_upload("student_photos/a.jpg", expires, signature)
+    assert not storage.verify_upload("student_photos/b.jpg", expires, signature)
+    assert not storage.verify_upload("student_photos/a.jpg", expires + 1, signature)
+
+    expired = int(time.time()) - 1
+    assert not storage.verify_upload("student_photos/a.jpg", expired, storage.upload_signature("student_photos/a.jpg", expired))
+
+
+def test_local_upload_route_checks_the_signature(client):
+    expires = int(time.time()) + 60
+    response = client.put(
+        f"/api/storage/upload/student_photos/a.jpg?expires={expires}&signature={'0' * 64}", data=b"photo"
+    )
+    assert response.status_code == 403
+
+
+def test_local_upload_route_accepts_a_signed_url(app, client):
+    with app.test_request_context():
+        url = app.extensions["storage"].signed_upload_url("student_photos/signed.jpg")
+    response = client.put(url, data=b"photo")
+    assert response.status_code == 200
+    with app.app_context():
+        assert app.extensions["storage"].download("student_photos/signed.jpg") == b"photo"
+        app.extensions["storage"].delete_many(["student_photos/signed.jpg"])
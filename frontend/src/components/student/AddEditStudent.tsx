@@ -6,7 +6,7 @@ import PortalSelect from "../ui/portal-select";
 import { Student } from "../../types/student";
 import { College } from "../../types/college";
 import { Program } from "../../types/program";
-import { createStudent, updateStudent, getProgramsByCollege, uploadStudentPhoto, deleteStudentPhoto, getPhotoPublicUrl } from "../../services/studentsService";
+import { createStudent, updateStudent, getProgramsByCollege, uploadAndAttachStudentPhoto, getPhotoPublicUrl } from "../../services/studentsService";
 import {
   validateStudentCreate,
   isStudentIdDuplicate,
@@ -243,13 +243,8 @@ const AddEditStudent: React.FC<AddEditStudentProps> = ({
   const handleRemovePhotoConfirm = async () => {
     setIsRemovingPhoto(true);
     try {
-      // If we're in edit mode and have an existing photo, remove it immediately
+      // The stored file is released by the backend once the cleared photo is saved
       if (student && existingPhotoPath) {
-        try {
-          await deleteStudentPhoto(existingPhotoPath);
-        } catch (err) {
-          console.warn("Failed to delete photo:", err);
-        }
         setExistingPhotoPath(null);
       }
       handleRemovePhotoConfirmed();
@@ -349,24 +344,10 @@ const AddEditStudent: React.FC<AddEditStudentProps> = ({
 
       // If a file is selected, upload it only AFTER the DB operation succeeded.
       if (selectedFile && createdOrUpdatedStudentId) {
-        let newPhotoPath: string | null = null;
         try {
-          const uploadRes = await uploadStudentPhoto(selectedFile);
-          newPhotoPath = uploadRes.path;
-
-          // Attach uploaded photo path to student with an update call.
-          // Use the authoritative id returned from create/update above.
-          await updateStudent(createdOrUpdatedStudentId, { photo: newPhotoPath });
-
+          // The file goes straight to storage; the backend only signs the upload and attaches the path.
+          await uploadAndAttachStudentPhoto(createdOrUpdatedStudentId, selectedFile);
         } catch (uploadOrAttachError) {
-          // If attaching the uploaded photo to the student fails, clean up the uploaded file to avoid orphans.
-          try {
-            if (newPhotoPath) {
-              await deleteStudentPhoto(newPhotoPath);
-            }
-          } catch (cleanupErr) {
-            console.warn("Failed to cleanup uploaded photo after attach failure:", cleanupErr);
-          }
           // Surface an error to the form
           const message = uploadOrAttachError instanceof Error ? uploadOrAttachError.message : "Failed to upload or attach photo.";
           setFormErrors({ general: message });
@@ -122,10 +122,12 @@ const StudentsPage: React.FC = () => {
         genderForApi
       );
 
-      // Map students to populate photo_url if photo path is present
+      // Map students to populate photo_url, preferring the small thumbnail for the avatar
       const studentsWithPhotos = response.students.map((s) => ({
         ...s,
-        photo_url: s.photo ? getPhotoPublicUrl(s.photo) : undefined,
+        photo_url: s.photo_thumbnail
+          ? getPhotoPublicUrl(s.photo_thumbnail)
+          : s.photo ? getPhotoPublicUrl(s.photo) : undefined,
       }));
 
       setStudents(studentsWithPhotos);
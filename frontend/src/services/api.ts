@@ -1,7 +1,7 @@
 /** Base API utility functions. */
 
 // Use window.location for dynamic API URL, defaulting to localhost:5000
-const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || (() => {
+export const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || (() => {
   // In development, use localhost:5000
   // In production, use the same origin as the frontend
   if (window.location.hostname === "localhost" || window.location.hostname === "127.0.0.1") {
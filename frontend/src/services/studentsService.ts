@@ -2,8 +2,7 @@
 
 import { Student, PaginatedStudents } from "../types/student";
 import { Program } from "../types/program";
-import { apiDelete, apiGet, apiPost, apiPut, apiPostForm } from "./api";
-import { supabase, SUPABASE_BUCKET } from "../lib/supabase";
+import { API_BASE_URL, apiDelete, apiGet, apiPost, apiPut, apiPostForm } from "./api";
 
 /**
  * Fetch paginated students from backend API.
@@ -72,18 +71,53 @@ export async function uploadStudentPhoto(file: File): Promise<{ path: string; pu
   return response;
 }
 
-export async function deleteStudentPhoto(path: string): Promise<void> {
-  if (!path) return;
-  const { error } = await supabase.storage.from(SUPABASE_BUCKET).remove([path]);
-  if (error) {
-    console.error("Supabase delete error:", error);
-    throw new Error(error.message || "Failed to delete photo.");
+/**
+ * Upload a photo straight to storage through a signed URL, then attach it to the student.
+ * Only the metadata requests go through the backend.
+ */
+export async function uploadAndAttachStudentPhoto(studentId: string, file: File): Promise<Student> {
+  if (!file) throw new Error("No file provided");
+
+  const MAX_BYTES = 5 * 1024 * 1024; // 5 MB
+  if (file.size > MAX_BYTES) {
+    throw new Error("File size exceeds 5 MB limit.");
   }
+
+  if (!file.type.startsWith("image/")) {
+    throw new Error("Only image files are allowed.");
+  }
+
+  const upload = await apiPost<{ path: string; uploadUrl: string; token: string }>(`/students/photo-uploads`, {
+    filename: file.name,
+    content_type: file.type,
+    size: file.size,
+  });
+
+  const stored = await fetch(upload.uploadUrl, {
+    method: "PUT",
+    headers: { "Content-Type": file.type },
+    body: file,
+  });
+  if (!stored.ok) {
+    throw new Error("Failed to upload photo.");
+  }
+
+  // An upload that never gets attached is removed by the server's storage GC. Photos may be
+  // shared between students (identical images are stored once), so the client never deletes
+  // storage objects itself.
+  return apiPost<Student>(`/students/${encodeURIComponent(studentId)}/photo`, {
+    path: upload.path,
+    token: upload.token,
+  });
 }
 
 export function getPhotoPublicUrl(path?: string | null): string {
   const DEFAULT = (import.meta.env.VITE_DEFAULT_AVATAR_URL as string) || "/default-avatar.png";
   if (!path) return DEFAULT;
-  const { data } = supabase.storage.from(SUPABASE_BUCKET).getPublicUrl(path) as any;
-  return data?.publicUrl || DEFAULT;
+  const encodedPath = path.split("/").map(encodeURIComponent).join("/");
+  // Optional override to load photos from elsewhere, e.g. a CDN in front of the storage bucket
+  const storageBase = import.meta.env.VITE_STORAGE_PUBLIC_URL as string | undefined;
+  if (storageBase) return `${storageBase.replace(/\/$/, "")}/${encodedPath}`;
+  // The backend's photo proxy caches photos on its disk and lets browsers keep them
+  return `${API_BASE_URL}/photos/${encodedPath}`;
 }
\ No newline at end of file
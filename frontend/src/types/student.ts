@@ -9,6 +9,8 @@ export interface Student {
   gender: string;
   // optional stored photo path (Supabase storage path) and computed public URL
   photo?: string | null;
+  // downscaled WebP of the photo for avatars; null until it has been generated
+  photo_thumbnail?: string | null;
   photo_url?: string | null;
 }
 